@@ -0,0 +1,333 @@
+"""
+Synthetic Movie Module
+
+Description: Deterministic synthetic movies for benchmarking: Gaussian blobs following
+             known Brownian trajectories (with optional constant drift) on a noisy
+             background, written as frame_XXXXX.png files next to a ground-truth table,
+             plus accuracy metrics comparing detections and links against that truth.
+
+Copyright (c) 2025, Jacqueline Reynaga, Kevin Pillsbury, Bakir Husremovic
+License: BSD 3-Clause License
+Date: 2025-12-08
+"""
+
+import os
+from dataclasses import asdict, dataclass
+from typing import List, Tuple
+
+import cv2
+import numpy as np
+import pandas as pd
+from scipy.spatial import cKDTree
+
+
+@dataclass
+class MovieSpec:
+    """Parameters of a synthetic movie (same spec and seed -> identical frames)."""
+
+    width: int = 512
+    height: int = 512
+    frames: int = 100
+    density: float = 2.0  # particles per 100x100 px
+    diffusion: float = 0.5  # px^2 per frame (step std = sqrt(2 * diffusion) per axis)
+    drift_x: float = 0.0  # px per frame
+    drift_y: float = 0.0
+    sigma: float = 2.0  # blob width, px
+    amplitude: float = 120.0  # blob peak above background, grey levels
+    background: float = 20.0
+    noise: float = 5.0  # Gaussian noise std, grey levels
+    seed: int = 0
+
+    @property
+    def particle_count(self) -> int:
+        return max(1, int(round(self.density * self.width * self.height / 1e4)))
+
+    def detection_params(self) -> dict:
+        """Detection parameters suited to the blobs of this movie."""
+        feature_size = int(2 * round(2.5 * self.sigma) + 1)
+        blob_mass = self.amplitude * 2 * np.pi * self.sigma ** 2
+        return {
+            "feature_size": feature_size,
+            "min_mass": round(0.2 * blob_mass, 1),
+            "invert": False,
+            "threshold": 0.0,
+        }
+
+    def linking_params(self) -> dict:
+        """Linking parameters covering the per-frame displacement of this movie."""
+        step = 4 * np.sqrt(2 * self.diffusion) + np.hypot(self.drift_x, self.drift_y)
+        return {"search_range": round(max(step, 2.0), 2), "memory": 3}
+
+    def as_dict(self) -> dict:
+        return asdict(self)
+
+
+def _simulate(spec: MovieSpec) -> pd.DataFrame:
+    """Positions of every particle in every frame, inside the image or not."""
+    rng = np.random.default_rng(spec.seed)
+    count = spec.particle_count
+    start_x = rng.uniform(0, spec.width, count)
+    start_y = rng.uniform(0, spec.height, count)
+    step_std = np.sqrt(2 * spec.diffusion)
+    steps_x = rng.normal(0, step_std, (spec.frames, count))
+    steps_y = rng.normal(0, step_std, (spec.frames, count))
+    steps_x[0] = 0
+    steps_y[0] = 0
+    frame_idx = np.arange(spec.frames)[:, None]
+    x = start_x + np.cumsum(steps_x, axis=0) + spec.drift_x * frame_idx
+    y = start_y + np.cumsum(steps_y, axis=0) + spec.drift_y * frame_idx
+
+    return pd.DataFrame(
+        {
+            "frame": np.repeat(np.arange(spec.frames), count),
+            "particle": np.tile(np.arange(count), spec.frames),
+            "x": x.ravel(),
+            "y": y.ravel(),
+        }
+    )
+
+
+def inside_image(spec: MovieSpec, positions: pd.DataFrame) -> pd.DataFrame:
+    """
+    Rows farther than 3 sigma from the image edge, where blobs are fully visible.
+
+    Used for the ground truth and to drop detections of blobs cut off by the edge
+    before scoring.
+
+    Parameters
+    ----------
+    spec : MovieSpec
+        Movie parameters.
+    positions : pd.DataFrame
+        Table with x and y columns.
+
+    Returns
+    -------
+    pd.DataFrame
+        The rows inside the margin, with a fresh index.
+    """
+    margin = 3 * spec.sigma
+    inside = (
+        (positions["x"] >= margin)
+        & (positions["x"] < spec.width - margin)
+        & (positions["y"] >= margin)
+        & (positions["y"] < spec.height - margin)
+    )
+    return positions[inside].reset_index(drop=True)
+
+
+def generate_trajectories(spec: MovieSpec) -> pd.DataFrame:
+    """
+    Ground-truth positions of every particle in every frame it is inside the image.
+
+    Particles start uniformly inside the frame and take Gaussian steps plus the drift.
+    Frames in which a particle is within 3 sigma of the edge (or outside the image)
+    are left out of the truth.
+
+    Parameters
+    ----------
+    spec : MovieSpec
+        Movie parameters.
+
+    Returns
+    -------
+    pd.DataFrame
+        Columns frame, particle, x, y.
+    """
+    return inside_image(spec, _simulate(spec))
+
+
+def render_frame(spec: MovieSpec, positions: np.ndarray, rng) -> np.ndarray:
+    """
+    Render one frame.
+
+    Parameters
+    ----------
+    spec : MovieSpec
+        Movie parameters.
+    positions : np.ndarray
+        (n, 2) array of x, y positions.
+    rng : np.random.Generator
+        Noise source.
+
+    Returns
+    -------
+    np.ndarray
+        uint8 grayscale image.
+    """
+    image = np.full((spec.height, spec.width), spec.background, dtype=np.float32)
+    radius = int(np.ceil(4 * spec.sigma))
+    offsets = np.arange(-radius, radius + 1)
+    for x, y in positions:
+        cx, cy = int(round(x)), int(round(y))
+        cols = cx + offsets
+        rows = cy + offsets
+        col_ok = (cols >= 0) & (cols < spec.width)
+        row_ok = (rows >= 0) & (rows < spec.height)
+        gx = np.exp(-((cols[col_ok] - x) ** 2) / (2 * spec.sigma ** 2))
+        gy = np.exp(-((rows[row_ok] - y) ** 2) / (2 * spec.sigma ** 2))
+        image[np.ix_(rows[row_ok], cols[col_ok])] += spec.amplitude * np.outer(gy, gx)
+    if spec.noise > 0:
+        image += rng.normal(0, spec.noise, image.shape).astype(np.float32)
+    return np.clip(np.rint(image), 0, 255).astype(np.uint8)
+
+
+def write_movie(spec: MovieSpec, folder: str) -> Tuple[List[str], pd.DataFrame]:
+    """
+    Write the frames of a movie and its ground truth.
+
+    Parameters
+    ----------
+    spec : MovieSpec
+        Movie parameters.
+    folder : str
+        Output folder (frame_XXXXX.png and ground_truth.csv).
+
+    Returns
+    -------
+    tuple
+        (frame paths in order, ground-truth DataFrame).
+    """
+    os.makedirs(folder, exist_ok=True)
+    positions = _simulate(spec)
+    truth = inside_image(spec, positions)
+    # Separate stream so the noise does not depend on the trajectory draws
+    noise_rng = np.random.default_rng(spec.seed + 1)
+    # Blobs straddling the edge are rendered too, they are just not in the truth
+    frame_positions = positions[["x", "y"]].to_numpy().reshape(spec.frames, -1, 2)
+    frame_paths = []
+    for frame in range(spec.frames):
+        path = os.path.join(folder, f"frame_{frame:05d}.png")
+        cv2.imwrite(path, render_frame(spec, frame_positions[frame], noise_rng))
+        frame_paths.append(path)
+    truth.to_csv(os.path.join(folder, "ground_truth.csv"), index=False)
+    return frame_paths, truth
+
+
+def match_detections(detections: pd.DataFrame, truth: pd.DataFrame, tolerance: float = 2.0):
+    """
+    Match detections to ground-truth particles frame by frame (nearest within tolerance,
+    one-to-one).
+
+    Parameters
+    ----------
+    detections : pd.DataFrame
+        Detected particles with frame, x, y columns.
+    truth : pd.DataFrame
+        Ground truth from ``generate_trajectories``.
+    tolerance : float, optional
+        Maximum distance for a match, px.
+
+    Returns
+    -------
+    np.ndarray
+        Truth particle id per detection row (-1 where unmatched).
+    np.ndarray
+        Match distance per detection row (NaN where unmatched).
+    """
+    truth_ids = np.full(len(detections), -1, dtype=np.int64)
+    distances = np.full(len(detections), np.nan)
+    if detections.empty or truth.empty:
+        return truth_ids, distances
+
+    det_positions = detections.reset_index(drop=True)
+    truth_by_frame = dict(iter(truth.groupby("frame")))
+    for frame, det_frame in det_positions.groupby("frame"):
+        truth_frame = truth_by_frame.get(frame)
+        if truth_frame is None:
+            continue
+        tree = cKDTree(truth_frame[["x", "y"]].to_numpy())
+        dist, idx = tree.query(
+            det_frame[["x", "y"]].to_numpy(), distance_upper_bound=tolerance
+        )
+        # Closest detection wins when two claim the same truth particle
+        claimed = set()
+        for order in np.argsort(dist):
+            if not np.isfinite(dist[order]) or idx[order] in claimed:
+                continue
+            claimed.add(idx[order])
+            row = det_frame.index[order]
+            truth_ids[row] = truth_frame["particle"].iloc[idx[order]]
+            distances[row] = dist[order]
+    return truth_ids, distances
+
+
+def detection_accuracy(detections: pd.DataFrame, truth: pd.DataFrame, tolerance: float = 2.0):
+    """
+    Precision, recall, F1 and RMS localization error of detections.
+
+    Parameters
+    ----------
+    detections, truth : pd.DataFrame
+        Detected and true positions (frame, x, y).
+    tolerance : float, optional
+        Maximum distance for a match, px.
+
+    Returns
+    -------
+    dict
+        Accuracy metrics.
+    """
+    truth_ids, distances = match_detections(detections, truth, tolerance)
+    matched = int((truth_ids >= 0).sum())
+    precision = matched / len(detections) if len(detections) else 0.0
+    recall = matched / len(truth) if len(truth) else 0.0
+    f1 = 2 * precision * recall / (precision + recall) if precision + recall else 0.0
+    rms = float(np.sqrt(np.nanmean(distances ** 2))) if matched else None
+    return {
+        "precision": round(precision, 4),
+        "recall": round(recall, 4),
+        "f1": round(f1, 4),
+        "rms_error_px": None if rms is None else round(rms, 4),
+    }
+
+
+def linking_accuracy(trajectories: pd.DataFrame, truth: pd.DataFrame, tolerance: float = 2.0):
+    """
+    Precision and recall of frame-to-frame links.
+
+    A true link joins the same ground-truth particle in consecutive frames where both
+    ends were detected. A found link joins consecutive detections of one linked
+    trajectory; it is correct if both ends match the same truth particle one frame apart.
+
+    Parameters
+    ----------
+    trajectories : pd.DataFrame
+        Linked trajectories (frame, particle, x, y).
+    truth : pd.DataFrame
+        Ground truth.
+    tolerance : float, optional
+        Maximum distance for a detection match, px.
+
+    Returns
+    -------
+    dict
+        Link precision, recall and F1.
+    """
+    if trajectories.empty:
+        return {"link_precision": 0.0, "link_recall": 0.0, "link_f1": 0.0}
+    linked = trajectories.reset_index(drop=True)
+    truth_ids, _ = match_detections(linked, truth, tolerance)
+    linked = linked.assign(truth_id=truth_ids).sort_values(["particle", "frame"], kind="stable")
+
+    same_track = linked["particle"].to_numpy()[1:] == linked["particle"].to_numpy()[:-1]
+    frames = linked["frame"].to_numpy()
+    ids = linked["truth_id"].to_numpy()
+    found = same_track & (ids[:-1] >= 0) & (ids[1:] >= 0)
+    correct = found & (ids[:-1] == ids[1:]) & (frames[1:] - frames[:-1] == 1)
+
+    detected = linked[linked["truth_id"] >= 0].sort_values(["truth_id", "frame"])
+    det_ids = detected["truth_id"].to_numpy()
+    det_frames = detected["frame"].to_numpy()
+    true_links = int(((det_ids[1:] == det_ids[:-1]) & (det_frames[1:] - det_frames[:-1] == 1)).sum())
+
+    n_found = int(found.sum())
+    n_correct = int(correct.sum())
+    precision = n_correct / n_found if n_found else 0.0
+    recall = n_correct / true_links if true_links else 0.0
+    f1 = 2 * precision * recall / (precision + recall) if precision + recall else 0.0
+    return {
+        "link_precision": round(precision, 4),
+        "link_recall": round(recall, 4),
+        "link_f1": round(f1, 4),
+    }
@@ -0,0 +1,330 @@
+#!/usr/bin/env python3
+"""
+Detection and Linking Benchmarks
+
+Description: Generates deterministic synthetic movies (see SyntheticMovie.py), runs them
+             through the same ParticleProcessing detection, linking and drift functions
+             the GUI and headless pipeline use, and reports throughput, peak memory and
+             accuracy against the ground truth as JSON, so runs from different commits
+             can be compared with --compare.
+
+Copyright (c) 2025, Jacqueline Reynaga, Kevin Pillsbury, Bakir Husremovic
+License: BSD 3-Clause License
+Date: 2025-12-08
+"""
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from dataclasses import replace
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# Repository root, so the benchmarks import the application code
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+import pandas as pd
+
+from src.cli import detect_particles
+from src.utils import ParticleProcessing
+from SyntheticMovie import (
+    MovieSpec,
+    detection_accuracy,
+    inside_image,
+    linking_accuracy,
+    write_movie,
+)
+
+SCENARIOS = {
+    "sparse": MovieSpec(density=1.0),
+    "dense": MovieSpec(density=6.0),
+    "noisy": MovieSpec(noise=20.0),
+    "drift": MovieSpec(drift_x=0.5, drift_y=-0.3),
+}
+
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _peak_rss_mb():
+    """Peak resident memory of this process over its lifetime (None where unavailable)."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and kilobytes on Linux
+    scale = 1024 * 1024 if sys.platform == "darwin" else 1024
+    return round(peak / scale, 1)
+
+
+def _timed(fn, repeat=1, trace_memory=False):
+    """
+    Best wall time of ``fn()`` over ``repeat`` runs.
+
+    Returns
+    -------
+    tuple
+        (result of the last run, seconds, traced peak in MB or None).
+    """
+    best = None
+    result = None
+    for _ in range(max(1, repeat)):
+        start = time.perf_counter()
+        result = fn()
+        seconds = time.perf_counter() - start
+        best = seconds if best is None else min(best, seconds)
+
+    traced_mb = None
+    if trace_memory:
+        # Separate run: tracing slows allocation-heavy code and would skew the timing
+        tracemalloc.start()
+        try:
+            fn()
+            traced_mb = round(tracemalloc.get_traced_memory()[1] / 1e6, 1)
+        finally:
+            tracemalloc.stop()
+    return result, best, traced_mb
+
+
+def _rate(count, seconds):
+    return round(count / seconds, 1) if seconds > 0 else None
+
+
+def run_scenario(name, spec, movie_folder, workers=1, repeat=1, trace_memory=False):
+    """
+    Benchmark one synthetic movie.
+
+    Parameters
+    ----------
+    name : str
+        Scenario name.
+    spec : MovieSpec
+        Movie parameters.
+    movie_folder : str
+        Folder the frames are written to.
+    workers : int, optional
+        Also time process-pool detection (src.cli.detect_particles) with this many
+        workers when above 1.
+    repeat : int, optional
+        Runs per stage; the fastest is reported.
+    trace_memory : bool, optional
+        Also measure the traced Python/numpy allocation peak per stage.
+
+    Returns
+    -------
+    dict
+        Scenario result.
+    """
+    print(f"[{name}] generating {spec.frames} frames of {spec.width}x{spec.height} "
+          f"with {spec.particle_count} particles")
+    frame_paths, truth = write_movie(spec, movie_folder)
+    detection_params = spec.detection_params()
+    linking_params = spec.linking_params()
+
+    # Warm-up (imports trackpy and any JIT-compiled code) outside the timed runs
+    ParticleProcessing.find_particles_in_frames(frame_paths[:1], detection_params)
+
+    print(f"[{name}] detection")
+    particles, seconds, traced = _timed(
+        lambda: ParticleProcessing.find_particles_in_frames(frame_paths, detection_params),
+        repeat,
+        trace_memory,
+    )
+    detection = {
+        "seconds": round(seconds, 4),
+        "frames_per_sec": _rate(len(frame_paths), seconds),
+        "particles_per_sec": _rate(len(particles), seconds),
+        "particles": len(particles),
+        "peak_traced_mb": traced,
+        **detection_accuracy(inside_image(spec, particles), truth),
+    }
+
+    if workers > 1:
+        print(f"[{name}] detection with {workers} workers")
+        _, pool_seconds, _ = _timed(
+            lambda: detect_particles(frame_paths, detection_params, workers), repeat
+        )
+        detection["pool_workers"] = workers
+        detection["pool_seconds"] = round(pool_seconds, 4)
+        detection["pool_frames_per_sec"] = _rate(len(frame_paths), pool_seconds)
+
+    print(f"[{name}] linking")
+    # Keep every trajectory so link accuracy covers all detections
+    trajectories, seconds, traced = _timed(
+        lambda: ParticleProcessing.link_trajectories(
+            particles,
+            search_range=linking_params["search_range"],
+            memory=linking_params["memory"],
+            min_trajectory_length=1,
+        ),
+        repeat,
+        trace_memory,
+    )
+    linking = {
+        "seconds": round(seconds, 4),
+        "particles_per_sec": _rate(len(particles), seconds),
+        "trajectories": int(trajectories["particle"].nunique()) if len(trajectories) else 0,
+        "true_trajectories": int(truth["particle"].nunique()),
+        "peak_traced_mb": traced,
+        **linking_accuracy(inside_image(spec, trajectories), truth),
+    }
+
+    print(f"[{name}] drift")
+    drift, seconds, traced = _timed(
+        lambda: ParticleProcessing.compute_drift_table(trajectories), repeat, trace_memory
+    )
+    drift_result = {"seconds": round(seconds, 4), "peak_traced_mb": traced}
+    if len(drift) > 0:
+        frames = drift.index.to_numpy(dtype=float)
+        expected = np.column_stack([spec.drift_y * frames, spec.drift_x * frames])
+        error = drift[["y", "x"]].to_numpy() - expected
+        drift_result["final_error_px"] = round(float(np.hypot(*error[-1])), 4)
+
+    return {
+        "name": name,
+        "spec": spec.as_dict(),
+        "detection_params": detection_params,
+        "linking_params": linking_params,
+        "detection": detection,
+        "linking": linking,
+        "drift": drift_result,
+    }
+
+
+def compare(results, baseline_path):
+    """Print throughput ratios against an earlier results file (>1 means faster now)."""
+    with open(baseline_path, "r") as f:
+        baseline = {s["name"]: s for s in json.load(f).get("scenarios", [])}
+    print(f"Compared with {baseline_path}:")
+    for scenario in results["scenarios"]:
+        old = baseline.get(scenario["name"])
+        if old is None:
+            continue
+        ratios = []
+        for stage, key in (("detection", "frames_per_sec"), ("linking", "particles_per_sec")):
+            new_rate, old_rate = scenario[stage].get(key), old[stage].get(key)
+            if new_rate and old_rate:
+                ratios.append(f"{stage} x{new_rate / old_rate:.2f}")
+        print(f"  {scenario['name']:>10}: {', '.join(ratios) or 'no comparable stages'}")
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        description="Benchmark detection and linking on synthetic movies."
+    )
+    parser.add_argument(
+        "--scenarios",
+        default=",".join(SCENARIOS),
+        help=f"Comma-separated scenarios (default: {','.join(SCENARIOS)})",
+    )
+    parser.add_argument("--frames", type=int, default=None, help="Frames per movie")
+    parser.add_argument("--size", type=int, default=None, help="Frame width and height, px")
+    parser.add_argument("--density", type=float, default=None, help="Particles per 100x100 px")
+    parser.add_argument("--noise", type=float, default=None, help="Noise std, grey levels")
+    parser.add_argument("--seed", type=int, default=None, help="Random seed")
+    parser.add_argument(
+        "--workers", type=int, default=1, help="Also time process-pool detection"
+    )
+    parser.add_argument("--repeat", type=int, default=1, help="Runs per stage (best is kept)")
+    parser.add_argument(
+        "--trace-memory", action="store_true", help="Measure traced peak memory per stage"
+    )
+    parser.add_argument(
+        "--output", default="benchmark_results.json", help="Results file (JSON)"
+    )
+    parser.add_argument("--compare", default=None, help="Earlier results file to compare with")
+    parser.add_argument(
+        "--keep-movies", default=None, help="Write the movies here instead of a temp folder"
+    )
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    names = [name.strip() for name in args.scenarios.split(",") if name.strip()]
+    unknown = [name for name in names if name not in SCENARIOS]
+    if unknown:
+        print(f"Unknown scenarios: {', '.join(unknown)}", file=sys.stderr)
+        return 2
+
+    overrides = {}
+    if args.frames is not None:
+        overrides["frames"] = args.frames
+    if args.size is not None:
+        overrides["width"] = overrides["height"] = args.size
+    if args.density is not None:
+        overrides["density"] = args.density
+    if args.noise is not None:
+        overrides["noise"] = args.noise
+    if args.seed is not None:
+        overrides["seed"] = args.seed
+
+    import trackpy
+
+    trackpy.quiet()
+
+    results = {
+        "commit": _git_commit(),
+        "timestamp": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "versions": {"numpy": np.__version__, "pandas": pd.__version__,
+                     "trackpy": trackpy.__version__},
+        "scenarios": [],
+    }
+    with tempfile.TemporaryDirectory() as tmp:
+        root = args.keep_movies or tmp
+        for name in names:
+            spec = replace(SCENARIOS[name], **overrides)
+            results["scenarios"].append(
+                run_scenario(
+                    name,
+                    spec,
+                    os.path.join(root, name),
+                    workers=args.workers,
+                    repeat=args.repeat,
+                    trace_memory=args.trace_memory,
+                )
+            )
+    # ru_maxrss is a process-lifetime peak, so it is reported once for the whole run
+    # rather than per scenario
+    results["process_peak_rss_mb"] = _peak_rss_mb()
+
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"Results written to {args.output}")
+
+    for scenario in results["scenarios"]:
+        detection, linking = scenario["detection"], scenario["linking"]
+        print(
+            f"  {scenario['name']:>10}: detect {detection['frames_per_sec']} frames/s "
+            f"(F1 {detection['f1']}), link {linking['particles_per_sec']} particles/s "
+            f"(F1 {linking['link_f1']})"
+        )
+    if args.compare:
+        compare(results, args.compare)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,22 @@
+#!/usr/bin/env python3
+"""
+Batch queue entry point.
+
+Description: Creates a project for every video in a folder and runs the headless
+             pipeline for each across a process pool. See src/batch.py.
+
+Copyright (c) 2025, Jacqueline Reynaga, Kevin Pillsbury, Bakir Husremovic
+License: BSD 3-Clause License
+Date: 2025-12-08
+"""
+
+import sys
+import os
+
+# Add the current directory to Python path to allow imports
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from src.batch import main
+
+if __name__ == "__main__":
+    sys.exit(main())
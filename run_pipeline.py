@@ -0,0 +1,22 @@
+#!/usr/bin/env python3
+"""
+Headless pipeline entry point.
+
+Description: Runs detection, filtering, linking, drift and diagnostics for a project
+             from the command line, without starting the GUI. See src/cli.py.
+
+Copyright (c) 2025, Jacqueline Reynaga, Kevin Pillsbury, Bakir Husremovic
+License: BSD 3-Clause License
+Date: 2025-12-08
+"""
+
+import sys
+import os
+
+# Add the current directory to Python path to allow imports
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from src.cli import main
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -31,6 +31,7 @@ from .DW_ErrantParticleWidget import *
 from .DW_FrameGalleryWidget import *
 from .DW_PlottingWidget import *
 from .DW_ParametersWidget import *
+from .DW_LW_PerformanceWidget import DWLWPerformanceWidget
 
 
 class DWDetectionWindow(QMainWindow):
@@ -143,6 +144,10 @@ class DWDetectionWindow(QMainWindow):
         self.metadata_widget = self._create_metadata_widget()
         right_panel_layout.addWidget(self.metadata_widget)
 
+        # Collapsible stage timings
+        self.performance_widget = DWLWPerformanceWidget()
+        right_panel_layout.addWidget(self.performance_widget)
+
         # Next button at bottom corner
         right_panel_layout.addStretch()
         right_panel_layout.addWidget(self.right_panel.next_button, alignment=Qt.AlignRight)
@@ -175,6 +180,7 @@ class DWDetectionWindow(QMainWindow):
         # Connect signals
         # Only update feature size when parameters change, don't clear gallery
         self.right_panel.parameter_changed.connect(self.frame_player.update_feature_size)
+        self.right_panel.backgroundViewRequested.connect(self.frame_player.show_background)
         # Clear gallery when Find Particles starts (does not touch particle CSV files)
         self.right_panel.particles_found.connect(self.clear_processed_data)
         # Parameters info updates when detection completes via refresh_detection_ui
@@ -209,7 +215,7 @@ class DWDetectionWindow(QMainWindow):
         Centralized function to refresh all UI elements after loading new particle data.
 
         This is used by:
-        - Undo functionality (load_spreadsheet_and_config)
+        - Undo and spreadsheet import (_refresh_after_restore)
         - Find Particles (on_find_finished)
         - Filter application (when filters change)
 
@@ -401,12 +407,15 @@ class DWDetectionWindow(QMainWindow):
         min_mass = params.get("min_mass", "-")
         threshold = params.get("threshold", "-")
         invert = "Yes" if params.get("invert", False) else "No"
+        region_count = len(params.get("roi", []))
+        regions = f"{region_count} region(s)" if region_count else "Full frame"
 
         info_text = (
             f"Feature size: {feature_size}\n"
             f"Min mass: {min_mass}\n"
             f"Threshold: {threshold}\n"
-            f"Invert: {invert}"
+            f"Invert: {invert}\n"
+            f"Regions: {regions}"
         )
 
         self.parameters_info_label.setText(info_text)
@@ -11,7 +11,10 @@ Date: 2025-12-08
 
 import cv2
 import os
-from PySide6.QtCore import Qt, Signal, QThread
+import threading
+import time
+from collections import deque
+from PySide6.QtCore import Qt, Signal, QThread, QTimer
 from PySide6.QtWidgets import (
     QWidget,
     QVBoxLayout,
@@ -21,9 +24,29 @@ from PySide6.QtWidgets import (
     QHBoxLayout,
     QLineEdit,
     QCheckBox,
+    QSpinBox,
 )
+from ..utils.Background import FrameBackground
 from ..utils.InteractiveFrameViewer import InteractiveFrameViewer
-from ..utils.ParticleProcessing import apply_frame_view_processing
+from ..utils.ParticleIndex import FrameParticleIndex
+from ..utils.ParticleProcessing import (
+    _get_invert_setting,
+    apply_frame_view_processing,
+    extract_video_frames,
+    get_frame_annotation_color,
+)
+from ..utils.FrameStore import (
+    get_full_frame_size,
+    load_frame_level,
+    select_pyramid_factor,
+)
+
+
+def _view_key(view_opts):
+    """Annotation color cache key for a viewer display transform (None for the raw frame)."""
+    if not view_opts["greyscale"] and not view_opts["threshold_enabled"]:
+        return None
+    return tuple(sorted(view_opts.items()))
 
 
 class SaveFramesThread(QThread):
@@ -35,32 +58,115 @@ class SaveFramesThread(QThread):
         super().__init__()
         self.video_path = video_path
         self.output_folder = output_folder
-        self.cap = None
 
     def run(self):
-        """Extract frames from video and save them to disk"""
+        """Extract frames from video and save them to disk, along with their pyramid levels"""
         try:
-            self.cap = cv2.VideoCapture(self.video_path)
-            if not self.cap.isOpened():
-                return
+            total_frames = extract_video_frames(self.video_path, self.output_folder)
+            if total_frames is not None:
+                self.save_complete.emit(total_frames)
+        except Exception as e:
+            print(f"Error saving frames: {e}")
 
-            frame_idx = 0
-            while True:
-                ret, frame = self.cap.read()
-                if not ret:
-                    break
 
-                frame_path = os.path.join(self.output_folder, f"frame_{frame_idx:05d}.jpg")
-                cv2.imwrite(frame_path, frame)
-                frame_idx += 1
+class FramePlaybackThread(QThread):
+    """Decode-ahead thread that keeps a ring buffer of ready-to-display RGB frames"""
 
-            self.save_complete.emit(frame_idx)
+    def __init__(
+        self,
+        frames_folder,
+        start_frame,
+        total_frames,
+        factor,
+        view_opts,
+        invert=False,
+        buffer_size=8,
+    ):
+        super().__init__()
+        self.frames_folder = frames_folder
+        self.total_frames = total_frames
+        self.factor = factor
+        self.view_opts = view_opts
+        self.invert = invert
+        self.buffer_size = buffer_size
+        self._buffer = deque()
+        self._condition = threading.Condition()
+        self._next_frame = start_frame
+        self._min_frame = start_frame
+        self._stopped = False
 
-        except Exception as e:
-            print(f"Error saving frames: {e}")
-        finally:
-            if self.cap:
-                self.cap.release()
+    def run(self):
+        """Decode frames ahead of the player until stopped or the movie ends"""
+        while True:
+            with self._condition:
+                while not self._stopped and len(self._buffer) >= self.buffer_size:
+                    self._condition.wait(0.05)
+                if self._stopped or self._next_frame >= self.total_frames:
+                    return
+                frame_number = self._next_frame
+                self._next_frame += 1
+
+            image_bgr = load_frame_level(self.frames_folder, frame_number, self.factor)
+            if image_bgr is None:
+                continue
+            image_bgr = apply_frame_view_processing(
+                image_bgr,
+                greyscale=self.view_opts["greyscale"],
+                threshold_enabled=self.view_opts["threshold_enabled"],
+                threshold_percent=self.view_opts["threshold_percent"],
+                cache_key=(self.frames_folder, frame_number, self.factor),
+            )
+
+            annotation_color = get_frame_annotation_color(
+                frame_number,
+                self.invert,
+                image=image_bgr,
+                frames_folder=self.frames_folder,
+                view_key=_view_key(self.view_opts),
+            )
+            rgb = cv2.cvtColor(image_bgr, cv2.COLOR_BGR2RGB)
+            with self._condition:
+                # Drop the frame if the player already moved past it
+                if frame_number >= self._min_frame:
+                    self._buffer.append((frame_number, rgb, annotation_color))
+                self._condition.notify_all()
+
+    def take_frame(self, target_frame):
+        """
+        Take the newest buffered frame that is due for display.
+
+        Older frames in the buffer are dropped, and the decoder skips ahead when it
+        has fallen behind the target frame.
+
+        Parameters
+        ----------
+        target_frame : int
+            Frame that should be on screen now.
+
+        Returns
+        -------
+        tuple
+            ((frame_number, rgb_image, annotation_color) or None, number of dropped frames)
+        """
+        dropped = 0
+        result = None
+        with self._condition:
+            self._min_frame = max(self._min_frame, target_frame)
+            while self._buffer and self._buffer[0][0] <= target_frame:
+                if result is not None:
+                    dropped += 1
+                result = self._buffer.popleft()
+            if result is None and not self._buffer and self._next_frame < target_frame:
+                dropped += target_frame - self._next_frame
+                self._next_frame = target_frame
+            self._condition.notify_all()
+        return result, dropped
+
+    def stop(self):
+        """Ask the decoder to finish"""
+        with self._condition:
+            self._stopped = True
+            self._condition.notify_all()
 
 
 class DWFrameGalleryWidget(QWidget):
@@ -85,6 +191,7 @@ class DWFrameGalleryWidget(QWidget):
             self.original_frames_folder = config_manager.get_path("original_frames_folder")
             self.annotated_frames_folder = config_manager.get_path("annotated_frames_folder")
             self.update_feature_size()
+            self.frame_viewer.set_regions(config_manager.get_detection_roi())
 
     def update_feature_size(self):
         """Update feature size from config."""
@@ -109,10 +216,13 @@ class DWFrameGalleryWidget(QWidget):
         self.frame_viewer = InteractiveFrameViewer()
         self.frame_viewer.viewOptionsChanged.connect(self._on_view_options_changed)
         self.frame_viewer.particleClicked.connect(self._on_viewer_particle_click)
+        self.frame_viewer.pyramidLevelChanged.connect(self._on_pyramid_level_changed)
+        self.frame_viewer.regionsChanged.connect(self._on_regions_changed)
         layout.addWidget(self.frame_viewer, 1)
 
         viewer_hint = QLabel(
-            "Scroll to zoom, drag to pan. Right-click the frame for view options."
+            "Scroll to zoom, drag to pan. Right-click the frame for view options and "
+            "detection regions."
         )
         viewer_hint.setAlignment(Qt.AlignCenter)
         viewer_hint.setStyleSheet("color: #666; font-size: 11px;")
@@ -154,6 +264,27 @@ class DWFrameGalleryWidget(QWidget):
 
         layout.addLayout(nav_layout)
 
+        playback_layout = QHBoxLayout()
+        self.play_button = QPushButton("Play")
+        self.play_button.setToolTip("Play the movie at the target frame rate")
+        self.play_button.clicked.connect(self.toggle_playback)
+        playback_layout.addWidget(self.play_button)
+
+        playback_layout.addWidget(QLabel("FPS"))
+        self.fps_input = QSpinBox()
+        self.fps_input.setRange(1, 120)
+        self.fps_input.setValue(30)
+        playback_layout.addWidget(self.fps_input)
+
+        self.playback_status_label = QLabel("")
+        self.playback_status_label.setStyleSheet("color: #666; font-size: 11px;")
+        playback_layout.addWidget(self.playback_status_label, 1)
+        layout.addLayout(playback_layout)
+
+        self.playback_timer = QTimer(self)
+        self.playback_timer.setTimerType(Qt.PreciseTimer)
+        self.playback_timer.timeout.connect(self._on_playback_tick)
+
     def setup_variables(self):
         """Setup internal variables"""
         self.video_path = None
@@ -169,35 +300,84 @@ class DWFrameGalleryWidget(QWidget):
         self.scatter_highlight_info = None
         self._raw_frame_bgr = None
         self._raw_frame_number = None
+        self._raw_frame_factor = None
+        self._display_bgr = None
+        self._rendered_image_key = None
+        self._annotation_overlay_key = None
+        self._particle_indexes = {}
+        self.playback_thread = None
+        self._playback_start_time = 0.0
+        self._playback_start_frame = 0
+        self._playback_fps = 30
+        self._playback_dropped = 0
+        self._playback_full_size = None
+        self._playback_factor = 1
+
+    def _on_pyramid_level_changed(self, factor):
+        """Reload the current frame at the resolution the new zoom level needs."""
+        if self._raw_frame_bgr is not None and 0 <= self.current_frame_idx < self.total_frames:
+            self.display_frame(self.current_frame_idx, reset_view=False)
+
+    def _on_regions_changed(self, regions):
+        """Save edited detection regions; they apply from the next Find Particles run."""
+        if self.config_manager:
+            self.config_manager.save_detection_roi(regions)
 
     def _on_view_options_changed(self):
         if self._raw_frame_bgr is not None and 0 <= self.current_frame_idx < self.total_frames:
             self.display_frame(self.current_frame_idx, reset_view=False)
 
-    def _on_viewer_particle_click(self, x, y):
-        """Find the nearest particle on the current frame and sync to scatter plots."""
+    def _get_particle_index(self, filename):
+        """
+        Get the per-frame index for a particle file, rebuilding it only when the file changes.
+
+        Parameters
+        ----------
+        filename : str
+            Name of the particle file in the data folder.
+
+        Returns
+        -------
+        FrameParticleIndex or None
+            Index over the file's particles, or None if the file is missing or empty.
+        """
         if not self.file_controller:
-            return
+            return None
+        file_path = self.file_controller.get_data_file_path(filename)
+        self.file_controller.wait_for_write(file_path)
         try:
-            particles = self.file_controller.load_particles_data("all_particles.csv")
+            stat = os.stat(file_path)
+        except OSError:
+            self._particle_indexes.pop(filename, None)
+            return None
+
+        key = (stat.st_mtime_ns, stat.st_size)
+        cached = self._particle_indexes.get(filename)
+        if cached and cached[0] == key:
+            return cached[1]
+
+        try:
+            particles = self.file_controller.load_particles_data(filename)
         except Exception:
-            return
-        if particles.empty:
-            return
+            self._particle_indexes.pop(filename, None)
+            return None
+        index = None
+        if not particles.empty and {"frame", "x", "y"}.issubset(particles.columns):
+            index = FrameParticleIndex(particles)
+        self._particle_indexes[filename] = (key, index)
+        return index
 
-        frame_particles = particles[particles["frame"] == self.current_frame_idx]
-        if frame_particles.empty:
+    def _on_viewer_particle_click(self, x, y):
+        """Find the nearest particle on the current frame and sync to scatter plots."""
+        index = self._get_particle_index("all_particles.csv")
+        if index is None:
             return
 
         radius = max(self.feature_size / 1.5, 5.0)
-        dx = frame_particles["x"] - x
-        dy = frame_particles["y"] - y
-        dist_sq = dx * dx + dy * dy
-        nearest_idx = dist_sq.idxmin()
-        if float(dist_sq.loc[nearest_idx]) > radius * radius:
+        particle = index.nearest(self.current_frame_idx, x, y, radius)
+        if particle is None:
             return
 
-        particle = frame_particles.loc[nearest_idx].to_dict()
         self.scatter_highlight_info = {
             "frame": int(particle["frame"]),
             "x": float(particle["x"]),
@@ -205,13 +385,13 @@ class DWFrameGalleryWidget(QWidget):
         }
         if not self.annotate_toggle.isChecked():
             self.annotate_toggle.setChecked(True)
-        self.display_frame(self.current_frame_idx, reset_view=False)
+        self._update_overlays(self.current_frame_idx)
         self.particleClickedOnFrame.emit(particle)
 
-    def _load_frame_bgr(self, frame_path):
-        image = cv2.imread(frame_path)
+    def _load_frame_bgr(self, frame_number, factor=1):
+        image = load_frame_level(self.original_frames_folder, frame_number, factor)
         if image is None:
-            print(f"Warning: Failed to read frame: {frame_path}")
+            print(f"Warning: Failed to read frame: {frame_number}")
         return image
 
     @staticmethod
@@ -234,6 +414,7 @@ class DWFrameGalleryWidget(QWidget):
         self.total_frames = total_frames
         if self.total_frames > 0:
             self.frame_slider.setRange(0, self.total_frames - 1)
+        self._invalidate_frame_cache()
         self.display_frame(0)
         self.frames_saved.emit(self.total_frames)
 
@@ -245,6 +426,7 @@ class DWFrameGalleryWidget(QWidget):
             self.video_loaded = True
         else:
             self.video_loaded = False
+        self._invalidate_frame_cache()
         self.display_frame(0)
 
     def handle_gallery_update(self):
@@ -267,8 +449,11 @@ class DWFrameGalleryWidget(QWidget):
         self.display_frame(self.current_frame_idx, reset_view=False)
 
     def on_toggle_annotate(self, state):
-        """Handle annotation toggle state change."""
-        self.display_frame(self.current_frame_idx, reset_view=False)
+        """Handle annotation toggle state change by flipping the overlay layer."""
+        if self.playback_thread is not None:
+            self.frame_viewer.set_annotations_visible(self.annotate_toggle.isChecked())
+        elif self._rendered_image_key is not None:
+            self._update_overlays(self.current_frame_idx)
 
     def reload_from_disk(self):
         """Reload available frames from disk and display the current one."""
@@ -292,124 +477,177 @@ class DWFrameGalleryWidget(QWidget):
         else:
             self.current_frame_idx = 0
 
+        self._invalidate_frame_cache()
         self.display_frame(self.current_frame_idx)
         return self.total_frames
 
     def display_frame(self, frame_number, reset_view=None):
         """
-        Load the specified frame and overlays annotations and/or highlights.
+        Load the specified frame and update the annotation and highlight overlays.
 
-        Pan/zoom is preserved when refreshing the same frame (e.g. toggling
-        annotations). Changing frames resets the view to fit.
+        The image is only re-uploaded when the frame, pyramid level or view options
+        change; overlays are vector items on top of it. Pan/zoom is preserved when
+        refreshing the same frame. Changing frames resets the view to fit.
         """
+        if self.playback_thread is not None:
+            self.stop_playback()
+
         if reset_view is None:
             reset_view = frame_number != self._last_rendered_frame_idx
 
         if not (0 <= frame_number < self.total_frames):
             if self.total_frames == 0:
                 self.frame_viewer.set_message("No video loaded")
+                self._invalidate_frame_cache()
             self.update_frame_display()
             return
 
         self.current_frame_idx = frame_number
 
-        original_frame_path = os.path.join(
-            self.original_frames_folder, f"frame_{frame_number:05d}.jpg"
-        )
+        # Load the pyramid level matching the zoom the frame will be shown at
+        full_size = get_full_frame_size(self.original_frames_folder)
+        factor = 1
+        if full_size:
+            factor = select_pyramid_factor(
+                self.frame_viewer.get_display_scale(full_size, fit=reset_view)
+            )
+
         if (
             frame_number == self._raw_frame_number
+            and factor == self._raw_frame_factor
             and self._raw_frame_bgr is not None
         ):
             raw_bgr = self._raw_frame_bgr
         else:
-            raw_bgr = self._load_frame_bgr(original_frame_path)
+            raw_bgr = self._load_frame_bgr(frame_number, factor)
             if raw_bgr is None:
                 self.frame_viewer.set_message("Frame not found")
-                self._raw_frame_bgr = None
-                self._raw_frame_number = None
+                self._invalidate_frame_cache()
                 self.update_frame_display()
                 return
             self._raw_frame_bgr = raw_bgr
             self._raw_frame_number = frame_number
+            self._raw_frame_factor = factor
 
         view_opts = self.frame_viewer.get_view_options()
-        image_bgr = apply_frame_view_processing(
-            raw_bgr,
-            greyscale=view_opts["greyscale"],
-            threshold_enabled=view_opts["threshold_enabled"],
-            threshold_percent=view_opts["threshold_percent"],
-        )
+        render_key = (frame_number, factor, tuple(sorted(view_opts.items())))
+        if render_key != self._rendered_image_key:
+            self._display_bgr = apply_frame_view_processing(
+                raw_bgr,
+                greyscale=view_opts["greyscale"],
+                threshold_enabled=view_opts["threshold_enabled"],
+                threshold_percent=view_opts["threshold_percent"],
+                cache_key=(self.original_frames_folder, frame_number, factor),
+            )
+            self.frame_viewer.set_frame_image(
+                self._bgr_to_rgb(self._display_bgr),
+                reset_view=reset_view,
+                full_size=full_size,
+                factor=factor,
+            )
+            self._rendered_image_key = render_key
+        elif reset_view:
+            self.frame_viewer.reset_view()
+        self._last_rendered_frame_idx = frame_number
 
+        self._update_overlays(frame_number)
+
+        self.update_frame_display()
+        self.frame_changed.emit(frame_number)
+
+    def show_background(self):
+        """Show the stored background of the current frame in the viewer."""
+        if self.playback_thread is not None:
+            self.stop_playback()
+        background = FrameBackground.load(self.original_frames_folder)
+        image = background.for_frame(self.current_frame_idx) if background else None
+        if image is None:
+            self.frame_viewer.set_message("No background computed")
+        else:
+            self.frame_viewer.set_frame_image(
+                cv2.cvtColor(image, cv2.COLOR_GRAY2RGB),
+                reset_view=True,
+                full_size=(image.shape[1], image.shape[0]),
+            )
+            self.frame_viewer.clear_annotations()
+            self.frame_viewer.set_highlights([])
+            block = background.block_for_frame(self.current_frame_idx)
+            self.current_frame_label.setText(
+                f"Background of frames {block['first_frame'] + 1}-{block['last_frame'] + 1} "
+                "(change frame to return)"
+            )
+        # The next display_frame call uploads the frame again
+        self._invalidate_frame_cache()
+        self._last_rendered_frame_idx = None
+
+    def _invalidate_frame_cache(self):
+        """Forget the cached frame image and overlays so the next display reloads them."""
+        self._raw_frame_bgr = None
+        self._raw_frame_number = None
+        self._raw_frame_factor = None
+        self._rendered_image_key = None
+        self._annotation_overlay_key = None
+
+    def _update_overlays(self, frame_number):
+        """Update annotation and highlight overlays for a frame without redrawing the image."""
         show_annotations = self.annotate_toggle.isChecked()
-        highlight_info = None
+        self.frame_viewer.set_annotations_visible(show_annotations)
+        if show_annotations:
+            self._update_annotation_overlay(frame_number)
+
+        highlights = []
+        crop_size = 50
         if self.errant_particle_gallery and self.errant_particle_gallery.is_show_on_frame_checked():
             info = self.errant_particle_gallery.get_current_particle_info()
             if info and info.get("frame") == frame_number:
-                highlight_info = info
+                highlights.append((float(info["x"]), float(info["y"]), crop_size, (0, 0, 255)))
 
-        scatter_highlight = None
         if (
             self.scatter_highlight_info
             and self.scatter_highlight_info.get("frame") == frame_number
         ):
-            scatter_highlight = self.scatter_highlight_info
+            info = self.scatter_highlight_info
+            highlights.append((info["x"], info["y"], crop_size, (0, 200, 0)))
 
-        needs_annotation = (
-            show_annotations or highlight_info is not None or scatter_highlight is not None
-        )
+        self.frame_viewer.set_highlights(highlights)
 
-        if needs_annotation and self.file_controller:
-            if show_annotations:
-                particle_data = self.file_controller.load_particles_data("filtered_particles.csv")
-                if not particle_data.empty:
-                    particles_in_frame = particle_data[particle_data["frame"] == frame_number]
-                    if not particles_in_frame.empty:
-                        from ..utils.ParticleProcessing import (
-                            _get_invert_setting,
-                            calculate_optimal_annotation_color,
-                        )
-
-                        invert = _get_invert_setting()
-                        annotation_color = calculate_optimal_annotation_color(image_bgr, invert)
-
-                        for _, particle in particles_in_frame.iterrows():
-                            cv2.circle(
-                                image_bgr,
-                                (int(particle["x"]), int(particle["y"])),
-                                int(self.feature_size / 1.5),
-                                annotation_color,
-                                2,
-                            )
-
-            if highlight_info:
-                x, y = int(highlight_info["x"]), int(highlight_info["y"])
-                crop_radius = 25
-                cv2.rectangle(
-                    image_bgr,
-                    (x - crop_radius, y - crop_radius),
-                    (x + crop_radius, y + crop_radius),
-                    (255, 0, 0),
-                    3,
-                )
-
-            if scatter_highlight:
-                x, y = int(scatter_highlight["x"]), int(scatter_highlight["y"])
-                crop_radius = 25
-                cv2.rectangle(
-                    image_bgr,
-                    (x - crop_radius, y - crop_radius),
-                    (x + crop_radius, y + crop_radius),
-                    (0, 200, 0),
-                    3,
-                )
-
-        self.frame_viewer.set_frame_image(
-            self._bgr_to_rgb(image_bgr), reset_view=reset_view
-        )
-        self._last_rendered_frame_idx = frame_number
+    def _update_annotation_overlay(self, frame_number, annotation_color=None):
+        """
+        Feed the viewer's annotation layer with the frame's filtered particle positions.
+
+        Parameters
+        ----------
+        frame_number : int
+            Frame to annotate.
+        annotation_color : tuple, optional
+            BGR color. If None, it is chosen for contrast with the displayed frame.
+        """
+        index = self._get_particle_index("filtered_particles.csv")
+        # The file stamp the index was built from (object ids are reused once freed)
+        index_stamp = self._particle_indexes.get("filtered_particles.csv", (None,))[0]
+        overlay_key = (frame_number, index_stamp, self._rendered_image_key, self.feature_size)
+        if annotation_color is None and overlay_key == self._annotation_overlay_key:
+            return
+        self._annotation_overlay_key = overlay_key
 
-        self.update_frame_display()
-        self.frame_changed.emit(frame_number)
+        if index is None:
+            self.frame_viewer.clear_annotations()
+            return
+        xs, ys = index.positions(frame_number)
+        if len(xs) == 0:
+            self.frame_viewer.clear_annotations()
+            return
+
+        if annotation_color is None:
+            annotation_color = get_frame_annotation_color(
+                frame_number,
+                _get_invert_setting(),
+                image=self._display_bgr,
+                frames_folder=self.original_frames_folder,
+                view_key=_view_key(self.frame_viewer.get_view_options()),
+            )
+        b, g, r = annotation_color
+        self.frame_viewer.set_annotations(xs, ys, 2 * self.feature_size / 1.5, (r, g, b))
 
     def highlight_particle(self, particle_info):
         """Jump to and highlight a particle selected from a scatter plot."""
@@ -471,3 +709,94 @@ class DWFrameGalleryWidget(QWidget):
         """Go to frame specified by slider"""
         if value != self.current_frame_idx:
             self.display_frame(value)
+
+    def hideEvent(self, event):
+        """Stop playback when the player is hidden (e.g. switching windows)."""
+        self.stop_playback()
+        super().hideEvent(event)
+
+    def toggle_playback(self):
+        """Start or pause real-time playback"""
+        if self.playback_thread is not None:
+            self.stop_playback()
+        else:
+            self.start_playback()
+
+    def start_playback(self):
+        """Start playing from the current frame at the target fps."""
+        if self.total_frames <= 1:
+            return
+        start_frame = self.current_frame_idx
+        if start_frame >= self.total_frames - 1:
+            start_frame = 0
+
+        full_size = get_full_frame_size(self.original_frames_folder)
+        factor = 1
+        if full_size:
+            factor = select_pyramid_factor(self.frame_viewer.get_display_scale(full_size))
+
+        self.scatter_highlight_info = None
+        self._playback_fps = self.fps_input.value()
+        self._playback_start_frame = start_frame
+        self._playback_start_time = time.perf_counter()
+        self._playback_dropped = 0
+        self._playback_full_size = full_size
+        self._playback_factor = factor
+        self.frame_viewer.set_highlights([])
+
+        self.playback_thread = FramePlaybackThread(
+            self.original_frames_folder,
+            start_frame,
+            self.total_frames,
+            factor,
+            self.frame_viewer.get_view_options(),
+            invert=_get_invert_setting(),
+            buffer_size=max(4, self._playback_fps // 4),
+        )
+        self.playback_thread.start()
+        self.playback_timer.start(max(1, int(1000 / self._playback_fps)))
+        self.play_button.setText("Pause")
+
+    def stop_playback(self):
+        """Pause playback and leave the last shown frame on screen."""
+        thread = self.playback_thread
+        if thread is None:
+            return
+        self.playback_thread = None
+        self.playback_timer.stop()
+        thread.stop()
+        thread.wait()
+        self.play_button.setText("Play")
+        self._invalidate_frame_cache()
+        self.frame_changed.emit(self.current_frame_idx)
+
+    def _on_playback_tick(self):
+        """Show the frame that is due now, dropping any the decoder could not deliver in time."""
+        thread = self.playback_thread
+        if thread is None:
+            return
+        elapsed = time.perf_counter() - self._playback_start_time
+        target = self._playback_start_frame + int(elapsed * self._playback_fps)
+        last_frame = self.total_frames - 1
+        target = min(target, last_frame)
+
+        item, dropped = thread.take_frame(target)
+        self._playback_dropped += dropped
+        if item is not None:
+            frame_number, rgb, annotation_color = item
+            self.current_frame_idx = frame_number
+            self.frame_viewer.set_frame_image(
+                rgb,
+                reset_view=False,
+                full_size=self._playback_full_size,
+                factor=self._playback_factor,
+            )
+            self._last_rendered_frame_idx = frame_number
+            if self.annotate_toggle.isChecked():
+                self._update_annotation_overlay(frame_number, annotation_color)
+            self.update_frame_display()
+            self.playback_status_label.setText(f"Dropped frames: {self._playback_dropped}")
+            if frame_number >= last_frame:
+                self.stop_playback()
+        elif not thread.isRunning() and target >= last_frame:
+            self.stop_playback()
@@ -10,10 +10,7 @@ Date: 2025-12-08
 """
 
 import os
-import configparser
 import pandas as pd
-import uuid
-from dataclasses import dataclass
 from typing import List, Optional, Callable
 from PySide6.QtWidgets import (
     QWidget,
@@ -30,50 +27,21 @@ from PySide6.QtWidgets import (
     QFrame,
     QApplication,
 )
-from PySide6.QtCore import Qt, Signal
+from PySide6.QtCore import Qt, Signal, QThread, QTimer
 from PySide6.QtGui import QFont
-
-
-@dataclass
-class Filter:
-    """Data class representing a single filter."""
-
-    parameter: str
-    operator: str
-    value: float
-    filter_id: str = None  # Unique ID for this filter
-
-    def __post_init__(self):
-        """
-        Initialize filter_id if not provided.
-
-        Returns
-        -------
-        None
-        """
-        if self.filter_id is None:
-            self.filter_id = str(uuid.uuid4())[:8]
-
-
-@dataclass
-class CompoundFilter:
-    """Data class representing a compound filter with two filters and an operator."""
-
-    filter1: Filter
-    filter2: Filter
-    operator: str  # "AND", "OR", "XOR"
-    filter_id: str = None  # Unique ID for this compound filter
-
-    def __post_init__(self):
-        """
-        Initialize filter_id if not provided.
-
-        Returns
-        -------
-        None
-        """
-        if self.filter_id is None:
-            self.filter_id = str(uuid.uuid4())[:8]
+from ..utils.FilterEngine import (
+    CompoundFilter,
+    Filter,
+    FilterEngine,
+    apply_filters,
+    apply_single_filter,
+    compute_filter_pass_mask,
+    read_filters_ini,
+    select_passing_rows,
+    write_filters_ini,
+)
+from ..utils.ParticleIndex import GroupedRowIndex
+from ..utils.TrajectorySummary import compute_trajectory_summary, summary_matches
 
 
 class FilterCreatorDialog(QDialog):
@@ -434,11 +402,47 @@ class CompoundFilterCard(QFrame):
         self.on_changed()
 
 
+class ApplyFiltersThread(QThread):
+    """Thread that selects the passing rows and writes the filtered data file."""
+
+    applied = Signal(int, int, str)  # original count, filtered count, output path
+
+    def __init__(self, file_controller, data, mask, source_data_file):
+        super().__init__()
+        self.file_controller = file_controller
+        self.data = data
+        self.mask = mask
+        self.source_data_file = source_data_file
+
+    def run(self):
+        """Filter and save off the GUI thread."""
+        try:
+            if self.data.empty:
+                filtered_data = pd.DataFrame()
+            else:
+                filtered_data = select_passing_rows(self.data, self.mask)
+            if self.source_data_file == "trajectories.csv":
+                output_path = self.file_controller.save_trajectories_data(
+                    filtered_data, "trajectories.csv"
+                )
+            else:
+                output_path = self.file_controller.save_filtered_particles_data(
+                    filtered_data, "filtered_particles.csv"
+                )
+            self.applied.emit(len(self.data), len(filtered_data), output_path)
+        except Exception as e:
+            print(f"Error applying filters: {e}")
+            self.applied.emit(len(self.data), -1, "")
+
+
 class DWLWFilteringWidget(QWidget):
     """Widget for managing particle data filters."""
 
     filteredParticlesUpdated = Signal()
 
+    # Edits arriving within this many milliseconds are coalesced into one apply
+    APPLY_DEBOUNCE_MS = 400
+
     def __init__(self, source_data_file: str = "all_particles.csv", parent=None):
         """
         Initialize the filtering widget.
@@ -471,6 +475,18 @@ class DWLWFilteringWidget(QWidget):
             "raw_mass",
             "ep",
         ]
+        # Source data is kept between edits so cached filter masks stay valid
+        self.filter_engine = FilterEngine()
+        self._source_data = None
+        self._source_data_key = None
+        # Trajectory filters are evaluated per particle and expanded to rows with this index
+        self._trajectory_rows = None
+        self._apply_thread = None
+        self._apply_pending = False
+        self._apply_timer = QTimer(self)
+        self._apply_timer.setSingleShot(True)
+        self._apply_timer.setInterval(self.APPLY_DEBOUNCE_MS)
+        self._apply_timer.timeout.connect(self._start_background_apply)
         self.setup_ui()
 
     def set_file_controller(self, file_controller):
@@ -506,6 +522,8 @@ class DWLWFilteringWidget(QWidget):
         None
         """
         self.source_data_file = filename
+        self._source_data = None
+        self._source_data_key = None
 
     def setup_ui(self):
         """
@@ -593,13 +611,11 @@ class DWLWFilteringWidget(QWidget):
         if not self.file_controller:
             return
         try:
-            # Use source_data_file to determine which file to load
-            if self.source_data_file == "trajectories.csv":
-                data = self.file_controller.load_trajectories_data(self.source_data_file)
-            else:
-                data = self.file_controller.load_particles_data(self.source_data_file)
+            # Trajectory filters choose from the summary columns (length, mean_speed, ...)
+            self._load_source_data()
+            data = self.filter_engine.data
 
-            if not data.empty:
+            if data is not None and not data.empty:
                 numeric_cols = data.select_dtypes(include=["number"]).columns.tolist()
                 if numeric_cols:
                     self.available_parameters = numeric_cols
@@ -670,8 +686,7 @@ class DWLWFilteringWidget(QWidget):
         """
         self.filters.append(filter_obj)
         self.update_filter_cards_ui()
-        self.save_filters_to_disk()
-        self.apply_filters_and_notify()
+        self.schedule_apply()
 
     def add_compound_filter(self, compound_filter_obj: CompoundFilter):
         """
@@ -688,8 +703,7 @@ class DWLWFilteringWidget(QWidget):
         """
         self.compound_filters.append(compound_filter_obj)
         self.update_filter_cards_ui()
-        self.save_filters_to_disk()
-        self.apply_filters_and_notify()
+        self.schedule_apply()
 
     def remove_filter(self, filter_id: str):
         """
@@ -706,8 +720,7 @@ class DWLWFilteringWidget(QWidget):
         """
         self.filters = [f for f in self.filters if f.filter_id != filter_id]
         self.update_filter_cards_ui()
-        self.save_filters_to_disk()
-        self.apply_filters_and_notify()
+        self.schedule_apply()
 
     def remove_compound_filter(self, filter_id: str):
         """
@@ -724,13 +737,82 @@ class DWLWFilteringWidget(QWidget):
         """
         self.compound_filters = [f for f in self.compound_filters if f.filter_id != filter_id]
         self.update_filter_cards_ui()
-        self.save_filters_to_disk()
-        self.apply_filters_and_notify()
+        self.schedule_apply()
 
     def on_filter_edited(self):
         """Persist and apply filters after inline edits."""
+        self.schedule_apply()
+
+    def schedule_apply(self):
+        """
+        Update the live pass counts now and apply filters once edits stop.
+
+        The counts come from the cached per-filter masks. Writing the filtered file and
+        the downstream refreshes (plots, errant crops, re-linking) run in the background
+        after the debounce interval, so a burst of edits triggers them only once.
+
+        Returns
+        -------
+        None
+        """
         self.save_filters_to_disk()
-        self.apply_filters_and_notify()
+        self.update_live_counts()
+        self._apply_timer.start()
+
+    def update_live_counts(self):
+        """
+        Refresh the kept / removed labels from the in-memory filter masks.
+
+        Returns
+        -------
+        None
+        """
+        if not self.file_controller:
+            return
+        data = self._load_source_data()
+        if data.empty:
+            self.update_particle_labels(0, 0)
+            return
+        kept = int(self.get_pass_mask().sum())
+        self.update_particle_labels(len(data), kept)
+
+    def _start_background_apply(self):
+        """Save the filters and write the filtered file on a worker thread."""
+        if not self.file_controller:
+            return
+        if self._apply_thread is not None and self._apply_thread.isRunning():
+            self._apply_pending = True
+            return
+
+        data = self._load_source_data()
+        mask = self.get_pass_mask() if not data.empty else None
+        self._apply_thread = ApplyFiltersThread(
+            self.file_controller, data, mask, self.source_data_file
+        )
+        self._apply_thread.applied.connect(self._on_background_apply_finished)
+        self._apply_thread.start()
+
+    def _on_background_apply_finished(self, original_count, filtered_count, output_path):
+        """Notify listeners, or start again if more edits arrived while the worker ran."""
+        if self._apply_pending:
+            self._apply_pending = False
+            self._start_background_apply()
+            return
+        if filtered_count < 0:
+            return
+        print(f"Saved filtered data to: {output_path}")
+        print(f"  Original: {original_count} particles")
+        print(f"  Filtered: {filtered_count} particles")
+        self.update_particle_labels(original_count, filtered_count)
+        self.filteredParticlesUpdated.emit()
+
+    def _wait_for_background_apply(self):
+        """Cancel any scheduled apply and wait for a running one to finish."""
+        self._apply_timer.stop()
+        self._apply_pending = False
+        if self._apply_thread is not None and self._apply_thread.isRunning():
+            self._apply_thread.applied.disconnect(self._on_background_apply_finished)
+            self._apply_thread.wait()
 
     def update_filter_cards_ui(self):
         """
@@ -788,25 +870,8 @@ class DWLWFilteringWidget(QWidget):
         ini_path = self.get_filters_ini_path()
         if not ini_path:
             return
-        config = configparser.ConfigParser()
-        # Create sections for filters and compound filters
-        config["filters"] = {}
-        for filter_obj in self.filters:
-            # Storing as a list of strings, e.g., "mass,>,100.0"
-            value_str = f"{filter_obj.parameter},{filter_obj.operator},{filter_obj.value}"
-            config["filters"][filter_obj.filter_id] = value_str
-
-        config["compound_filters"] = {}
-        for compound_filter_obj in self.compound_filters:
-            f1 = compound_filter_obj.filter1
-            f2 = compound_filter_obj.filter2
-            # Store as: "param1,op1,val1|param2,op2,val2|operator"
-            value_str = f"{f1.parameter},{f1.operator},{f1.value}|{f2.parameter},{f2.operator},{f2.value}|{compound_filter_obj.operator}"
-            config["compound_filters"][compound_filter_obj.filter_id] = value_str
-
         try:
-            with open(ini_path, "w") as f:
-                config.write(f)
+            write_filters_ini(ini_path, self.filters, self.compound_filters)
         except Exception as e:
             print(f"Error saving filters to disk: {e}")
 
@@ -826,48 +891,8 @@ class DWLWFilteringWidget(QWidget):
             self.apply_filters_and_notify()  # Apply filters after loading (even if empty)
             return
 
-        config = configparser.ConfigParser()
         try:
-            config.read(ini_path)
-            self.filters = []
-            self.compound_filters = []
-
-            if "filters" in config:
-                for filter_id, value_str in config["filters"].items():
-                    parts = value_str.split(",")
-                    if len(parts) == 3:
-                        param, op, val = parts
-                        filter_obj = Filter(
-                            parameter=param, operator=op, value=float(val), filter_id=filter_id
-                        )
-                        self.filters.append(filter_obj)
-
-            if "compound_filters" in config:
-                for compound_filter_id, value_str in config["compound_filters"].items():
-                    parts = value_str.split("|")
-                    if len(parts) == 3:
-                        filter1_str, filter2_str, compound_op = parts
-                        f1_parts = filter1_str.split(",")
-                        f2_parts = filter2_str.split(",")
-                        if len(f1_parts) == 3 and len(f2_parts) == 3:
-                            f1 = Filter(
-                                parameter=f1_parts[0],
-                                operator=f1_parts[1],
-                                value=float(f1_parts[2]),
-                            )
-                            f2 = Filter(
-                                parameter=f2_parts[0],
-                                operator=f2_parts[1],
-                                value=float(f2_parts[2]),
-                            )
-                            compound_filter_obj = CompoundFilter(
-                                filter1=f1,
-                                filter2=f2,
-                                operator=compound_op,
-                                filter_id=compound_filter_id,
-                            )
-                            self.compound_filters.append(compound_filter_obj)
-
+            self.filters, self.compound_filters = read_filters_ini(ini_path)
             self.update_filter_cards_ui()
             self.apply_filters_and_notify()  # Apply filters after loading
         except Exception as e:
@@ -881,6 +906,7 @@ class DWLWFilteringWidget(QWidget):
         -------
         None
         """
+        self._wait_for_background_apply()
         self.apply_filters()
         self.filteredParticlesUpdated.emit()
 
@@ -899,11 +925,89 @@ class DWLWFilteringWidget(QWidget):
         -------
         None
         """
+        removed_count = all_particle_count - filtered_particle_count
         self.total_particles_label.setText(f"Particles Found: {all_particle_count}")
         self.particles_after_filter_label.setText(
-            f"Particles After Filter(s): {filtered_particle_count}"
+            f"Particles After Filter(s): {filtered_particle_count} ({removed_count} removed)"
         )
 
+    def _load_source_data(self) -> pd.DataFrame:
+        """
+        Load the source data file, reusing the in-memory copy while the file is unchanged.
+
+        Returns
+        -------
+        pd.DataFrame
+            Source data (empty if the file is missing).
+        """
+        file_path = self.file_controller.get_data_file_path(self.source_data_file)
+        self.file_controller.wait_for_write(file_path)
+        try:
+            stat = os.stat(file_path)
+            key = (file_path, stat.st_mtime_ns, stat.st_size)
+        except OSError:
+            key = None
+
+        if key is None or key != self._source_data_key or self._source_data is None:
+            # For trajectories, use load_trajectories_data, for particles use load_particles_data
+            if self.source_data_file == "trajectories.csv":
+                data = self.file_controller.load_trajectories_data(self.source_data_file)
+            else:
+                data = self.file_controller.load_particles_data(self.source_data_file)
+            self._source_data = data
+            self._source_data_key = key
+            if self.source_data_file == "trajectories.csv":
+                self._bind_trajectory_summary(data)
+            else:
+                self._trajectory_rows = None
+                self.filter_engine.set_data(data)
+        return self._source_data
+
+    def _bind_trajectory_summary(self, trajectories: pd.DataFrame):
+        """
+        Evaluate filters against the per-trajectory summary of ``trajectories``.
+
+        The summary saved by the last linking run is reused when it was computed from
+        the source file as it is now and matches its particle ids; otherwise it is
+        recomputed in memory from ``trajectories``.
+
+        Parameters
+        ----------
+        trajectories : pd.DataFrame
+            Trajectory rows being filtered.
+
+        Returns
+        -------
+        None
+        """
+        self._trajectory_rows = GroupedRowIndex(trajectories, "particle")
+        summary = self.file_controller.load_trajectory_summary()
+        source_path = self.file_controller.get_data_file_path(self.source_data_file)
+        if not summary_matches(summary, self._trajectory_rows.keys, source_path):
+            summary = compute_trajectory_summary(trajectories)
+        self.filter_engine.set_data(summary)
+
+    def get_pass_mask(self):
+        """
+        Boolean mask of source rows passing the current filters.
+
+        For trajectories.csv the filters apply to the per-trajectory summary, so a
+        trajectory's rows are kept or removed together. Only filters whose definition
+        changed since the last call are re-evaluated.
+
+        Returns
+        -------
+        np.ndarray
+            One entry per row of the source data.
+        """
+        if self.file_controller and self._source_data is None:
+            self._load_source_data()
+        mask = self.filter_engine.evaluate(self.filters, self.compound_filters)
+        if self._trajectory_rows is not None:
+            # Whole trajectories pass or fail together
+            mask = self._trajectory_rows.expand_key_mask(mask)
+        return mask
+
     def apply_filters(self) -> Optional[pd.DataFrame]:
         """
         Apply all filters to the source data file.
@@ -918,18 +1022,16 @@ class DWLWFilteringWidget(QWidget):
             return None
         # Use source_data_file to determine which file to load
         # For trajectories, use load_trajectories_data, for particles use load_particles_data
+        data = self._load_source_data()
         if self.source_data_file == "trajectories.csv":
-            data = self.file_controller.load_trajectories_data(self.source_data_file)
             output_filename = "trajectories.csv"
         else:
-            # Default to particles
-            data = self.file_controller.load_particles_data(self.source_data_file)
             output_filename = "filtered_particles.csv"
 
         if data.empty:
             filtered_data = pd.DataFrame()
         else:
-            filtered_data = apply_filters(data, self.filters, self.compound_filters)
+            filtered_data = select_passing_rows(data, self.get_pass_mask())
 
         # Use FileController to save filtered data
         if self.source_data_file == "trajectories.csv":
@@ -947,110 +1049,3 @@ class DWLWFilteringWidget(QWidget):
         print(f"  Filtered: {len(filtered_data)} particles")
         self.update_particle_labels(original_count, len(filtered_data))
         return filtered_data
-
-
-def compute_filter_pass_mask(
-    df: pd.DataFrame, filters: List[Filter], compound_filters: List[CompoundFilter] = None
-) -> pd.Series:
-    """Return a boolean mask (aligned to df.index) for rows that pass all filters."""
-    if df.empty:
-        return pd.Series(dtype=bool)
-    if not filters and (not compound_filters or len(compound_filters) == 0):
-        return pd.Series(True, index=df.index)
-    filtered = apply_filters(df, filters, compound_filters or [])
-    return pd.Series(df.index.isin(filtered.index), index=df.index)
-
-
-def apply_single_filter(df: pd.DataFrame, filter_obj: Filter) -> pd.Series:
-    """
-    Apply a single filter and return a boolean mask.
-
-    Parameters
-    ----------
-    df : pd.DataFrame
-        DataFrame to filter.
-    filter_obj : Filter
-        Filter object containing parameter, operator, and value.
-
-    Returns
-    -------
-    pd.Series
-        Boolean mask indicating which rows pass the filter.
-    """
-    parameter = filter_obj.parameter
-    operator = filter_obj.operator
-    value = filter_obj.value
-    if parameter not in df.columns:
-        print(f"Warning: Parameter '{parameter}' not found in data. Skipping filter.")
-        return pd.Series([False] * len(df), index=df.index)
-    try:
-        if operator == "<":
-            return df[parameter] < value
-        elif operator == "<=":
-            return df[parameter] <= value
-        elif operator == ">":
-            return df[parameter] > value
-        elif operator == ">=":
-            return df[parameter] >= value
-        elif operator == "==":
-            return df[parameter] == value
-        elif operator == "!=":
-            return df[parameter] != value
-        else:
-            print(f"Warning: Unknown operator '{operator}'. Skipping filter.")
-            return pd.Series([False] * len(df), index=df.index)
-    except Exception as e:
-        print(f"Error applying filter {parameter} {operator} {value}: {e}")
-        return pd.Series([False] * len(df), index=df.index)
-
-
-def apply_filters(
-    df: pd.DataFrame, filters: List[Filter], compound_filters: List[CompoundFilter] = None
-) -> pd.DataFrame:
-    """
-    Apply a list of filters and compound filters to a DataFrame.
-
-    Parameters
-    ----------
-    df : pd.DataFrame
-        DataFrame to filter.
-    filters : List[Filter]
-        List of simple filters (all are ANDed together).
-    compound_filters : List[CompoundFilter], optional
-        List of compound filters. Each is applied independently and ANDed with previous results.
-
-    Returns
-    -------
-    pd.DataFrame
-        Filtered DataFrame.
-    """
-    if not filters and (not compound_filters or len(compound_filters) == 0):
-        return df.copy()
-    filtered_df = df.copy()
-
-    # Apply simple filters (all are ANDed together)
-    for filter_obj in filters:
-        mask = apply_single_filter(filtered_df, filter_obj)
-        filtered_df = filtered_df[mask]
-
-    # Apply compound filters (each compound filter is applied independently, ANDed with previous results)
-    if compound_filters:
-        for compound_filter_obj in compound_filters:
-            mask1 = apply_single_filter(filtered_df, compound_filter_obj.filter1)
-            mask2 = apply_single_filter(filtered_df, compound_filter_obj.filter2)
-
-            if compound_filter_obj.operator == "AND":
-                combined_mask = mask1 & mask2
-            elif compound_filter_obj.operator == "OR":
-                combined_mask = mask1 | mask2
-            elif compound_filter_obj.operator == "XOR":
-                combined_mask = mask1 ^ mask2
-            else:
-                print(
-                    f"Warning: Unknown compound operator '{compound_filter_obj.operator}'. Skipping compound filter."
-                )
-                continue
-
-            filtered_df = filtered_df[combined_mask]
-
-    return filtered_df
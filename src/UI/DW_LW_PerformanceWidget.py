@@ -0,0 +1,179 @@
+"""
+Performance Widget Module
+
+Description: Collapsible "Performance" panel shared by the detection and linking windows.
+             Lists the pipeline stages recorded by the instrumentation layer (nested
+             stages under the run that contained them) with their durations, counters,
+             peak memory and memory budget warnings, as they finish.
+
+Copyright (c) 2025, Jacqueline Reynaga, Kevin Pillsbury, Bakir Husremovic
+License: BSD 3-Clause License
+Date: 2025-12-08
+"""
+
+from PySide6.QtWidgets import (
+    QWidget,
+    QVBoxLayout,
+    QHBoxLayout,
+    QToolButton,
+    QPushButton,
+    QTreeWidget,
+    QTreeWidgetItem,
+)
+from PySide6.QtCore import Qt, Signal
+from PySide6.QtGui import QBrush, QColor
+from ..utils.Instrumentation import instrumentation
+from ..utils.MemoryMonitor import MB
+
+
+def _format_seconds(seconds):
+    if seconds is None:
+        return ""
+    if seconds < 1:
+        return f"{seconds * 1000:.0f} ms"
+    return f"{seconds:.2f} s"
+
+
+def _format_counts(record):
+    parts = [f"{key}={value}" for key, value in record.counts.items()]
+    if record.rss_peak is not None:
+        memory = f"peak RSS {record.rss_peak / MB:.0f} MB"
+        if record.rss_start is not None:
+            memory += f" ({(record.rss_peak - record.rss_start) / MB:+.0f} MB)"
+        parts.append(memory)
+    if record.traced_peak is not None:
+        parts.append(f"traced peak {record.traced_peak / MB:.0f} MB")
+    parts.extend(record.warnings)
+    if record.error:
+        parts.append(f"error: {record.error}")
+    return ", ".join(parts)
+
+
+class DWLWPerformanceWidget(QWidget):
+    """Collapsible list of recent pipeline stage timings."""
+
+    MAX_RUNS = 200
+
+    # Stage records arrive on whichever thread ran the stage; the signal moves them
+    # to the GUI thread
+    recordFinished = Signal(object)
+
+    def __init__(self, parent=None):
+        """
+        Initialize the performance panel (collapsed).
+
+        Parameters
+        ----------
+        parent : QWidget, optional
+            Parent widget. Defaults to None.
+
+        Returns
+        -------
+        None
+        """
+        super().__init__(parent)
+        # thread name -> [(record, item)] of finished stages whose parent is still running
+        self._pending_children = {}
+        self.setup_ui()
+
+        self.recordFinished.connect(self._add_record)
+        for record in list(instrumentation.records):
+            self._add_record(record)
+
+        listener = self._listener = self.recordFinished.emit
+        instrumentation.add_listener(listener)
+        self.destroyed.connect(lambda *args: instrumentation.remove_listener(listener))
+
+    def dispose(self):
+        """
+        Stop receiving stage records (call when the owning window is closed).
+
+        Closed windows are not always deleted, so this cannot wait for ``destroyed``.
+
+        Returns
+        -------
+        None
+        """
+        if self._listener is not None:
+            instrumentation.remove_listener(self._listener)
+            self._listener = None
+
+    def setup_ui(self):
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(10, 5, 10, 5)
+        layout.setSpacing(5)
+
+        header_layout = QHBoxLayout()
+        self.toggle_button = QToolButton()
+        self.toggle_button.setText("Performance")
+        self.toggle_button.setCheckable(True)
+        self.toggle_button.setChecked(False)
+        self.toggle_button.setToolButtonStyle(Qt.ToolButtonTextBesideIcon)
+        self.toggle_button.setArrowType(Qt.RightArrow)
+        self.toggle_button.setStyleSheet("QToolButton { border: none; font-weight: bold; }")
+        self.toggle_button.toggled.connect(self._set_expanded)
+        header_layout.addWidget(self.toggle_button)
+        header_layout.addStretch()
+
+        self.clear_button = QPushButton("Clear")
+        self.clear_button.clicked.connect(self.clear)
+        self.clear_button.setVisible(False)
+        header_layout.addWidget(self.clear_button)
+        layout.addLayout(header_layout)
+
+        self.tree = QTreeWidget()
+        self.tree.setColumnCount(3)
+        self.tree.setHeaderLabels(["Stage", "Time", "Details"])
+        self.tree.setRootIsDecorated(True)
+        self.tree.setMinimumHeight(150)
+        self.tree.setVisible(False)
+        layout.addWidget(self.tree)
+
+    def _set_expanded(self, expanded):
+        self.toggle_button.setArrowType(Qt.DownArrow if expanded else Qt.RightArrow)
+        self.tree.setVisible(expanded)
+        self.clear_button.setVisible(expanded)
+
+    def _add_record(self, record):
+        item = QTreeWidgetItem(
+            [record.name, _format_seconds(record.seconds), _format_counts(record)]
+        )
+        item.setTextAlignment(1, Qt.AlignRight | Qt.AlignVCenter)
+        item.setToolTip(0, f"{record.started_at} on {record.thread}")
+        item.setToolTip(2, _format_counts(record))
+        if record.warnings or record.error:
+            for column in range(self.tree.columnCount()):
+                item.setForeground(column, QBrush(QColor("#b00020")))
+
+        pending = self._pending_children.setdefault(record.thread, [])
+        children = [child for child in pending if child[0].parent == record.name]
+        for child in children:
+            pending.remove(child)
+            item.addChild(child[1])
+
+        if record.parent:
+            pending.append((record, item))
+            return
+
+        # Newest run first
+        self.tree.insertTopLevelItem(0, item)
+        while self.tree.topLevelItemCount() > self.MAX_RUNS:
+            self.tree.takeTopLevelItem(self.tree.topLevelItemCount() - 1)
+        self.toggle_button.setText(
+            f"Performance: {record.name} {_format_seconds(record.seconds)}"
+        )
+        for column in range(self.tree.columnCount() - 1):
+            self.tree.resizeColumnToContents(column)
+
+    def clear(self):
+        """
+        Remove every listed stage (the performance log on disk is kept).
+
+        Returns
+        -------
+        None
+        """
+        self.tree.clear()
+        self._pending_children.clear()
+        instrumentation.records.clear()
+        self.toggle_button.setText("Performance")
@@ -0,0 +1,432 @@
+"""
+Detection Parameter Sweep Dialog
+
+Description: Dialog for sweeping feature size, min mass and threshold over ranges on a
+             sample of frames in parallel. Results are shown as a sortable table and a
+             heatmap (feature size x min mass, one threshold at a time) of the chosen
+             metric; the selected combination can be applied to the project config.
+
+Copyright (c) 2025, Jacqueline Reynaga, Kevin Pillsbury, Bakir Husremovic
+License: BSD 3-Clause License
+Date: 2025-12-08
+"""
+
+import os
+
+import numpy as np
+import pyqtgraph as pg
+from PySide6.QtCore import Qt, QThread, Signal
+from PySide6.QtWidgets import (
+    QAbstractItemView,
+    QComboBox,
+    QDialog,
+    QDoubleSpinBox,
+    QGridLayout,
+    QHBoxLayout,
+    QHeaderView,
+    QLabel,
+    QMessageBox,
+    QProgressBar,
+    QPushButton,
+    QSpinBox,
+    QSplitter,
+    QTableWidget,
+    QTableWidgetItem,
+    QVBoxLayout,
+    QWidget,
+)
+
+from ..utils.ParameterSweep import (
+    DEFAULT_SAMPLE_FRAMES,
+    LARGE_SWEEP,
+    parameter_grid,
+    run_detection_sweep,
+    sample_frames,
+    value_range,
+)
+
+# (column, header, format)
+RESULT_COLUMNS = [
+    ("feature_size", "Feature size", "{:.0f}"),
+    ("min_mass", "Min mass", "{:g}"),
+    ("threshold", "Threshold", "{:g}"),
+    ("particles_per_frame", "Particles/frame", "{:.1f}"),
+    ("mass_median", "Mass median", "{:.0f}"),
+    ("mass_p10", "Mass p10", "{:.0f}"),
+    ("mass_p90", "Mass p90", "{:.0f}"),
+    ("subpixel_bias", "Subpixel bias", "{:.3f}"),
+    ("seconds", "Time (s)", "{:.2f}"),
+]
+HEATMAP_METRICS = [
+    ("particles_per_frame", "Particles/frame"),
+    ("mass_median", "Mass median"),
+    ("subpixel_bias", "Subpixel bias (lower is better)"),
+]
+
+
+class NumericItem(QTableWidgetItem):
+    """Table item that sorts by its numeric value."""
+
+    def __init__(self, value, text):
+        super().__init__(text)
+        self.value = value
+
+    def __lt__(self, other):
+        if isinstance(other, NumericItem):
+            return self.value < other.value
+        return super().__lt__(other)
+
+
+class DetectionSweepThread(QThread):
+    """Thread running a detection sweep in a process pool."""
+
+    progress = Signal(int, int)  # finished, total
+    finished = Signal(object)  # results DataFrame
+
+    def __init__(self, frame_paths, base_params, grid, workers):
+        super().__init__()
+        self.frame_paths = frame_paths
+        self.base_params = base_params
+        self.grid = grid
+        self.workers = workers
+        self._cancel_requested = False
+
+    def request_cancel(self):
+        """Drop the combinations that have not started."""
+        self._cancel_requested = True
+
+    def run(self):
+        try:
+            results = run_detection_sweep(
+                self.frame_paths,
+                self.base_params,
+                self.grid,
+                workers=self.workers,
+                progress_callback=self.progress.emit,
+                cancel_check=lambda: self._cancel_requested,
+            )
+        except Exception as e:
+            print(f"Error in parameter sweep: {e}")
+            results = None
+        self.finished.emit(results)
+
+
+class DWParameterSweepDialog(QDialog):
+    """Parameter sweep explorer for detection settings."""
+
+    # Emitted with {"feature_size", "min_mass", "threshold"} when a row is applied
+    parametersApplied = Signal(dict)
+
+    def __init__(self, frame_paths, base_params, parent=None):
+        """
+        Initialize the sweep dialog.
+
+        Parameters
+        ----------
+        frame_paths : list of str
+            Frames in the selected detection range; the sweep samples from these.
+        base_params : dict
+            Current detection parameters (used for range defaults and fixed settings).
+        parent : QWidget, optional
+            Parent widget. Defaults to None.
+
+        Returns
+        -------
+        None
+        """
+        super().__init__(parent)
+        self.setWindowTitle("Detection Parameter Sweep")
+        self.resize(1000, 700)
+        self.frame_paths = frame_paths
+        self.base_params = dict(base_params)
+        self.results = None
+        self.sweep_thread = None
+
+        layout = QVBoxLayout(self)
+        layout.addWidget(self._build_range_inputs())
+
+        run_layout = QHBoxLayout()
+        self.combination_label = QLabel("")
+        run_layout.addWidget(self.combination_label)
+        run_layout.addStretch()
+        self.progress_bar = QProgressBar()
+        self.progress_bar.setVisible(False)
+        run_layout.addWidget(self.progress_bar)
+        self.run_button = QPushButton("Run Sweep")
+        self.run_button.clicked.connect(self.run_sweep)
+        self.stop_button = QPushButton("Stop")
+        self.stop_button.setEnabled(False)
+        self.stop_button.clicked.connect(self.stop_sweep)
+        run_layout.addWidget(self.stop_button)
+        run_layout.addWidget(self.run_button)
+        layout.addLayout(run_layout)
+
+        splitter = QSplitter(Qt.Horizontal)
+        self.table = QTableWidget(0, len(RESULT_COLUMNS))
+        self.table.setHorizontalHeaderLabels([header for _, header, _ in RESULT_COLUMNS])
+        self.table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeToContents)
+        self.table.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.table.setSelectionMode(QAbstractItemView.SingleSelection)
+        self.table.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.table.setSortingEnabled(True)
+        self.table.itemSelectionChanged.connect(self._update_apply_button)
+        splitter.addWidget(self.table)
+        splitter.addWidget(self._build_heatmap())
+        splitter.setSizes([550, 450])
+        layout.addWidget(splitter, 1)
+
+        bottom_layout = QHBoxLayout()
+        bottom_layout.addStretch()
+        self.apply_button = QPushButton("Apply Selected")
+        self.apply_button.setEnabled(False)
+        self.apply_button.clicked.connect(self.apply_selected)
+        close_button = QPushButton("Close")
+        close_button.clicked.connect(self.close)
+        bottom_layout.addWidget(self.apply_button)
+        bottom_layout.addWidget(close_button)
+        layout.addLayout(bottom_layout)
+
+        self._update_combination_count()
+
+    def _build_range_inputs(self):
+        widget = QWidget()
+        grid = QGridLayout(widget)
+        grid.setContentsMargins(0, 0, 0, 0)
+        for column, header in enumerate(["", "From", "To", "Step"]):
+            grid.addWidget(QLabel(header), 0, column)
+
+        feature_size = int(self.base_params.get("feature_size", 15))
+        min_mass = float(self.base_params.get("min_mass", 100.0))
+        threshold = float(self.base_params.get("threshold", 0.0))
+        self.range_inputs = {
+            "feature_size": self._add_range_row(
+                grid,
+                1,
+                "Feature size",
+                (max(1, feature_size - 4), feature_size + 4, 2),
+                integer=True,
+            ),
+            "min_mass": self._add_range_row(
+                grid, 2, "Min mass", (min_mass * 0.5, min_mass * 1.5, max(1.0, min_mass * 0.25))
+            ),
+            "threshold": self._add_range_row(grid, 3, "Threshold", (threshold, threshold, 0.0)),
+        }
+
+        self.sample_input = QSpinBox()
+        self.sample_input.setRange(1, max(1, len(self.frame_paths)))
+        self.sample_input.setValue(min(DEFAULT_SAMPLE_FRAMES, max(1, len(self.frame_paths))))
+        self.sample_input.setToolTip("Frames sampled evenly from the selected frame range.")
+        self.sample_input.valueChanged.connect(self._update_combination_count)
+        grid.addWidget(QLabel("Sample frames"), 4, 0)
+        grid.addWidget(self.sample_input, 4, 1)
+
+        self.workers_input = QSpinBox()
+        self.workers_input.setRange(1, 256)
+        self.workers_input.setValue(os.cpu_count() or 1)
+        self.workers_input.setToolTip("Worker processes running combinations in parallel.")
+        grid.addWidget(QLabel("Workers"), 4, 2)
+        grid.addWidget(self.workers_input, 4, 3)
+        return widget
+
+    def _add_range_row(self, grid, row, label, defaults, integer=False):
+        grid.addWidget(QLabel(label), row, 0)
+        inputs = []
+        for column, value in enumerate(defaults, start=1):
+            if integer:
+                spin = QSpinBox()
+                spin.setRange(0 if column == 3 else 1, 9999)
+                spin.setValue(int(value))
+            else:
+                spin = QDoubleSpinBox()
+                spin.setDecimals(2)
+                spin.setRange(0.0, 1e12)
+                spin.setValue(float(value))
+            spin.valueChanged.connect(self._update_combination_count)
+            grid.addWidget(spin, row, column)
+            inputs.append(spin)
+        return inputs
+
+    def _build_heatmap(self):
+        widget = QWidget()
+        layout = QVBoxLayout(widget)
+        layout.setContentsMargins(0, 0, 0, 0)
+
+        controls = QHBoxLayout()
+        controls.addWidget(QLabel("Metric"))
+        self.metric_combo = QComboBox()
+        for key, label in HEATMAP_METRICS:
+            self.metric_combo.addItem(label, key)
+        self.metric_combo.currentIndexChanged.connect(self._update_heatmap)
+        controls.addWidget(self.metric_combo)
+        controls.addWidget(QLabel("Threshold"))
+        self.threshold_combo = QComboBox()
+        self.threshold_combo.currentIndexChanged.connect(self._update_heatmap)
+        controls.addWidget(self.threshold_combo)
+        layout.addLayout(controls)
+
+        self.heatmap = pg.PlotWidget()
+        self.heatmap.setBackground("w")
+        self.heatmap.setLabel("bottom", "Feature size")
+        self.heatmap.setLabel("left", "Min mass")
+        self.heatmap.setMenuEnabled(False)
+        self.heatmap_image = pg.ImageItem()
+        self.heatmap_image.setLookupTable(pg.colormap.get("viridis").getLookupTable(nPts=256))
+        self.heatmap.addItem(self.heatmap_image)
+        self.heatmap.scene().sigMouseClicked.connect(self._on_heatmap_clicked)
+        layout.addWidget(self.heatmap, 1)
+
+        self.heatmap_range_label = QLabel("")
+        self.heatmap_range_label.setAlignment(Qt.AlignCenter)
+        layout.addWidget(self.heatmap_range_label)
+        return widget
+
+    def _ranges(self):
+        ranges = {}
+        for name, (start, stop, step) in self.range_inputs.items():
+            values = value_range(start.value(), stop.value(), step.value())
+            if name == "feature_size":
+                # trackpy needs odd diameters
+                values = sorted({int(v) | 1 for v in values})
+            ranges[name] = values
+        return ranges
+
+    def _update_combination_count(self):
+        count = len(parameter_grid(self._ranges()))
+        self.combination_label.setText(
+            f"{count} combination(s) on {self.sample_input.value()} frame(s)"
+        )
+
+    def run_sweep(self):
+        """Start the sweep over the current ranges."""
+        if self.sweep_thread and self.sweep_thread.isRunning():
+            return
+        if not self.frame_paths:
+            QMessageBox.warning(self, "No Frames", "No frames found in the selected range.")
+            return
+        grid = parameter_grid(self._ranges())
+        if len(grid) > LARGE_SWEEP:
+            answer = QMessageBox.question(
+                self,
+                "Large Sweep",
+                f"This sweep has {len(grid)} combinations. Run it anyway?",
+            )
+            if answer != QMessageBox.Yes:
+                return
+
+        frames = sample_frames(self.frame_paths, self.sample_input.value())
+        self.progress_bar.setRange(0, len(grid))
+        self.progress_bar.setValue(0)
+        self.progress_bar.setVisible(True)
+        self.run_button.setEnabled(False)
+        self.stop_button.setEnabled(True)
+        self.sweep_thread = DetectionSweepThread(
+            frames, self.base_params, grid, self.workers_input.value()
+        )
+        self.sweep_thread.progress.connect(lambda done, total: self.progress_bar.setValue(done))
+        self.sweep_thread.finished.connect(self._on_sweep_finished)
+        self.sweep_thread.start()
+
+    def stop_sweep(self):
+        """Stop after the running combinations finish."""
+        if self.sweep_thread and self.sweep_thread.isRunning():
+            self.stop_button.setEnabled(False)
+            self.sweep_thread.request_cancel()
+
+    def _on_sweep_finished(self, results):
+        self.progress_bar.setVisible(False)
+        self.run_button.setEnabled(True)
+        self.stop_button.setEnabled(False)
+        if results is None or results.empty:
+            QMessageBox.warning(self, "Sweep", "The sweep produced no results.")
+            return
+        self.results = results
+        self._fill_table()
+
+        self.threshold_combo.blockSignals(True)
+        self.threshold_combo.clear()
+        for value in sorted(results["threshold"].unique()):
+            self.threshold_combo.addItem(f"{value:g}", float(value))
+        self.threshold_combo.blockSignals(False)
+        self._update_heatmap()
+
+    def _fill_table(self):
+        self.table.setSortingEnabled(False)
+        self.table.setRowCount(len(self.results))
+        for row, record in enumerate(self.results.to_dict("records")):
+            for column, (key, _, fmt) in enumerate(RESULT_COLUMNS):
+                value = record.get(key, np.nan)
+                text = "" if value is None or np.isnan(value) else fmt.format(value)
+                self.table.setItem(row, column, NumericItem(value, text))
+        self.table.setSortingEnabled(True)
+
+    def _update_heatmap(self):
+        if self.results is None or self.threshold_combo.count() == 0:
+            return
+        metric = self.metric_combo.currentData()
+        threshold = self.threshold_combo.currentData()
+        subset = self.results[np.isclose(self.results["threshold"], threshold)]
+        self._heatmap_sizes = sorted(subset["feature_size"].unique())
+        self._heatmap_masses = sorted(subset["min_mass"].unique())
+        values = np.full((len(self._heatmap_sizes), len(self._heatmap_masses)), np.nan)
+        for record in subset.to_dict("records"):
+            i = self._heatmap_sizes.index(record["feature_size"])
+            j = self._heatmap_masses.index(record["min_mass"])
+            values[i, j] = record[metric]
+
+        finite = values[np.isfinite(values)]
+        low, high = (finite.min(), finite.max()) if finite.size else (0.0, 1.0)
+        self.heatmap_image.setImage(
+            np.nan_to_num(values, nan=low), levels=(low, high if high > low else low + 1)
+        )
+        self.heatmap_range_label.setText(
+            f"{self.metric_combo.currentText()}: {low:.3g} (dark) to {high:.3g} (bright)"
+        )
+        # One cell per combination, labelled with the swept values
+        self.heatmap.getAxis("bottom").setTicks(
+            [[(i + 0.5, f"{v:g}") for i, v in enumerate(self._heatmap_sizes)]]
+        )
+        self.heatmap.getAxis("left").setTicks(
+            [[(j + 0.5, f"{v:g}") for j, v in enumerate(self._heatmap_masses)]]
+        )
+        self.heatmap.autoRange()
+
+    def _on_heatmap_clicked(self, event):
+        if self.results is None or not getattr(self, "_heatmap_sizes", None):
+            return
+        point = self.heatmap.getPlotItem().vb.mapSceneToView(event.scenePos())
+        i, j = int(np.floor(point.x())), int(np.floor(point.y()))
+        if not (0 <= i < len(self._heatmap_sizes) and 0 <= j < len(self._heatmap_masses)):
+            return
+        target = (
+            self._heatmap_sizes[i],
+            self._heatmap_masses[j],
+            self.threshold_combo.currentData(),
+        )
+        for row in range(self.table.rowCount()):
+            values = tuple(self.table.item(row, column).value for column in range(3))
+            if np.allclose(values, target):
+                self.table.selectRow(row)
+                self.table.scrollToItem(self.table.item(row, 0))
+                break
+
+    def _update_apply_button(self):
+        self.apply_button.setEnabled(bool(self.table.selectionModel().selectedRows()))
+
+    def apply_selected(self):
+        """Emit the selected combination for saving to the project config."""
+        rows = self.table.selectionModel().selectedRows()
+        if not rows:
+            return
+        row = rows[0].row()
+        params = {
+            "feature_size": int(self.table.item(row, 0).value),
+            "min_mass": float(self.table.item(row, 1).value),
+            "threshold": float(self.table.item(row, 2).value),
+        }
+        self.parametersApplied.emit(params)
+
+    def closeEvent(self, event):
+        if self.sweep_thread and self.sweep_thread.isRunning():
+            self.sweep_thread.request_cancel()
+            self.sweep_thread.wait()
+        super().closeEvent(event)
@@ -20,11 +20,20 @@ from PySide6.QtWidgets import (
     QHBoxLayout,
     QProgressBar,
     QApplication,
+    QComboBox,
+    QMessageBox,
 )
 from PySide6.QtGui import QFont
 from PySide6.QtCore import Qt, Signal, QThread, QTimer
 import pandas as pd
 from ..utils import ParticleProcessing
+from ..utils.Background import DEFAULT_WINDOW, FrameBackground, compute_background
+from ..utils.DetectionChunks import (
+    DETECTION_CHUNKS_FOLDER,
+    read_chunk_manifest,
+    read_detection_chunks,
+    remove_detection_chunks,
+)
 from ..utils.UIUtils import create_label_with_info
 
 
@@ -34,11 +43,12 @@ class FindParticlesThread(QThread):
     processing_frame = Signal(str)
     finished = Signal(object, bool)  # particles DataFrame (or None), was_cancelled
 
-    def __init__(self, frame_paths, params):
-        """Initialize particle finding thread."""
+    def __init__(self, frame_paths, params, chunk_folder=None):
+        """Initialize particle finding thread (results stream into chunk_folder if given)."""
         super().__init__()
         self.frame_paths = frame_paths
         self.params = params
+        self.chunk_folder = chunk_folder
         self._cancel_requested = False
 
     def request_cancel(self):
@@ -53,6 +63,7 @@ class FindParticlesThread(QThread):
                 self.params,
                 progress_callback=self.processing_frame,
                 cancel_check=lambda: self._cancel_requested,
+                chunk_folder=self.chunk_folder,
             )
             if self._cancel_requested or particles is None:
                 self.finished.emit(None, True)
@@ -63,11 +74,42 @@ class FindParticlesThread(QThread):
             self.finished.emit(None, True)
 
 
+class ComputeBackgroundThread(QThread):
+    """Thread computing the median background of all frames."""
+
+    progress = Signal(str)
+    finished = Signal(bool)  # background stored
+
+    def __init__(self, frame_paths, frames_folder, mode, window):
+        super().__init__()
+        self.frame_paths = frame_paths
+        self.frames_folder = frames_folder
+        self.mode = mode
+        self.window = window
+
+    def run(self):
+        try:
+            manifest = compute_background(
+                self.frame_paths,
+                self.frames_folder,
+                self.mode,
+                self.window,
+                progress_callback=self.progress,
+            )
+            self.finished.emit(manifest is not None)
+        except Exception as e:
+            print(f"Error computing background: {e}")
+            self.finished.emit(False)
+
+
 class DWParametersWidget(QWidget):
     allParticlesUpdated = Signal()
     openTrajectoryLinking = Signal()
     parameter_changed = Signal()
     particles_found = Signal()  # Emitted when Find Particles is clicked
+    backgroundViewRequested = Signal()
+
+    BACKGROUND_MODES = [("Off", "off"), ("Global median", "global"), ("Rolling median", "rolling")]
 
     def __init__(self, graphing_panel, parent=None):
         super().__init__(parent)
@@ -76,6 +118,8 @@ class DWParametersWidget(QWidget):
 
         self.total_frames = 0
         self.find_particles_thread = None
+        self.background_thread = None
+        self.sweep_dialog = None
         self.layout = QVBoxLayout(self)
 
         self.graphing_panel = graphing_panel
@@ -126,6 +170,37 @@ class DWParametersWidget(QWidget):
             self.threshold_input,
         )
 
+        background_layout = QHBoxLayout()
+        self.background_mode_input = QComboBox()
+        for label, mode in self.BACKGROUND_MODES:
+            self.background_mode_input.addItem(label, mode)
+        self.background_window_input = QSpinBox()
+        self.background_window_input.setRange(2, 100000)
+        self.background_window_input.setValue(DEFAULT_WINDOW)
+        self.background_window_input.setSuffix(" frames")
+        self.background_window_input.setToolTip("Frames per rolling median background.")
+        self.background_mode_input.currentIndexChanged.connect(self._update_background_controls)
+        background_layout.addWidget(self.background_mode_input)
+        background_layout.addWidget(self.background_window_input)
+        self.form.addRow(
+            create_label_with_info(
+                "Background",
+                "Subtract a median background of the frames before detection, to remove "
+                "uneven illumination. Global uses one background for the movie; rolling "
+                "uses one per window of frames.",
+            ),
+            background_layout,
+        )
+
+        background_buttons_layout = QHBoxLayout()
+        self.compute_background_button = QPushButton("Compute Background")
+        self.compute_background_button.clicked.connect(self.compute_background)
+        self.view_background_button = QPushButton("View Background")
+        self.view_background_button.clicked.connect(self.backgroundViewRequested.emit)
+        background_buttons_layout.addWidget(self.compute_background_button)
+        background_buttons_layout.addWidget(self.view_background_button)
+        self.form.addRow("", background_buttons_layout)
+
         self.layout.addLayout(self.form)
         self.layout.addStretch()
 
@@ -176,7 +251,14 @@ class DWParametersWidget(QWidget):
         self.stop_button.setEnabled(False)
         self.stop_button.clicked.connect(self.stop_find_particles)
 
+        self.sweep_button = QPushButton("Parameter Sweep...")
+        self.sweep_button.setToolTip(
+            "Try ranges of feature size, min mass and threshold on a sample of frames."
+        )
+        self.sweep_button.clicked.connect(self.open_parameter_sweep)
+
         buttons_row_layout.addWidget(self.all_frames_button)
+        buttons_row_layout.addWidget(self.sweep_button)
         buttons_row_layout.addStretch()
         buttons_row_layout.addWidget(self.stop_button)
         buttons_row_layout.addWidget(self.save_button)
@@ -216,6 +298,9 @@ class DWParametersWidget(QWidget):
         self.min_mass_input.editingFinished.connect(self._on_parameter_edited)
         self.threshold_input.editingFinished.connect(self._on_parameter_edited)
         self.invert_input.stateChanged.connect(self._on_parameter_edited)
+        self.background_mode_input.currentIndexChanged.connect(self._on_parameter_edited)
+        self.background_window_input.editingFinished.connect(self._on_parameter_edited)
+        self._update_background_controls()
 
     def set_config_manager(self, config_manager):
         self.config_manager = config_manager
@@ -249,12 +334,17 @@ class DWParametersWidget(QWidget):
         self.min_mass_input.setValue(float(params.get("min_mass", 100.0)))
         self.invert_input.setChecked(bool(params.get("invert", False)))
         self.threshold_input.setValue(float(params.get("threshold", 0.0)))
+        mode_index = self.background_mode_input.findData(params.get("background", "off"))
+        self.background_mode_input.setCurrentIndex(max(0, mode_index))
+        self.background_window_input.setValue(int(params.get("background_window", DEFAULT_WINDOW)))
         # Initialize previous_params with loaded values
         self.previous_params = {
             "feature_size": int(params.get("feature_size", 15)),
             "min_mass": float(params.get("min_mass", 100.0)),
             "invert": bool(params.get("invert", False)),
             "threshold": float(params.get("threshold", 0.0)),
+            "background": params.get("background", "off"),
+            "background_window": int(params.get("background_window", DEFAULT_WINDOW)),
         }
 
     def _on_parameter_edited(self):
@@ -274,6 +364,8 @@ class DWParametersWidget(QWidget):
             "invert": self.invert_input.isChecked(),
             "threshold": self.threshold_input.value(),
             "scaling": current_scaling,  # Preserve existing scaling value
+            "background": self.background_mode_input.currentData(),
+            "background_window": self.background_window_input.value(),
         }
 
         # Check if parameters actually changed
@@ -283,7 +375,14 @@ class DWParametersWidget(QWidget):
             params_changed = True
         else:
             # Compare current values with previous values
-            for key in ["feature_size", "min_mass", "invert", "threshold"]:
+            for key in [
+                "feature_size",
+                "min_mass",
+                "invert",
+                "threshold",
+                "background",
+                "background_window",
+            ]:
                 if params[key] != self.previous_params.get(key):
                     params_changed = True
                     break
@@ -301,13 +400,18 @@ class DWParametersWidget(QWidget):
 
     def _get_current_detection_params(self):
         """Read detection parameters from widgets without writing config."""
-        current_scaling = self.config_manager.get_detection_params().get("scaling", 1.0)
+        current_params = self.config_manager.get_detection_params()
         return {
             "feature_size": self.feature_size_input.value(),
             "min_mass": self.min_mass_input.value(),
             "invert": self.invert_input.isChecked(),
             "threshold": self.threshold_input.value(),
-            "scaling": current_scaling,
+            "scaling": current_params.get("scaling", 1.0),
+            # Regions are drawn on the frame viewer and saved to config as they change
+            "roi": current_params.get("roi", []),
+            "tiling": current_params.get("tiling", "auto"),
+            "background": self.background_mode_input.currentData(),
+            "background_window": self.background_window_input.value(),
         }
 
     def find_particles(self):
@@ -335,12 +439,29 @@ class DWParametersWidget(QWidget):
             self.progress_display.setText("No frames found in range.")
             return
 
+        params = self._get_current_detection_params()
+        if params["background"] != "off" and (
+            FrameBackground.load(
+                self.file_controller.original_frames_folder,
+                params["background"],
+                params["background_window"],
+            )
+            is None
+        ):
+            self.progress_display.setText(
+                "Click Compute Background first, or set Background to Off."
+            )
+            return
+
         self._set_find_ui_running(True)
         self.progress_display.setText("Working... Detecting particles. This may take a moment.")
         QApplication.processEvents()  # Update UI immediately
 
-        params = self._get_current_detection_params()
-        self.find_particles_thread = FindParticlesThread(frame_paths, params)
+        self.find_particles_thread = FindParticlesThread(
+            frame_paths,
+            params,
+            chunk_folder=self.file_controller.get_data_file_path(DETECTION_CHUNKS_FOLDER),
+        )
         self.find_particles_thread.processing_frame.connect(self.progress_display.setText)
         self.find_particles_thread.finished.connect(self.on_find_finished)
         self.find_particles_thread.start()
@@ -352,8 +473,82 @@ class DWParametersWidget(QWidget):
             self.stop_button.setEnabled(False)
             self.find_particles_thread.request_cancel()
 
+    def open_parameter_sweep(self):
+        """Open the parameter sweep explorer on the selected frame range."""
+        if not self.file_controller:
+            self.progress_display.setText("Project not loaded.")
+            return
+        from .DW_ParameterSweepDialog import DWParameterSweepDialog
+
+        frame_paths = self.file_controller.get_frame_files(
+            start=self.start_frame_input.value() - 1,
+            end=self.end_frame_input.value() - 1,
+            step=self.step_frame_input.value(),
+        )
+        if self.sweep_dialog is not None:
+            self.sweep_dialog.close()
+        self.sweep_dialog = DWParameterSweepDialog(
+            frame_paths, self._get_current_detection_params(), self
+        )
+        self.sweep_dialog.parametersApplied.connect(self._apply_sweep_params)
+        self.sweep_dialog.show()
+
+    def _apply_sweep_params(self, params):
+        """Load a sweep result into the inputs and save it to config."""
+        self.feature_size_input.setValue(params["feature_size"])
+        self.min_mass_input.setValue(params["min_mass"])
+        self.threshold_input.setValue(params["threshold"])
+        self.save_params()
+        self.progress_display.setText(
+            f"Applied feature size {params['feature_size']}, min mass "
+            f"{params['min_mass']:g}, threshold {params['threshold']:g}."
+        )
+        QTimer.singleShot(3000, lambda: self.progress_display.setText(""))
+
+    def _update_background_controls(self):
+        mode = self.background_mode_input.currentData()
+        self.background_window_input.setEnabled(mode == "rolling")
+        self.compute_background_button.setEnabled(mode != "off")
+
+    def compute_background(self):
+        """Compute the median background of all frames with the selected mode."""
+        if not self.file_controller:
+            self.progress_display.setText("Project not loaded.")
+            return
+        if self.background_thread and self.background_thread.isRunning():
+            return
+        mode = self.background_mode_input.currentData()
+        if mode == "off":
+            return
+
+        self._set_find_ui_running(True)
+        self.stop_button.setEnabled(False)
+        self.progress_display.setText("Computing background...")
+        self.background_thread = ComputeBackgroundThread(
+            self.file_controller.get_all_frame_paths(),
+            self.file_controller.original_frames_folder,
+            mode,
+            self.background_window_input.value(),
+        )
+        self.background_thread.progress.connect(self.progress_display.setText)
+        self.background_thread.finished.connect(self._on_background_finished)
+        self.background_thread.start()
+
+    def _on_background_finished(self, stored):
+        self._set_find_ui_running(False)
+        self._update_background_controls()
+        if stored:
+            self.progress_display.setText("Background computed.")
+            self.backgroundViewRequested.emit()
+        else:
+            self.progress_display.setText("Could not compute the background.")
+        QTimer.singleShot(2000, lambda: self.progress_display.setText(""))
+
     def _set_find_ui_running(self, running):
         self.save_button.setEnabled(not running)
+        self.compute_background_button.setEnabled(
+            not running and self.background_mode_input.currentData() != "off"
+        )
         self.all_frames_button.setEnabled(not running)
         self.stop_button.setEnabled(running)
         self.next_button.setEnabled(not running)
@@ -368,7 +563,12 @@ class DWParametersWidget(QWidget):
     def on_find_finished(self, particles_df, was_cancelled=False):
         self._set_find_ui_running(False)
 
+        partial = False
         if was_cancelled:
+            particles_df = self._take_partial_detection()
+            partial = particles_df is not None
+
+        if was_cancelled and not partial:
             self.load_params()
             self.progress_display.setText("Particle detection stopped. Previous particles kept.")
             existing_particles = self.file_controller.load_particles_data("all_particles.csv")
@@ -394,7 +594,10 @@ class DWParametersWidget(QWidget):
 
         self.save_params()
 
-        if not particles_df.empty:
+        if partial:
+            self.progress_display.setText("Particle detection stopped. Partial results saved.")
+            self._save_all_particles_df(particles_df)
+        elif not particles_df.empty:
             self.progress_display.setText("Particle detection completed!")
             self._save_all_particles_df(particles_df)
         else:
@@ -415,7 +618,42 @@ class DWParametersWidget(QWidget):
         # Clear message after a moment
         QTimer.singleShot(2000, lambda: self.progress_display.setText(""))
 
+    def _take_partial_detection(self):
+        """
+        Offer to keep the particles of a stopped run; the chunk store is removed either way.
+
+        Returns
+        -------
+        pd.DataFrame or None
+            The particles of the frames that finished, or None to keep the previous
+            particles.
+        """
+        if not self.file_controller:
+            return None
+        folder = self.file_controller.get_data_file_path(DETECTION_CHUNKS_FOLDER)
+        manifest = read_chunk_manifest(folder)
+        if not manifest or not manifest.get("rows"):
+            remove_detection_chunks(folder)
+            return None
+
+        total = len(self.find_particles_thread.frame_paths) if self.find_particles_thread else 0
+        answer = QMessageBox.question(
+            self,
+            "Detection Stopped",
+            f"Detection stopped after {manifest['frames']} of {total} frames, with "
+            f"{manifest['rows']} particles found.\n\n"
+            "Save these particles (replacing the current all_particles.csv)? "
+            "Otherwise the previous particles are kept.",
+        )
+        try:
+            if answer != QMessageBox.Yes:
+                return None
+            return read_detection_chunks(folder)
+        finally:
+            remove_detection_chunks(folder)
+
     def _save_all_particles_df(self, df):
+        df = self.file_controller.to_project_dtypes(df)
         self.file_controller.save_particles_data(df)
         self.graphing_panel.set_particles(df)  # Update graph with raw data
 
@@ -83,6 +83,8 @@ class LWErrantDistanceLinksWidget(QWidget):
         self.rb_links = []
         self.current_pixmap = None
         self.original_frames_folder = None
+        # Padded crops per link, so threshold changes do not re-read the full frames
+        self._crop_cache = {}
 
         # Show initial trajectory if available
         self._display_link(self.curr_link_idx)
@@ -261,9 +263,65 @@ Search Range: {search_range_microns:.2f} μm"""
     def reset_state(self):
         """Reload gallery files when returning to the linking screen."""
         self.curr_link_idx = 0
+        self._crop_cache.clear()
         self._update_errant_distance_links_path()
         self._display_link(self.curr_link_idx)
 
+    def _load_link_crops(self, frame_i, frame_i1, x_i, y_i, x_i1, y_i1, crop_size):
+        """
+        Read both frames of a link and cut the padded crops centred on the link midpoint.
+
+        Returns
+        -------
+        tuple or None
+            (crop1, crop2, crop_origin_x, crop_origin_y), or None if a frame is missing.
+        """
+        frame1_filename = os.path.join(self.original_frames_folder, f"frame_{frame_i:05d}.jpg")
+        frame2_filename = os.path.join(self.original_frames_folder, f"frame_{frame_i1:05d}.jpg")
+
+        if not os.path.exists(frame1_filename) or not os.path.exists(frame2_filename):
+            return None
+
+        full_frame1 = cv2.imread(frame1_filename)
+        full_frame2 = cv2.imread(frame2_filename)
+
+        if full_frame1 is None or full_frame2 is None:
+            return None
+
+        crop_radius = crop_size // 2
+
+        # Calculate midpoint and single crop origin
+        mid_x = (x_i + x_i1) / 2
+        mid_y = (y_i + y_i1) / 2
+        crop_origin_x = int(mid_x - crop_radius)
+        crop_origin_y = int(mid_y - crop_radius)
+
+        # Function to create padded crops
+        def create_padded_crop(full_frame):
+            canvas = np.zeros((crop_size, crop_size, 3), dtype=np.uint8)
+
+            src_x_start = max(0, crop_origin_x)
+            src_y_start = max(0, crop_origin_y)
+            src_x_end = min(full_frame.shape[1], crop_origin_x + crop_size)
+            src_y_end = min(full_frame.shape[0], crop_origin_y + crop_size)
+
+            dest_x_start = max(0, -crop_origin_x)
+            dest_y_start = max(0, -crop_origin_y)
+            dest_x_end = dest_x_start + (src_x_end - src_x_start)
+            dest_y_end = dest_y_start + (src_y_end - src_y_start)
+
+            canvas[dest_y_start:dest_y_end, dest_x_start:dest_x_end] = full_frame[
+                src_y_start:src_y_end, src_x_start:src_x_end
+            ]
+            return canvas
+
+        return (
+            create_padded_crop(full_frame1),
+            create_padded_crop(full_frame2),
+            crop_origin_x,
+            crop_origin_y,
+        )
+
     def _generate_image_for_link(self, link_info):
         """Generate RB overlay image for the given link metadata."""
         if not self.original_frames_folder:
@@ -280,49 +338,17 @@ Search Range: {search_range_microns:.2f} μm"""
             if any(v is None for v in [frame_i, frame_i1, x_i, y_i, x_i1, y_i1]):
                 return None
 
-            frame1_filename = os.path.join(self.original_frames_folder, f"frame_{frame_i:05d}.jpg")
-            frame2_filename = os.path.join(self.original_frames_folder, f"frame_{frame_i1:05d}.jpg")
-
-            if not os.path.exists(frame1_filename) or not os.path.exists(frame2_filename):
-                return None
-
-            full_frame1 = cv2.imread(frame1_filename)
-            full_frame2 = cv2.imread(frame2_filename)
-
-            if full_frame1 is None or full_frame2 is None:
-                return None
-
             threshold_percent = self.threshold_slider.value()
             crop_size = 200
-            crop_radius = crop_size // 2
-
-            # Calculate midpoint and single crop origin
-            mid_x = (x_i + x_i1) / 2
-            mid_y = (y_i + y_i1) / 2
-            crop_origin_x = int(mid_x - crop_radius)
-            crop_origin_y = int(mid_y - crop_radius)
-
-            # Function to create padded crops
-            def create_padded_crop(full_frame):
-                canvas = np.zeros((crop_size, crop_size, 3), dtype=np.uint8)
-
-                src_x_start = max(0, crop_origin_x)
-                src_y_start = max(0, crop_origin_y)
-                src_x_end = min(full_frame.shape[1], crop_origin_x + crop_size)
-                src_y_end = min(full_frame.shape[0], crop_origin_y + crop_size)
-
-                dest_x_start = max(0, -crop_origin_x)
-                dest_y_start = max(0, -crop_origin_y)
-                dest_x_end = dest_x_start + (src_x_end - src_x_start)
-                dest_y_end = dest_y_start + (src_y_end - src_y_start)
-
-                canvas[dest_y_start:dest_y_end, dest_x_start:dest_x_end] = full_frame[
-                    src_y_start:src_y_end, src_x_start:src_x_end
-                ]
-                return canvas
-
-            padded_crop1 = create_padded_crop(full_frame1)
-            padded_crop2 = create_padded_crop(full_frame2)
+            link_key = (frame_i, frame_i1, x_i, y_i, x_i1, y_i1)
+            cached = self._crop_cache.get(link_key)
+            if cached is None:
+                cached = self._load_link_crops(frame_i, frame_i1, x_i, y_i, x_i1, y_i1, crop_size)
+                if cached is None:
+                    return None
+                self._crop_cache[link_key] = cached
+            padded_crop1, padded_crop2, crop_origin_x, crop_origin_y = cached
+            hist_key = ("rb_link", self.original_frames_folder, link_key)
 
             rb_image = create_rb_overlay_image(
                 padded_crop1,
@@ -333,6 +359,7 @@ Search Range: {search_range_microns:.2f} μm"""
                 y_i1 - crop_origin_y,
                 threshold_percent=threshold_percent,
                 crop_size=crop_size,
+                cache_keys=(hist_key + (1,), hist_key + (2,)),
             )
 
             if rb_image is not None:
@@ -0,0 +1,342 @@
+"""
+Linking Parameter Sweep Dialog
+
+Description: Dialog for sweeping search range, memory and minimum trajectory length
+             over ranges on the filtered particles (optionally a frame sub-range) in
+             parallel. Results are shown as a sortable table of trajectory quality
+             metrics; the selected combination can be applied to the project config.
+
+Copyright (c) 2025, Jacqueline Reynaga, Kevin Pillsbury, Bakir Husremovic
+License: BSD 3-Clause License
+Date: 2025-12-08
+"""
+
+import os
+
+import numpy as np
+from PySide6.QtCore import QThread, Signal
+from PySide6.QtWidgets import (
+    QAbstractItemView,
+    QDialog,
+    QDoubleSpinBox,
+    QGridLayout,
+    QHBoxLayout,
+    QHeaderView,
+    QLabel,
+    QMessageBox,
+    QProgressBar,
+    QPushButton,
+    QSpinBox,
+    QTableWidget,
+    QVBoxLayout,
+    QWidget,
+)
+
+from ..utils.ParameterSweep import (
+    LARGE_SWEEP,
+    NEAR_RANGE_FRACTION,
+    frame_subrange,
+    parameter_grid,
+    run_linking_sweep,
+    value_range,
+)
+from .DW_ParameterSweepDialog import NumericItem
+
+# (column, header, format)
+RESULT_COLUMNS = [
+    ("search_range", "Search range", "{:g}"),
+    ("memory", "Memory", "{:.0f}"),
+    ("min_trajectory_length", "Min length", "{:.0f}"),
+    ("trajectories", "Trajectories", "{:.0f}"),
+    ("mean_length", "Mean length", "{:.1f}"),
+    ("particles_kept", "Particles kept", "{:.1%}"),
+    ("near_range_links", "Links near range", "{:.1%}"),
+    ("memory_links", "Memory links", "{:.1%}"),
+    ("mean_gap", "Mean gap", "{:.2f}"),
+    ("seconds", "Time (s)", "{:.2f}"),
+]
+RESULT_TOOLTIPS = {
+    "particles_kept": "Fraction of particles in trajectories that pass the minimum length.",
+    "near_range_links": (
+        f"Fraction of links longer than {NEAR_RANGE_FRACTION:.0%} of the search range. "
+        "A high value suggests the search range is too small."
+    ),
+    "memory_links": "Fraction of links that skip at least one frame.",
+    "mean_gap": "Mean number of frames skipped by memory links.",
+    "seconds": "Linking time; combinations sharing search range and memory link once.",
+}
+
+
+class LinkingSweepThread(QThread):
+    """Thread running a linking sweep in a process pool."""
+
+    progress = Signal(int, int)  # finished, total
+    finished = Signal(object)  # results DataFrame
+
+    def __init__(self, particles, grid, workers):
+        super().__init__()
+        self.particles = particles
+        self.grid = grid
+        self.workers = workers
+        self._cancel_requested = False
+
+    def request_cancel(self):
+        """Drop the linking runs that have not started."""
+        self._cancel_requested = True
+
+    def run(self):
+        try:
+            results = run_linking_sweep(
+                self.particles,
+                self.grid,
+                workers=self.workers,
+                progress_callback=self.progress.emit,
+                cancel_check=lambda: self._cancel_requested,
+            )
+        except Exception as e:
+            print(f"Error in linking sweep: {e}")
+            results = None
+        self.finished.emit(results)
+
+
+class LWLinkingSweepDialog(QDialog):
+    """Parameter sweep explorer for linking settings."""
+
+    # Emitted with {"search_range", "memory", "min_trajectory_length"} when a row is applied
+    parametersApplied = Signal(dict)
+
+    def __init__(self, particles, base_params, parent=None):
+        """
+        Initialize the sweep dialog.
+
+        Parameters
+        ----------
+        particles : pd.DataFrame
+            Filtered particles (frame, x, y) to link.
+        base_params : dict
+            Current linking parameters (used for range defaults).
+        parent : QWidget, optional
+            Parent widget. Defaults to None.
+
+        Returns
+        -------
+        None
+        """
+        super().__init__(parent)
+        self.setWindowTitle("Linking Parameter Sweep")
+        self.resize(900, 600)
+        self.particles = particles
+        self.base_params = dict(base_params)
+        self.results = None
+        self.sweep_thread = None
+
+        layout = QVBoxLayout(self)
+        layout.addWidget(self._build_range_inputs())
+
+        run_layout = QHBoxLayout()
+        self.combination_label = QLabel("")
+        run_layout.addWidget(self.combination_label)
+        run_layout.addStretch()
+        self.progress_bar = QProgressBar()
+        self.progress_bar.setVisible(False)
+        run_layout.addWidget(self.progress_bar)
+        self.run_button = QPushButton("Run Sweep")
+        self.run_button.clicked.connect(self.run_sweep)
+        self.stop_button = QPushButton("Stop")
+        self.stop_button.setEnabled(False)
+        self.stop_button.clicked.connect(self.stop_sweep)
+        run_layout.addWidget(self.stop_button)
+        run_layout.addWidget(self.run_button)
+        layout.addLayout(run_layout)
+
+        self.table = QTableWidget(0, len(RESULT_COLUMNS))
+        self.table.setHorizontalHeaderLabels([header for _, header, _ in RESULT_COLUMNS])
+        for column, (key, _, _) in enumerate(RESULT_COLUMNS):
+            if key in RESULT_TOOLTIPS:
+                self.table.horizontalHeaderItem(column).setToolTip(RESULT_TOOLTIPS[key])
+        self.table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeToContents)
+        self.table.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.table.setSelectionMode(QAbstractItemView.SingleSelection)
+        self.table.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.table.setSortingEnabled(True)
+        self.table.itemSelectionChanged.connect(self._update_apply_button)
+        layout.addWidget(self.table, 1)
+
+        bottom_layout = QHBoxLayout()
+        bottom_layout.addStretch()
+        self.apply_button = QPushButton("Apply Selected")
+        self.apply_button.setEnabled(False)
+        self.apply_button.clicked.connect(self.apply_selected)
+        close_button = QPushButton("Close")
+        close_button.clicked.connect(self.close)
+        bottom_layout.addWidget(self.apply_button)
+        bottom_layout.addWidget(close_button)
+        layout.addLayout(bottom_layout)
+
+        self._update_combination_count()
+
+    def _build_range_inputs(self):
+        widget = QWidget()
+        grid = QGridLayout(widget)
+        grid.setContentsMargins(0, 0, 0, 0)
+        for column, header in enumerate(["", "From", "To", "Step"]):
+            grid.addWidget(QLabel(header), 0, column)
+
+        search_range = float(self.base_params.get("search_range", 10))
+        memory = int(self.base_params.get("memory", 10))
+        min_length = int(self.base_params.get("min_trajectory_length", 10))
+        self.range_inputs = {
+            "search_range": self._add_range_row(
+                grid,
+                1,
+                "Search range",
+                (search_range * 0.5, search_range * 1.5, max(0.5, search_range * 0.25)),
+            ),
+            "memory": self._add_range_row(
+                grid, 2, "Memory", (max(0, memory - 4), memory + 4, 2), integer=True
+            ),
+            "min_trajectory_length": self._add_range_row(
+                grid, 3, "Min trajectory length", (min_length, min_length, 0), integer=True
+            ),
+        }
+
+        frames = self.particles["frame"] if not self.particles.empty else None
+        first = int(frames.min()) if frames is not None else 0
+        last = int(frames.max()) if frames is not None else 0
+        self.first_frame_input = QSpinBox()
+        self.last_frame_input = QSpinBox()
+        for spin, value in ((self.first_frame_input, first), (self.last_frame_input, last)):
+            spin.setRange(first, last)
+            spin.setValue(value)
+            spin.valueChanged.connect(self._update_combination_count)
+        self.first_frame_input.setToolTip("First frame of the particles to link.")
+        self.last_frame_input.setToolTip("Last frame of the particles to link.")
+        grid.addWidget(QLabel("Frames"), 4, 0)
+        grid.addWidget(self.first_frame_input, 4, 1)
+        grid.addWidget(self.last_frame_input, 4, 2)
+
+        self.workers_input = QSpinBox()
+        self.workers_input.setRange(1, 256)
+        self.workers_input.setValue(os.cpu_count() or 1)
+        self.workers_input.setToolTip("Worker processes running linking runs in parallel.")
+        grid.addWidget(QLabel("Workers"), 5, 0)
+        grid.addWidget(self.workers_input, 5, 1)
+        return widget
+
+    def _add_range_row(self, grid, row, label, defaults, integer=False):
+        grid.addWidget(QLabel(label), row, 0)
+        inputs = []
+        for column, value in enumerate(defaults, start=1):
+            if integer:
+                spin = QSpinBox()
+                spin.setRange(0, 10000)
+                spin.setValue(int(value))
+            else:
+                spin = QDoubleSpinBox()
+                spin.setDecimals(2)
+                spin.setRange(0.0 if column == 3 else 0.01, 1000.0)
+                spin.setValue(float(value))
+            spin.valueChanged.connect(self._update_combination_count)
+            grid.addWidget(spin, row, column)
+            inputs.append(spin)
+        return inputs
+
+    def _ranges(self):
+        ranges = {}
+        for name, (start, stop, step) in self.range_inputs.items():
+            values = value_range(start.value(), stop.value(), step.value())
+            if name == "memory":
+                values = sorted({int(v) for v in values})
+            elif name == "min_trajectory_length":
+                values = sorted({max(1, int(v)) for v in values})
+            ranges[name] = values
+        return ranges
+
+    def _sweep_particles(self):
+        return frame_subrange(
+            self.particles, self.first_frame_input.value(), self.last_frame_input.value()
+        )
+
+    def _update_combination_count(self):
+        grid = parameter_grid(self._ranges())
+        links = len({(combo["search_range"], combo["memory"]) for combo in grid})
+        self.combination_label.setText(
+            f"{len(grid)} combination(s), {links} linking run(s) on "
+            f"{len(self._sweep_particles())} particle(s)"
+        )
+
+    def run_sweep(self):
+        """Start the sweep over the current ranges."""
+        if self.sweep_thread and self.sweep_thread.isRunning():
+            return
+        particles = self._sweep_particles()
+        if particles.empty:
+            QMessageBox.warning(self, "No Particles", "No particles in the selected frames.")
+            return
+        grid = parameter_grid(self._ranges())
+        if len(grid) > LARGE_SWEEP:
+            answer = QMessageBox.question(
+                self,
+                "Large Sweep",
+                f"This sweep has {len(grid)} combinations. Run it anyway?",
+            )
+            if answer != QMessageBox.Yes:
+                return
+
+        self.progress_bar.setRange(0, len(grid))
+        self.progress_bar.setValue(0)
+        self.progress_bar.setVisible(True)
+        self.run_button.setEnabled(False)
+        self.stop_button.setEnabled(True)
+        self.sweep_thread = LinkingSweepThread(particles, grid, self.workers_input.value())
+        self.sweep_thread.progress.connect(lambda done, total: self.progress_bar.setValue(done))
+        self.sweep_thread.finished.connect(self._on_sweep_finished)
+        self.sweep_thread.start()
+
+    def stop_sweep(self):
+        """Stop after the running linking runs finish."""
+        if self.sweep_thread and self.sweep_thread.isRunning():
+            self.stop_button.setEnabled(False)
+            self.sweep_thread.request_cancel()
+
+    def _on_sweep_finished(self, results):
+        self.progress_bar.setVisible(False)
+        self.run_button.setEnabled(True)
+        self.stop_button.setEnabled(False)
+        if results is None or results.empty:
+            QMessageBox.warning(self, "Sweep", "The sweep produced no results.")
+            return
+        self.results = results
+        self._fill_table()
+
+    def _fill_table(self):
+        self.table.setSortingEnabled(False)
+        self.table.setRowCount(len(self.results))
+        for row, record in enumerate(self.results.to_dict("records")):
+            for column, (key, _, fmt) in enumerate(RESULT_COLUMNS):
+                value = record.get(key, np.nan)
+                text = "" if value is None or np.isnan(value) else fmt.format(value)
+                self.table.setItem(row, column, NumericItem(value, text))
+        self.table.setSortingEnabled(True)
+
+    def _update_apply_button(self):
+        self.apply_button.setEnabled(bool(self.table.selectionModel().selectedRows()))
+
+    def apply_selected(self):
+        """Emit the selected combination for saving to the project config."""
+        rows = self.table.selectionModel().selectedRows()
+        if not rows:
+            return
+        row = rows[0].row()
+        params = {
+            "search_range": float(self.table.item(row, 0).value),
+            "memory": int(self.table.item(row, 1).value),
+            "min_trajectory_length": int(self.table.item(row, 2).value),
+        }
+        self.parametersApplied.emit(params)
+
+    def closeEvent(self, event):
+        if self.sweep_thread and self.sweep_thread.isRunning():
+            self.sweep_thread.request_cancel()
+            self.sweep_thread.wait()
+        super().closeEvent(event)
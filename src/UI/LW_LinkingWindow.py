@@ -29,6 +29,7 @@ from .LW_ErrantDistanceLinksWidget import *
 from .LW_ErrantMemoryLinksWidget import *
 from .LW_PlottingWidget import *
 from .LW_ParametersWidget import *
+from .DW_LW_PerformanceWidget import DWLWPerformanceWidget
 
 
 class LWLinkingWindow(QMainWindow):
@@ -121,6 +122,9 @@ class LWLinkingWindow(QMainWindow):
         find_trajectories_button = self.right_panel.find_trajectories_button
         find_trajectories_button.setParent(None)
         right_panel_layout.addWidget(find_trajectories_button, alignment=Qt.AlignRight)
+        sweep_button = self.right_panel.sweep_button
+        sweep_button.setParent(None)
+        right_panel_layout.addWidget(sweep_button, alignment=Qt.AlignRight)
 
         # Parameters info box (shows parameters used for current results)
         self.parameters_info_widget = self._create_parameters_info_widget()
@@ -134,6 +138,10 @@ class LWLinkingWindow(QMainWindow):
         self.metadata_widget = self._create_metadata_widget()
         right_panel_layout.addWidget(self.metadata_widget)
 
+        # Collapsible stage timings
+        self.performance_widget = DWLWPerformanceWidget()
+        right_panel_layout.addWidget(self.performance_widget)
+
         # Navigation buttons (Back and Export/Close) at bottom corner
         right_panel_layout.addStretch()
         self._move_buttons_to_bottom(right_panel_layout)
@@ -202,8 +210,11 @@ class LWLinkingWindow(QMainWindow):
             "trajectories": "trajectories.csv",
             "drift": self.file_controller.DRIFT_CSV,
             "trajectories_drift_subtracted": self.file_controller.TRAJECTORIES_DRIFT_SUBTRACTED_CSV,
+            "trajectory_summary": self.file_controller.TRAJECTORY_SUMMARY_CSV,
         }
 
+        # Make sure background writes from the last run are on disk before copying
+        self.file_controller.flush_writes()
         for name, filename in data_sources.items():
             try:
                 source_path = self.file_controller.get_data_file_path(filename)
@@ -27,17 +27,17 @@ from PySide6.QtGui import QFont
 from PySide6.QtCore import Qt, Signal, QTimer
 import os
 import traceback
-import trackpy as tp
 import pandas as pd
-import matplotlib.pyplot as plt
 import numpy as np
 import cv2
 from ..utils import ParticleProcessing
+from ..utils.Instrumentation import instrumentation
+from ..utils.TrajectorySummary import compute_trajectory_summary
 from ..utils.UIUtils import create_label_with_info
 
 
 class LWParametersWidget(QWidget):
-    DRIFT_SMOOTHING = 15
+    DRIFT_SMOOTHING = ParticleProcessing.DRIFT_SMOOTHING
 
     trajectoriesLinked = Signal()
     trajectoryVisualizationCreated = Signal(str)  # Emits image path
@@ -56,6 +56,7 @@ class LWParametersWidget(QWidget):
         # Store detected particles and linked trajectories
         self.detected_particles = None
         self.linked_trajectories = None
+        self.sweep_dialog = None
 
         self.layout = QVBoxLayout(self)
 
@@ -120,6 +121,13 @@ class LWParametersWidget(QWidget):
         self.find_trajectories_button = QPushButton("Find Trajectories")
         self.find_trajectories_button.clicked.connect(self.find_trajectories)
 
+        self.sweep_button = QPushButton("Linking Sweep...")
+        self.sweep_button.setToolTip(
+            "Link the filtered particles over ranges of search range, memory and minimum "
+            "trajectory length in parallel and compare the trajectories."
+        )
+        self.sweep_button.clicked.connect(self.open_linking_sweep)
+
         self.back_button = QPushButton("Back")
         self.back_button.clicked.connect(self.go_back)
 
@@ -169,13 +177,48 @@ class LWParametersWidget(QWidget):
         }
         self.config_manager.save_linking_params(params)
 
+    def open_linking_sweep(self):
+        """Open the linking parameter sweep on the filtered particles."""
+        if not self.config_manager or not self.file_controller:
+            return
+        from .LW_LinkingSweepDialog import LWLinkingSweepDialog
+
+        particles = self.file_controller.load_particles_data(
+            "filtered_particles.csv", columns=["frame", "x", "y"]
+        )
+        if particles.empty:
+            print("Please run 'Find Particles' and 'Apply Filters' first.")
+            return
+        if self.sweep_dialog is not None:
+            self.sweep_dialog.close()
+        self.sweep_dialog = LWLinkingSweepDialog(
+            particles, self.config_manager.get_linking_params(), self
+        )
+        self.sweep_dialog.parametersApplied.connect(self._apply_sweep_params)
+        self.sweep_dialog.show()
+
+    def _apply_sweep_params(self, params):
+        """Load a sweep result into the inputs and save it to config."""
+        self.search_range_input.setValue(params["search_range"])
+        self.memory_input.setValue(params["memory"])
+        self.min_trajectory_length_input.setValue(params["min_trajectory_length"])
+        self.save_params()
+        self.progress_label.setText(
+            f"Applied search range {params['search_range']:g}, memory {params['memory']}, "
+            f"min trajectory length {params['min_trajectory_length']}."
+        )
+        self.progress_label.setVisible(True)
+        QTimer.singleShot(3000, lambda: self.progress_label.setVisible(False))
+
     def _get_scaling(self):
         return self.config_manager.get_detection_params().get("scaling", 1.0)
 
     def compute_drift_table(self, trajectories_df, label="trajectories"):
         """Compute per-frame drift from linked trajectories (trackpy format)."""
         scaling = self._get_scaling()
-        drift = tp.compute_drift(trajectories_df.copy(), smoothing=self.DRIFT_SMOOTHING) * scaling
+        drift = ParticleProcessing.compute_drift_table(
+            trajectories_df, smoothing=self.DRIFT_SMOOTHING, scaling=scaling
+        )
         print(f"\n=== Drift to subtract ({label}) ===")
         print(f"smoothing={self.DRIFT_SMOOTHING}, scaling={scaling}")
         print(drift.to_string())
@@ -184,8 +227,7 @@ class LWParametersWidget(QWidget):
 
     def apply_drift_to_trajectories(self, trajectories_df, drift):
         """Return a copy of trajectories with drift subtracted."""
-        corrected = tp.subtract_drift(trajectories_df.copy(), drift)
-        return corrected.reset_index(drop=True)
+        return ParticleProcessing.subtract_drift(trajectories_df, drift)
 
     def save_drift_subtracted_trajectories(self, raw_trajectories_df, drift):
         """Persist trajectories_drift_subtracted.csv."""
@@ -196,11 +238,15 @@ class LWParametersWidget(QWidget):
         return corrected
 
     def _finalize_after_linking(self, raw_trajectories, trajectories_all, drift):
-        """Save drift.csv, drift-subtracted trajectories, and set display data."""
+        """Save drift.csv, drift-subtracted trajectories and the summary, and set display data."""
         self.file_controller.save_drift_data(drift)
         self.linked_trajectories = self.save_drift_subtracted_trajectories(
             raw_trajectories, drift
         )
+        # From the raw trajectories: trajectory filters apply to trajectories.csv
+        with instrumentation.stage("trajectory summary"):
+            summary = compute_trajectory_summary(raw_trajectories)
+        self.file_controller.save_trajectory_summary(summary)
         print("Saved drift.csv, trajectories.csv (raw), and trajectories_drift_subtracted.csv")
 
         if trajectories_all is not None:
@@ -209,6 +255,11 @@ class LWParametersWidget(QWidget):
 
     def find_trajectories(self):
         """Load detected particles and link them into trajectories."""
+        # Not a decorator: the button's clicked(bool) argument must not reach the method
+        with instrumentation.stage("linking run"):
+            self._find_trajectories()
+
+    def _find_trajectories(self):
         self.save_params()
         if not self.config_manager or not self.file_controller:
             return
@@ -235,6 +286,9 @@ class LWParametersWidget(QWidget):
         QApplication.processEvents()  # Update UI immediately
 
         try:
+            # Imported here so trackpy only loads once linking is run
+            import trackpy as tp
+
             search_range = float(linking_params.get("search_range", 10))
             memory = int(linking_params.get("memory", 10))
             min_trajectory_length = int(linking_params.get("min_trajectory_length", 10))
@@ -247,13 +301,17 @@ class LWParametersWidget(QWidget):
                 print("Linking ALL particles for unfiltered visualization...")
                 self.progress_label.setText("Working... Linking all particles...")
                 QApplication.processEvents()
-                trajectories_all = tp.link_df(
-                    all_particles_df, search_range=search_range, memory=memory
-                )
+                ParticleProcessing.check_linking_memory(all_particles_df)
+                with instrumentation.stage("link_df", particles=len(all_particles_df)):
+                    trajectories_all = tp.link_df(
+                        all_particles_df, search_range=search_range, memory=memory
+                    )
 
                 self.progress_label.setText("Working... Filtering trajectories...")
                 QApplication.processEvents()
-                trajectories_all = tp.filter_stubs(trajectories_all, min_trajectory_length)
+                with instrumentation.stage("filter_stubs"):
+                    trajectories_all = tp.filter_stubs(trajectories_all, min_trajectory_length)
+                trajectories_all = self.file_controller.to_project_dtypes(trajectories_all)
                 print(
                     f"Created {trajectories_all['particle'].nunique()} unfiltered trajectories for visualization"
                 )
@@ -273,15 +331,22 @@ class LWParametersWidget(QWidget):
             print(f"Linking filtered particles with search_range={search_range}, memory={memory}")
             self.progress_label.setText("Working... Linking filtered particles...")
             QApplication.processEvents()
-            trajectories_filtered = tp.link_df(
-                filtered_particles_df, search_range=search_range, memory=memory
-            )
+            ParticleProcessing.check_linking_memory(filtered_particles_df)
+            with instrumentation.stage("link_df", particles=len(filtered_particles_df)):
+                trajectories_filtered = tp.link_df(
+                    filtered_particles_df, search_range=search_range, memory=memory
+                )
             print(f"Created {trajectories_filtered['particle'].nunique()} filtered trajectories")
 
             print(f"Filtering filtered trajectories shorter than {min_trajectory_length} frames...")
             self.progress_label.setText("Working... Filtering trajectories...")
             QApplication.processEvents()
-            trajectories_filtered = tp.filter_stubs(trajectories_filtered, min_trajectory_length)
+            with instrumentation.stage("filter_stubs"):
+                trajectories_filtered = tp.filter_stubs(
+                    trajectories_filtered, min_trajectory_length
+                )
+            # link_df adds an int64 particle column; keep the project's table dtypes
+            trajectories_filtered = self.file_controller.to_project_dtypes(trajectories_filtered)
             print(
                 f"After filtering: {trajectories_filtered['particle'].nunique()} filtered trajectories"
             )
@@ -339,11 +404,15 @@ class LWParametersWidget(QWidget):
             self.progress_bar.setVisible(False)
             self.find_trajectories_button.setEnabled(True)
 
+    @instrumentation.timed("trajectory visualization")
     def create_trajectory_visualization(
         self, trajectories_df, output_folder, filename="trajectory_visualization.png"
     ):
         """Create a trajectory visualization on white background and save as image."""
         try:
+            # Imported here so matplotlib only loads when a visualization is made
+            import matplotlib.pyplot as plt
+
             # Get image dimensions from first frame using FileController
             if self.file_controller:
                 original_frames_folder = self.file_controller.original_frames_folder
@@ -14,9 +14,8 @@ from PySide6.QtCore import Qt, Signal
 import numpy as np
 import pandas as pd
 import pyqtgraph as pg
-import trackpy as tp
 
-from ..utils import GraphingUtils
+from ..utils import GraphingUtils, ParticleProcessing
 from .DW_LW_FilteringWidget import DWLWFilteringWidget
 
 
@@ -72,6 +71,8 @@ class LWPlottingWidget(GraphingUtils.GraphingPanelWidget):
         self.layout.addStretch(1)
 
     def get_linked_particles(self, linked_particles):
+        # The plots use drift-subtracted trajectories, so the saved summary (of the raw
+        # trajectories.csv) is not reused; the plots summarize their own data once
         self.data = linked_particles
         self.self_plot(self.get_trajectories, self.trajectory_button)
 
@@ -96,7 +97,7 @@ class LWPlottingWidget(GraphingUtils.GraphingPanelWidget):
                 return False
 
             scaling = self.config_manager.get_detection_params().get("scaling", 1.0)
-            drift = tp.compute_drift(self.data, smoothing=15) * scaling
+            drift = ParticleProcessing.compute_drift_table(self.data, scaling=scaling)
 
             plot, fonts = self._add_scaled_plot(title="Drift")
             self._style_plot(plot, xlabel="Frame", ylabel="Drift", fonts=fonts)
@@ -0,0 +1,466 @@
+"""
+Batch Queue
+
+Description: Processes a folder of videos without the GUI. Each video gets its own
+             project (created through ProjectManager, with the detection, linking and
+             data settings of a template config.ini and a copy of a template filters.ini),
+             and the headless pipeline runs for the projects across a process pool that
+             shares one core budget. Per-project status and timings are kept in a queue
+             manifest so an interrupted batch resumes where it stopped.
+
+Copyright (c) 2025, Jacqueline Reynaga, Kevin Pillsbury, Bakir Husremovic
+License: BSD 3-Clause License
+Date: 2025-12-08
+"""
+
+import argparse
+import configparser
+import json
+import os
+import re
+import shutil
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+from src.cli import STAGES, run_pipeline
+from src.utils.ProjectManager import ProjectManager
+from src.utils.WriteBehindQueue import atomic_write
+
+MANIFEST_FILE = "batch_queue.json"
+VIDEO_EXTENSIONS = (".mp4", ".avi", ".mov", ".mkv", ".tif", ".tiff")
+
+# Template config sections copied into every project ([Paths] and [Metadata] are per project)
+TEMPLATE_SECTIONS = ("Detection", "Linking", "Data")
+
+PENDING = "pending"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+
+def project_name_for_video(video_path):
+    """
+    Filesystem-safe project name for a video (its file name without extension).
+
+    Parameters
+    ----------
+    video_path : str
+        Video file.
+
+    Returns
+    -------
+    str
+        Project folder name.
+    """
+    name = os.path.splitext(os.path.basename(video_path))[0]
+    safe_name = re.sub(r'[<>:"/\\|?*]', "_", name).strip(" .")
+    return safe_name[:50] or "Untitled_Project"
+
+
+def find_videos(video_folder):
+    """
+    Video files directly inside a folder, sorted by name.
+
+    Parameters
+    ----------
+    video_folder : str
+        Folder to scan.
+
+    Returns
+    -------
+    list of str
+        Absolute video paths.
+    """
+    return sorted(
+        os.path.abspath(os.path.join(video_folder, name))
+        for name in os.listdir(video_folder)
+        if name.lower().endswith(VIDEO_EXTENSIONS)
+        and os.path.isfile(os.path.join(video_folder, name))
+    )
+
+
+def apply_template(project_path, template_config=None, template_filters=None):
+    """
+    Copy template settings into a newly created project.
+
+    Parameters
+    ----------
+    project_path : str
+        Project folder.
+    template_config : str, optional
+        config.ini whose Detection, Linking and Data sections replace the defaults.
+    template_filters : str, optional
+        filters.ini copied over the project's empty one.
+
+    Returns
+    -------
+    None
+    """
+    if template_config:
+        template = configparser.ConfigParser()
+        template.read(template_config)
+        config_path = os.path.join(project_path, "config.ini")
+        config = configparser.ConfigParser()
+        config.read(config_path)
+        for section in TEMPLATE_SECTIONS:
+            if not template.has_section(section):
+                continue
+            if not config.has_section(section):
+                config.add_section(section)
+            for key, value in template.items(section):
+                config.set(section, key, value)
+        with open(config_path, "w") as f:
+            config.write(f)
+    if template_filters:
+        shutil.copy2(template_filters, os.path.join(project_path, "filters.ini"))
+
+
+def _limit_memory(memory_limit_mb):
+    """Cap the address space of the current process (and its detection workers)."""
+    if not memory_limit_mb:
+        return
+    if resource is None:
+        print("Warning: Per-job memory limits are not supported on this platform")
+        return
+    limit = int(memory_limit_mb) * 1024 * 1024
+    _, hard = resource.getrlimit(resource.RLIMIT_AS)
+    if hard != resource.RLIM_INFINITY:
+        limit = min(limit, hard)
+    resource.setrlimit(resource.RLIMIT_AS, (limit, hard))
+
+
+def _run_job(job, template_config, template_filters, stages, workers, memory_limit_mb):
+    """
+    Process-pool worker: create (if needed) and run one project.
+
+    Returns
+    -------
+    dict
+        Job result with status, seconds, error and the pipeline timing summary.
+    """
+    start = time.perf_counter()
+    result = {"status": DONE, "error": None, "timings": None}
+    try:
+        _limit_memory(memory_limit_mb)
+        project_path = job["project"]
+        if not os.path.exists(os.path.join(project_path, "config.ini")):
+            created = ProjectManager().create_new_project(
+                project_path, video_path=job["video"]
+            )
+            if not created:
+                raise RuntimeError(f"Could not create project {project_path}")
+            apply_template(project_path, template_config, template_filters)
+        summary = run_pipeline(project_path, stages=stages, workers=workers)
+        result["timings"] = {
+            name: stage["seconds"] for name, stage in summary["stages"].items()
+        }
+    except MemoryError:
+        result["status"] = FAILED
+        result["error"] = f"Exceeded the {memory_limit_mb} MB memory limit"
+    except Exception as e:
+        result["status"] = FAILED
+        result["error"] = str(e)
+    result["seconds"] = round(time.perf_counter() - start, 4)
+    return result
+
+
+class BatchQueue:
+    """Queue of video -> project jobs, persisted in a JSON manifest."""
+
+    def __init__(self, output_folder):
+        """
+        Open (or create) the queue stored in ``output_folder``.
+
+        Parameters
+        ----------
+        output_folder : str
+            Folder the projects are created in; also holds the manifest.
+        """
+        self.output_folder = os.path.abspath(output_folder)
+        self.manifest_path = os.path.join(self.output_folder, MANIFEST_FILE)
+        self.jobs = self._read_manifest()
+
+    def _read_manifest(self):
+        if not os.path.exists(self.manifest_path):
+            return {}
+        try:
+            with open(self.manifest_path, "r") as f:
+                return json.load(f).get("jobs", {})
+        except (OSError, ValueError) as e:
+            print(f"Warning: Could not read batch manifest {self.manifest_path}: {e}")
+            return {}
+
+    def save(self):
+        """
+        Write the manifest (atomically, so an interrupted batch never leaves it truncated).
+
+        Returns
+        -------
+        None
+        """
+        os.makedirs(self.output_folder, exist_ok=True)
+
+        def write(tmp_path):
+            with open(tmp_path, "w") as f:
+                json.dump({"jobs": self.jobs}, f, indent=2)
+
+        atomic_write(self.manifest_path, write)
+
+    def add_videos(self, video_paths):
+        """
+        Add a job for every video not already in the queue.
+
+        Videos whose project names collide with another job (same file name with a
+        different extension, or names that only differ in replaced or truncated
+        characters) get a suffix with their extension, then a counter.
+
+        Parameters
+        ----------
+        video_paths : list of str
+            Videos to process.
+
+        Returns
+        -------
+        int
+            Number of jobs added.
+        """
+        queued = {os.path.abspath(job["video"]) for job in self.jobs.values()}
+        added = 0
+        for video_path in video_paths:
+            if os.path.abspath(video_path) in queued:
+                continue
+            name = self._unique_job_name(video_path)
+            queued.add(os.path.abspath(video_path))
+            self.jobs[name] = {
+                "video": video_path,
+                "project": os.path.join(self.output_folder, name),
+                "status": PENDING,
+            }
+            added += 1
+        return added
+
+    def _unique_job_name(self, video_path):
+        base = project_name_for_video(video_path)
+        if base not in self.jobs:
+            return base
+        extension = os.path.splitext(video_path)[1].lstrip(".").lower()
+        name = f"{base}_{extension}" if extension else base
+        counter = 2
+        while name in self.jobs:
+            name = f"{base}_{counter}"
+            counter += 1
+        print(
+            f"Warning: Project name {base} is already used by {self.jobs[base]['video']}; "
+            f"{video_path} is processed as {name}"
+        )
+        return name
+
+    def pending_jobs(self, retry_failed=False):
+        """
+        Names of the jobs still to run.
+
+        Jobs left ``running`` by an interrupted batch are run again.
+
+        Parameters
+        ----------
+        retry_failed : bool, optional
+            Also return failed jobs.
+
+        Returns
+        -------
+        list of str
+            Job names in queue order.
+        """
+        statuses = {PENDING, RUNNING} | ({FAILED} if retry_failed else set())
+        return [name for name, job in self.jobs.items() if job["status"] in statuses]
+
+    def _finish(self, name, result):
+        job = self.jobs[name]
+        job.update(result)
+        job["finished_at"] = time.strftime("%Y-%m-%d %H:%M:%S")
+        if result["status"] == DONE:
+            job.pop("error", None)
+            print(f"[{name}] done in {result['seconds']:.1f}s")
+        else:
+            print(f"[{name}] failed: {result['error']}")
+        self.save()
+
+    def run(
+        self,
+        template_config=None,
+        template_filters=None,
+        stages=STAGES,
+        cores=None,
+        jobs=None,
+        memory_limit_mb=None,
+        retry_failed=False,
+    ):
+        """
+        Run the pending jobs across a process pool.
+
+        The core budget is split between concurrent projects: ``jobs`` projects run at
+        once, each detecting with ``cores // jobs`` worker processes.
+
+        Parameters
+        ----------
+        template_config, template_filters : str, optional
+            Templates applied to newly created projects.
+        stages : iterable of str, optional
+            Pipeline stages to run for each project.
+        cores : int, optional
+            Total cores the batch may use. Defaults to the CPU count.
+        jobs : int, optional
+            Concurrent projects. Defaults to one per core, capped by the queue length.
+        memory_limit_mb : int, optional
+            Address-space limit per project (Unix only); a project exceeding it fails
+            without affecting the others.
+        retry_failed : bool, optional
+            Also rerun jobs that failed in an earlier run.
+
+        Returns
+        -------
+        dict
+            Count of jobs per status after the run.
+        """
+        names = self.pending_jobs(retry_failed)
+        cores = max(1, int(cores or os.cpu_count() or 1))
+        jobs = max(1, min(int(jobs or cores), cores, len(names) or 1))
+        workers = max(1, cores // jobs)
+        print(
+            f"Running {len(names)} of {len(self.jobs)} projects: "
+            f"{jobs} at a time, {workers} detection workers each"
+        )
+
+        queue = list(names)
+        while queue:
+            with ProcessPoolExecutor(max_workers=jobs) as pool:
+                running = {}
+                # Marked RUNNING but not yet in ``running`` while its submit is in flight
+                submitting = None
+                try:
+                    while queue or running:
+                        while queue and len(running) < jobs:
+                            submitting = queue.pop(0)
+                            self.jobs[submitting]["status"] = RUNNING
+                            self.jobs[submitting]["started_at"] = time.strftime(
+                                "%Y-%m-%d %H:%M:%S"
+                            )
+                            self.save()
+                            future = pool.submit(
+                                _run_job,
+                                self.jobs[submitting],
+                                template_config,
+                                template_filters,
+                                list(stages),
+                                workers,
+                                memory_limit_mb,
+                            )
+                            running[future] = submitting
+                            submitting = None
+                        done, _ = wait(running, return_when=FIRST_COMPLETED)
+                        for future in done:
+                            # Fetch first: a dead worker raises here, and its job must
+                            # still be in ``running`` to be failed below
+                            result = future.result()
+                            self._finish(running.pop(future), result)
+                except BrokenProcessPool:
+                    # A worker was killed (e.g. by the OS out-of-memory killer); fail the
+                    # projects that were running and continue with a fresh pool
+                    failed = list(running.values())
+                    if submitting is not None:
+                        failed.append(submitting)
+                    for name in failed:
+                        self._finish(
+                            name,
+                            {"status": FAILED, "error": "Worker process died", "seconds": None},
+                        )
+
+        counts = {}
+        for job in self.jobs.values():
+            # A job still RUNNING here never reported back, so it did not finish
+            status = FAILED if job["status"] == RUNNING else job["status"]
+            counts[status] = counts.get(status, 0) + 1
+        return counts
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        description="Create a project per video and run the headless pipeline for each."
+    )
+    parser.add_argument("videos", help="Folder of videos to process")
+    parser.add_argument("output", help="Folder to create the projects (and batch_queue.json) in")
+    parser.add_argument("--config", default=None, help="Template config.ini")
+    parser.add_argument("--filters", default=None, help="Template filters.ini")
+    parser.add_argument(
+        "--stages",
+        default=",".join(STAGES),
+        help=f"Comma-separated stages to run (default: {','.join(STAGES)})",
+    )
+    parser.add_argument("--cores", type=int, default=None, help="Total core budget (default: CPUs)")
+    parser.add_argument(
+        "--jobs", type=int, default=None, help="Projects run at once (default: one per core)"
+    )
+    parser.add_argument(
+        "--memory-limit", type=int, default=None, help="Memory limit per project in MB"
+    )
+    parser.add_argument(
+        "--retry-failed", action="store_true", help="Rerun projects that failed previously"
+    )
+    return parser
+
+
+def main(argv=None):
+    """
+    Command-line entry point.
+
+    Parameters
+    ----------
+    argv : list of str, optional
+        Arguments (defaults to sys.argv[1:]).
+
+    Returns
+    -------
+    int
+        Exit code (0 if every project finished).
+    """
+    args = build_parser().parse_args(argv)
+    stages = [stage.strip() for stage in args.stages.split(",") if stage.strip()]
+    unknown = [stage for stage in stages if stage not in STAGES]
+    if unknown:
+        print(f"Unknown stages: {', '.join(unknown)}", file=sys.stderr)
+        return 2
+    for path in (args.config, args.filters):
+        if path and not os.path.isfile(path):
+            print(f"Template not found: {path}", file=sys.stderr)
+            return 2
+    if not os.path.isdir(args.videos):
+        print(f"Video folder not found: {args.videos}", file=sys.stderr)
+        return 2
+
+    queue = BatchQueue(args.output)
+    added = queue.add_videos(find_videos(args.videos))
+    queue.save()
+    print(f"Added {added} new videos to {queue.manifest_path}")
+
+    counts = queue.run(
+        template_config=os.path.abspath(args.config) if args.config else None,
+        template_filters=os.path.abspath(args.filters) if args.filters else None,
+        stages=stages,
+        cores=args.cores,
+        jobs=args.jobs,
+        memory_limit_mb=args.memory_limit,
+        retry_failed=args.retry_failed,
+    )
+    print(", ".join(f"{count} {status}" for status, count in sorted(counts.items())))
+    return 0 if counts.get(FAILED, 0) == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,450 @@
+"""
+Headless Pipeline
+
+Description: Command-line pipeline that runs a project without the GUI:
+             ingest -> background -> detect -> filter -> link -> drift -> diagnostics.
+             Uses the same ProjectManager, ConfigManager, FileController and
+             ParticleProcessing code as the GUI (no PySide6 import), detects particles
+             across a process pool, and writes a JSON timing summary to the project's
+             data folder.
+
+Copyright (c) 2025, Jacqueline Reynaga, Kevin Pillsbury, Bakir Husremovic
+License: BSD 3-Clause License
+Date: 2025-12-08
+"""
+
+import argparse
+import contextlib
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+from src.utils.Background import FrameBackground, compute_background
+from src.utils.ConfigManager import ConfigManager
+from src.utils.DetectionChunks import (
+    DETECTION_CHUNKS_FOLDER,
+    read_detection_chunks,
+    remove_detection_chunks,
+)
+from src.utils.FileController import FileController
+from src.utils.FilterEngine import apply_filters, read_filters_ini
+from src.utils.FrameStore import get_full_frame_size
+from src.utils.Instrumentation import instrumentation
+from src.utils.ProjectManager import ProjectManager
+from src.utils.TiledDetection import choose_tile_grid
+from src.utils.TrajectorySummary import compute_trajectory_summary
+from src.utils import ParticleProcessing
+
+STAGES = ("ingest", "background", "detect", "filter", "link", "drift", "diagnostics")
+TIMINGS_FILE = "pipeline_timings.json"
+
+
+class StageTimings:
+    """Wall-clock time and counters per pipeline stage."""
+
+    def __init__(self):
+        self.stages = {}
+
+    def stage(self, name):
+        """
+        Context manager timing one stage.
+
+        Parameters
+        ----------
+        name : str
+            Stage name.
+
+        Returns
+        -------
+        _StageContext
+            Context whose ``counts`` dict is stored with the timing.
+        """
+        return _StageContext(self, name)
+
+    def as_dict(self):
+        total = sum(stage["seconds"] for stage in self.stages.values())
+        return {"stages": self.stages, "total_seconds": round(total, 4)}
+
+
+class _StageContext:
+    def __init__(self, timings, name):
+        self.timings = timings
+        self.name = name
+        self.counts = {}
+
+    def __enter__(self):
+        print(f"[{self.name}] starting")
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        seconds = time.perf_counter() - self._start
+        entry = {"seconds": round(seconds, 4), **self.counts}
+        if exc_type is not None:
+            entry["error"] = str(exc)
+        self.timings.stages[self.name] = entry
+        print(f"[{self.name}] {'failed' if exc_type else 'done'} in {seconds:.2f}s")
+        return False
+
+
+def _detect_chunk(frame_paths, params, chunk_folder=None):
+    """
+    Process-pool worker: detect particles in a contiguous run of frames.
+
+    With ``chunk_folder`` the particles are left in chunk files there and only the row
+    count is sent back, instead of pickling the whole table to the parent.
+    """
+    # The pool already parallelizes over frames: no nested tile pools
+    if chunk_folder is None:
+        return ParticleProcessing.find_particles_in_frames(frame_paths, params, tile_workers=1)
+    with instrumentation.stage("detect particles"):
+        return ParticleProcessing.stream_particles_to_chunks(
+            frame_paths, chunk_folder, params, tile_workers=1
+        )
+
+
+def detect_particles(frame_paths, params, workers=None, chunk_folder=None):
+    """
+    Detect particles in frames across a process pool.
+
+    Frames are split into contiguous chunks (several per worker, to balance uneven
+    frames) and the results are concatenated in frame order. Frames large enough for
+    tiled detection are instead processed one at a time, with their tiles spread over
+    the workers.
+
+    Parameters
+    ----------
+    frame_paths : list of str
+        Frame image paths.
+    params : dict
+        Detection parameters (feature_size, min_mass, invert, threshold).
+    workers : int, optional
+        Number of worker processes. Defaults to the CPU count; 1 runs in-process.
+    chunk_folder : str, optional
+        Stream results through chunk files in this folder (one subfolder per frame
+        run) and assemble the final table from them, instead of holding every
+        result in memory and concatenating.
+
+    Returns
+    -------
+    pd.DataFrame
+        Detected particles (empty if none were found).
+    """
+    if workers is None:
+        workers = os.cpu_count() or 1
+    workers = max(1, int(workers))
+
+    frame_size = get_full_frame_size(os.path.dirname(frame_paths[0])) if frame_paths else None
+    if frame_size is not None:
+        grid = choose_tile_grid(
+            (frame_size[1], frame_size[0]),
+            int(params.get("feature_size", 15)),
+            workers,
+            params.get("tiling", "auto"),
+        )
+        if grid != (1, 1):
+            print(f"Tiled detection: {grid[0]}x{grid[1]} tiles per frame on {workers} workers")
+            return ParticleProcessing.find_particles_in_frames(
+                frame_paths, params, chunk_folder=chunk_folder, tile_workers=workers
+            )
+
+    workers = min(workers, len(frame_paths) or 1)
+    if workers == 1:
+        return ParticleProcessing.find_particles_in_frames(
+            frame_paths, params, chunk_folder=chunk_folder, tile_workers=1
+        )
+
+    chunk_count = min(len(frame_paths), workers * 4)
+    chunk_size = -(-len(frame_paths) // chunk_count)
+    chunks = [frame_paths[i : i + chunk_size] for i in range(0, len(frame_paths), chunk_size)]
+    part_folders = [None] * len(chunks)
+    if chunk_folder is not None:
+        remove_detection_chunks(chunk_folder)
+        part_folders = [
+            os.path.join(chunk_folder, f"part_{i:04d}") for i in range(len(chunks))
+        ]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        results = list(pool.map(_detect_chunk, chunks, [params] * len(chunks), part_folders))
+
+    if chunk_folder is not None:
+        with instrumentation.stage("assemble chunks", rows=sum(results)):
+            particles = read_detection_chunks(part_folders)
+        remove_detection_chunks(chunk_folder)
+        return particles
+
+    results = [df for df in results if df is not None and not df.empty]
+    if not results:
+        return pd.DataFrame()
+    return pd.concat(results, ignore_index=True)
+
+
+def _frame_selection(config_manager, start=None, end=None, step=None):
+    """0-based (start, end, step) from arguments, falling back to the config frame range."""
+    has_range = config_manager.get("Detection", "end_frame") is not None
+    frame_range = config_manager.get_frame_range() if has_range else {}
+    if start is None and "start_frame" in frame_range:
+        start = frame_range["start_frame"]
+    if end is None and "end_frame" in frame_range:
+        end = frame_range["end_frame"]
+    if step is None:
+        step = frame_range.get("step_frame", 1)
+    # Config and command line use 1-based frame numbers like the GUI
+    return (
+        None if start is None else int(start) - 1,
+        None if end is None else int(end) - 1,
+        int(step),
+    )
+
+
+def run_pipeline(project_path, stages=STAGES, workers=None, start=None, end=None, step=None):
+    """
+    Run pipeline stages for a project.
+
+    Parameters
+    ----------
+    project_path : str
+        Project folder (containing config.ini).
+    stages : iterable of str, optional
+        Stages to run, in pipeline order. Defaults to all of STAGES.
+    workers : int, optional
+        Detection worker processes.
+    start, end, step : int, optional
+        1-based frame range to detect. Defaults to the range saved in config.ini,
+        or every frame if none is saved.
+
+    Returns
+    -------
+    dict
+        Timing summary (also written to data/pipeline_timings.json).
+
+    Raises
+    ------
+    Exception
+        The error of the first failing stage, after the summary has been written.
+    """
+    project_path = os.path.abspath(project_path)
+    project_manager = ProjectManager()
+    if not project_manager.load_project(project_path):
+        raise ValueError(f"Not a project folder: {project_path}")
+
+    config_manager = ConfigManager(os.path.join(project_path, "config.ini"))
+    file_controller = FileController(config_manager, project_path)
+    ParticleProcessing.set_file_controller(file_controller)
+    file_controller.ensure_folder_exists(file_controller.data_folder)
+    instrumentation.set_log_folder(file_controller.data_folder)
+    memory_settings = config_manager.get_memory_settings()
+    instrumentation.configure_memory(
+        memory_settings["budget_bytes"], memory_settings["trace_memory"]
+    )
+
+    stages = [stage for stage in STAGES if stage in set(stages)]
+    timings = StageTimings()
+    detection_params = config_manager.get_detection_params()
+    linking_params = config_manager.get_linking_params()
+    trajectories_file = file_controller.get_data_file_path("trajectories.csv")
+
+    error = None
+    try:
+        if "ingest" in stages:
+            with timings.stage("ingest") as stage:
+                frame_count = file_controller.get_total_frames_count()
+                if frame_count == 0:
+                    video_filename = config_manager.get_metadata().get("movie_filename", "")
+                    video_path = os.path.join(file_controller.videos_folder, video_filename)
+                    if not video_filename or not os.path.exists(video_path):
+                        raise FileNotFoundError(f"Video not found: {video_path}")
+                    frame_count = ParticleProcessing.extract_video_frames(
+                        video_path, file_controller.original_frames_folder
+                    )
+                    if frame_count is None:
+                        raise IOError(f"Could not open video: {video_path}")
+                    stage.counts["extracted"] = True
+                stage.counts["frames"] = frame_count
+
+        if "background" in stages and detection_params["background"] != "off":
+            with timings.stage("background") as stage:
+                frames_folder = file_controller.original_frames_folder
+                mode = detection_params["background"]
+                window = detection_params["background_window"]
+                background = FrameBackground.load(frames_folder, mode, window)
+                if background is None:
+                    manifest = compute_background(
+                        file_controller.get_all_frame_paths(), frames_folder, mode, window
+                    )
+                    if manifest is None:
+                        raise ValueError("Could not compute the background")
+                    stage.counts["computed"] = True
+                    stage.counts["blocks"] = len(manifest["blocks"])
+                else:
+                    stage.counts["blocks"] = len(background.blocks)
+
+        if "detect" in stages:
+            with timings.stage("detect") as stage:
+                first, last, frame_step = _frame_selection(config_manager, start, end, step)
+                frame_paths = file_controller.get_frame_files(first, last, frame_step)
+                if not frame_paths:
+                    raise ValueError("No frames found in range")
+                particles = detect_particles(
+                    frame_paths,
+                    detection_params,
+                    workers,
+                    chunk_folder=file_controller.get_data_file_path(DETECTION_CHUNKS_FOLDER),
+                )
+                particles = file_controller.to_project_dtypes(particles)
+                file_controller.save_particles_data(particles)
+                stage.counts["frames"] = len(frame_paths)
+                stage.counts["particles"] = len(particles)
+                stage.counts["workers"] = max(
+                    1, min(workers or os.cpu_count() or 1, len(frame_paths))
+                )
+
+        if "filter" in stages:
+            with timings.stage("filter") as stage:
+                particles = file_controller.load_particles_data("all_particles.csv")
+                filters, compound_filters = read_filters_ini(
+                    os.path.join(project_path, "filters.ini")
+                )
+                filtered = apply_filters(particles, filters, compound_filters)
+                file_controller.save_filtered_particles_data(filtered)
+                stage.counts["filters"] = len(filters) + len(compound_filters)
+                stage.counts["particles_in"] = len(particles)
+                stage.counts["particles_out"] = len(filtered)
+
+        if "link" in stages:
+            with timings.stage("link") as stage:
+                filtered = file_controller.load_particles_data("filtered_particles.csv")
+                if filtered.empty:
+                    raise ValueError("filtered_particles.csv is empty; run detect and filter first")
+                trajectories = ParticleProcessing.link_trajectories(
+                    filtered,
+                    search_range=float(linking_params["search_range"]),
+                    memory=int(linking_params["memory"]),
+                    min_trajectory_length=int(linking_params["min_trajectory_length"]),
+                )
+                trajectories = file_controller.to_project_dtypes(trajectories)
+                file_controller.save_trajectories_data(trajectories)
+                stage.counts["particles"] = len(filtered)
+                stage.counts["trajectories"] = int(trajectories["particle"].nunique())
+
+        if "drift" in stages:
+            with timings.stage("drift") as stage:
+                trajectories = file_controller.load_trajectories_data("trajectories.csv")
+                if trajectories.empty:
+                    raise ValueError("trajectories.csv is empty; run link first")
+                drift = ParticleProcessing.compute_drift_table(
+                    trajectories, scaling=detection_params.get("scaling", 1.0)
+                )
+                file_controller.save_drift_data(drift)
+                corrected = ParticleProcessing.subtract_drift(trajectories, drift)
+                file_controller.save_trajectories_data(
+                    corrected, file_controller.TRAJECTORIES_DRIFT_SUBTRACTED_CSV
+                )
+                file_controller.save_trajectory_summary(compute_trajectory_summary(trajectories))
+                stage.counts["frames"] = len(drift)
+
+        if "diagnostics" in stages:
+            with timings.stage("diagnostics") as stage:
+                ParticleProcessing.save_errant_particle_crops_for_frame(detection_params)
+                ParticleProcessing.create_errant_distance_links_gallery(
+                    trajectories_file=trajectories_file,
+                    frames_folder=file_controller.original_frames_folder,
+                    output_folder=file_controller.errant_distance_links_folder,
+                )
+                links = ParticleProcessing.find_and_save_high_memory_links(
+                    trajectories_file, int(linking_params["memory"]), max_links=5
+                )
+                stage.counts["memory_links"] = len(links or [])
+    except Exception as e:
+        error = e
+    finally:
+        file_controller.flush_writes()
+
+    summary = {
+        "project": project_path,
+        "stages_run": stages,
+        "finished_at": time.strftime("%Y-%m-%d %H:%M:%S"),
+        **timings.as_dict(),
+    }
+    if error is not None:
+        summary["error"] = str(error)
+    file_controller.ensure_folder_exists(file_controller.data_folder)
+    with open(os.path.join(file_controller.data_folder, TIMINGS_FILE), "w") as f:
+        json.dump(summary, f, indent=2)
+    if error is not None:
+        raise error
+    return summary
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        description="Run particle detection and linking for a project without the GUI."
+    )
+    parser.add_argument("project", help="Project folder (containing config.ini)")
+    parser.add_argument(
+        "--stages",
+        default=",".join(STAGES),
+        help=f"Comma-separated stages to run (default: {','.join(STAGES)})",
+    )
+    parser.add_argument(
+        "--workers", type=int, default=None, help="Detection worker processes (default: CPUs)"
+    )
+    parser.add_argument("--start", type=int, default=None, help="First frame (1-based)")
+    parser.add_argument("--end", type=int, default=None, help="Last frame (1-based)")
+    parser.add_argument("--step", type=int, default=None, help="Frame step")
+    parser.add_argument(
+        "--json", action="store_true", help="Print the timing summary as JSON on stdout"
+    )
+    return parser
+
+
+def main(argv=None):
+    """
+    Command-line entry point.
+
+    Parameters
+    ----------
+    argv : list of str, optional
+        Arguments (defaults to sys.argv[1:]).
+
+    Returns
+    -------
+    int
+        Exit code (0 on success).
+    """
+    args = build_parser().parse_args(argv)
+    stages = [stage.strip() for stage in args.stages.split(",") if stage.strip()]
+    unknown = [stage for stage in stages if stage not in STAGES]
+    if unknown:
+        print(f"Unknown stages: {', '.join(unknown)}", file=sys.stderr)
+        return 2
+
+    try:
+        # Keep stdout clean for the JSON summary; progress output goes to stderr
+        with contextlib.redirect_stdout(sys.stderr if args.json else sys.stdout):
+            summary = run_pipeline(
+                args.project,
+                stages=stages,
+                workers=args.workers,
+                start=args.start,
+                end=args.end,
+                step=args.step,
+            )
+    except Exception as e:
+        print(f"Pipeline failed: {e}", file=sys.stderr)
+        return 1
+
+    if args.json:
+        print(json.dumps(summary, indent=2))
+    else:
+        for name, stage in summary["stages"].items():
+            print(f"{name:>12}: {stage['seconds']:.2f}s")
+        print(f"{'total':>12}: {summary['total_seconds']:.2f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -11,19 +11,28 @@ Date: 2025-12-08
 
 import sys
 import os
+import configparser
+import io
 import platform
-import pandas as pd
 import shutil
-from PySide6.QtWidgets import QApplication, QMainWindow, QStackedWidget, QMessageBox
-from PySide6.QtGui import QGuiApplication
-from PySide6 import QtWidgets
-from src.UI.SSW_StartScreenWindow import SSWStartScreenWindow
-from src.UI.DW_DetectionWindow import DWDetectionWindow
-from src.UI.LW_LinkingWindow import LWLinkingWindow
+from typing import TYPE_CHECKING
+from src.utils.StartupProfiler import startup_profiler
+
+with startup_profiler.phase("import PySide6"):
+    from PySide6.QtWidgets import QApplication, QMainWindow, QStackedWidget, QMessageBox
+    from PySide6.QtGui import QGuiApplication
+    from PySide6.QtCore import QTimer
+    from PySide6 import QtWidgets
+with startup_profiler.phase("import start screen"):
+    from src.UI.SSW_StartScreenWindow import SSWStartScreenWindow
+from src.utils.StallWatchdog import StallWatchdog, WatchdogApplication, threshold_from_argv
 from src.utils.ProjectManager import ProjectManager
-from src.utils.FileController import FileController
 from src.utils.ConfigManager import ConfigManager
-from src.utils import ParticleProcessing
+
+# The detection/linking windows and the data modules (pandas, OpenCV, pyqtgraph,
+# trackpy) are imported when a project is opened, so the start screen appears quickly
+if TYPE_CHECKING:
+    import pandas as pd
 
 
 class ParticleTrackingAppController(QMainWindow):
@@ -44,6 +53,7 @@ class ParticleTrackingAppController(QMainWindow):
         self.project_config = None  # Will be set when project is loaded
         self.project_manager = ProjectManager()
         self.file_controller = None  # Will be initialized when project is loaded
+        self.undo_history = None  # Detection undo levels for the loaded project
 
         # Initialize windows
         self.ssw_start_screen_window = None
@@ -108,10 +118,35 @@ class ParticleTrackingAppController(QMainWindow):
         """
         # Load the project
         if self.project_manager.load_project(project_path):
+            with startup_profiler.phase("import data modules"):
+                from src.utils.FileController import FileController
+                from src.utils.UndoHistory import UndoHistory
+                from src.utils import ParticleProcessing
+                from src.utils.Instrumentation import instrumentation
+
             # Initialize project-specific config and file controller
             project_config_path = os.path.join(project_path, "config.ini")
+            if self.file_controller:
+                self.file_controller.flush_writes()
             self.project_config = ConfigManager(project_config_path)
             self.file_controller = FileController(self.project_config, project_path)
+            undo_limits = self.project_config.get_undo_limits()
+            self.undo_history = UndoHistory(
+                self.file_controller.data_folder,
+                max_levels=undo_limits["levels"],
+                max_bytes=undo_limits["max_bytes"],
+            )
+
+            # Stage timings of this project go to data/performance_log.jsonl
+            instrumentation.set_log_folder(self.file_controller.data_folder)
+            memory_settings = self.project_config.get_memory_settings()
+            instrumentation.configure_memory(
+                memory_settings["budget_bytes"], memory_settings["trace_memory"]
+            )
+            # ... and GUI stalls (with --watch-stalls) to data/stall_log.jsonl
+            watchdog = getattr(QApplication.instance(), "stall_watchdog", None)
+            if watchdog is not None:
+                watchdog.set_log_folder(self.file_controller.data_folder)
 
             # Set file controller in particle processing module
             ParticleProcessing.set_file_controller(self.file_controller)
@@ -148,7 +183,10 @@ class ParticleTrackingAppController(QMainWindow):
         self.cleanup_windows(False)
 
         # Create particle detection window
-        self.dw_detection_window = DWDetectionWindow()
+        with startup_profiler.phase("import detection window"):
+            from src.UI.DW_DetectionWindow import DWDetectionWindow
+        with startup_profiler.phase("construct detection window"):
+            self.dw_detection_window = DWDetectionWindow()
         self.dw_detection_window.set_config_manager(self.project_config)
         self.dw_detection_window.set_file_controller(self.file_controller)
 
@@ -192,7 +230,10 @@ class ParticleTrackingAppController(QMainWindow):
         self.cleanup_windows(False)
 
         # Create trajectory linking window
-        self.lw_linking_window = LWLinkingWindow()
+        with startup_profiler.phase("import linking window"):
+            from src.UI.LW_LinkingWindow import LWLinkingWindow
+        with startup_profiler.phase("construct linking window"):
+            self.lw_linking_window = LWLinkingWindow()
         self.lw_linking_window.set_config_manager(self.project_config)
         self.lw_linking_window.set_file_controller(self.file_controller)
 
@@ -256,12 +297,15 @@ class ParticleTrackingAppController(QMainWindow):
         if clear_rb_gallery:
             self.cleanup_errant_distance_links()
 
-        # Close existing windows
+        # Close existing windows; their performance panels stop listening for stage
+        # records, since closed windows are not deleted
         if self.dw_detection_window:
+            self.dw_detection_window.performance_widget.dispose()
             self.dw_detection_window.close()
             self.dw_detection_window = None
 
         if self.lw_linking_window:
+            self.lw_linking_window.performance_widget.dispose()
             self.lw_linking_window.close()
             self.lw_linking_window = None
 
@@ -291,6 +335,9 @@ class ParticleTrackingAppController(QMainWindow):
         """
         # Close any open windows but keep generated data on disk
         self.cleanup_windows(False)
+        # Let queued data file writes finish before the process exits
+        if self.file_controller:
+            self.file_controller.flush_writes()
         super().closeEvent(event)
 
     def load_spreadsheet_and_config(self, spreadsheet_path: str, config_file_path: str) -> bool:
@@ -383,31 +430,8 @@ class ParticleTrackingAppController(QMainWindow):
                 if not test_params:
                     raise ValueError("Config file was not properly loaded after replacement")
 
-            # 3. Get all parameters from the reloaded project config
-            detection_params = self.project_config.get_detection_params()
-            linking_params = self.project_config.get_linking_params()
-            frame_range = self.project_config.get_frame_range()
-
-            # 4. Update all UI widgets - following the exact same flow as "Find Particles" button
-            # Update detection window if it exists
-            if self.dw_detection_window:
-                # Use centralized refresh function to update all UI elements
-                # block_signals=True prevents parameter widgets from overwriting the restored config
-                self.dw_detection_window.refresh_detection_ui(
-                    particles_df=particles_df,
-                    config_manager=self.project_config,
-                    frame_range=frame_range,
-                    block_signals=True,
-                )
-
-            # Update linking window if it exists
-            if self.lw_linking_window:
-                # Update config manager
-                self.lw_linking_window.set_config_manager(self.project_config)
-
-                # Update displays
-                self.lw_linking_window._update_parameters_info()
-                self.lw_linking_window._update_metadata_display()
+            # 3-4. Update all UI widgets from the reloaded config
+            self._refresh_after_restore(particles_df)
 
             QMessageBox.information(
                 self,
@@ -423,88 +447,132 @@ class ParticleTrackingAppController(QMainWindow):
             )
             return False
 
+    def _refresh_after_restore(self, particles_df: "pd.DataFrame") -> None:
+        """
+        Update every window after the particles and config have been replaced.
+
+        Parameters
+        ----------
+        particles_df : pd.DataFrame
+            Restored particle data.
+
+        Returns
+        -------
+        None
+        """
+        frame_range = self.project_config.get_frame_range()
+
+        # Update all UI widgets - following the exact same flow as "Find Particles" button
+        # Update detection window if it exists
+        if self.dw_detection_window:
+            # Use centralized refresh function to update all UI elements
+            # block_signals=True prevents parameter widgets from overwriting the restored config
+            self.dw_detection_window.refresh_detection_ui(
+                particles_df=particles_df,
+                config_manager=self.project_config,
+                frame_range=frame_range,
+                block_signals=True,
+            )
+
+        # Update linking window if it exists
+        if self.lw_linking_window:
+            # Update config manager
+            self.lw_linking_window.set_config_manager(self.project_config)
+
+            # Update displays
+            self.lw_linking_window._update_parameters_info()
+            self.lw_linking_window._update_metadata_display()
+
+    def _current_config_text(self) -> str:
+        """
+        Serialize the project config, with the frame range currently shown in the UI.
+
+        Returns
+        -------
+        str
+            Config file contents.
+        """
+        config = configparser.ConfigParser()
+        if self.project_config.config_path and os.path.exists(self.project_config.config_path):
+            config.read(self.project_config.config_path)
+        else:
+            config.read_dict(self.project_config.config)
+
+        if self.dw_detection_window and hasattr(self.dw_detection_window, "right_panel"):
+            right_panel = self.dw_detection_window.right_panel
+            if hasattr(right_panel, "start_frame_input"):
+                if not config.has_section("Detection"):
+                    config.add_section("Detection")
+                config.set("Detection", "start_frame", str(right_panel.start_frame_input.value()))
+                config.set("Detection", "end_frame", str(right_panel.end_frame_input.value()))
+                config.set("Detection", "step_frame", str(right_panel.step_frame_input.value()))
+
+        buffer = io.StringIO()
+        config.write(buffer)
+        return buffer.getvalue()
+
     def save_current_state(self) -> bool:
         """
-        Save the current state (spreadsheet and config) to the save folder for undo.
+        Push the current state (particle data and config) onto the undo history.
+
+        The particle table is stored once per distinct content, so a run that did not
+        change all_particles.csv since the last save does not write it again.
 
         Returns
         -------
         bool
             True if successful, False otherwise
         """
-        if not self.project_config or not self.file_controller:
+        if not self.project_config or not self.file_controller or not self.undo_history:
             return False
 
         try:
-            # Save all_particles.csv to save folder using FileController
             all_particles_path = self.file_controller.get_data_file_path("all_particles.csv")
-            if os.path.exists(all_particles_path):
-                # Load and save to save folder
-                particles_df = self.file_controller.load_particles_data("all_particles.csv")
-                self.file_controller.save_to_save_folder(particles_df, "all_particles.csv")
-            else:
-                # Save empty DataFrame if file doesn't exist
-                self.file_controller.save_to_save_folder(pd.DataFrame(), "all_particles.csv")
-
-            # Save config.ini to save folder - include current frame range if detection window exists
-            save_config_path = os.path.join(self.file_controller.data_folder, "save", "config.ini")
-            if self.project_config.config_path:
-                # Copy the current config file using FileController
-                self.file_controller.copy_file_to_save_folder(
-                    self.project_config.config_path, "config.ini"
-                )
-                save_config_path = os.path.join(
-                    self.file_controller.data_folder, "save", "config.ini"
-                )
-            else:
-                # Save current config state
-                save_folder = os.path.join(self.file_controller.data_folder, "save")
-                os.makedirs(save_folder, exist_ok=True)
-                save_config_path = os.path.join(save_folder, "config.ini")
-                self.project_config.save(save_config_path)
-
-            # Update saved config with current frame range from UI if available
-            if self.dw_detection_window and hasattr(self.dw_detection_window, "right_panel"):
-                right_panel = self.dw_detection_window.right_panel
-                if hasattr(right_panel, "start_frame_input"):
-                    start_frame = right_panel.start_frame_input.value()
-                    end_frame = right_panel.end_frame_input.value()
-                    step_frame = right_panel.step_frame_input.value()
-
-                    # Load the saved config and update frame range
-                    temp_config = ConfigManager(save_config_path)
-                    temp_config.save_frame_range(start_frame, end_frame, step_frame)
-                    temp_config.save(save_config_path)
-
-            return True
+            self.file_controller.wait_for_write(all_particles_path)
+            return self.undo_history.push(
+                self._current_config_text(),
+                all_particles_path,
+                load_table=lambda: self.file_controller.load_particles_data("all_particles.csv"),
+            )
         except Exception as e:
             print(f"Error saving current state: {e}")
             return False
 
     def undo_last_state(self) -> bool:
         """
-        Restore the previous state from the save folder.
+        Restore the most recent state from the undo history.
 
         Returns
         -------
         bool
             True if successful, False otherwise
         """
-        if not self.project_config or not self.file_controller:
+        if not self.project_config or not self.file_controller or not self.undo_history:
             return False
 
-        # Use FileController to get save folder paths
-        save_particles_path = os.path.join(
-            self.file_controller.data_folder, "save", "all_particles.csv"
-        )
-        save_config_path = os.path.join(self.file_controller.data_folder, "save", "config.ini")
-
-        # Check if save exists
-        if not os.path.exists(save_particles_path) or not os.path.exists(save_config_path):
+        state = self.undo_history.pop()
+        if state is None:
             return False
+        particles_df, config_text = state
+
+        try:
+            self.file_controller.save_particles_data(particles_df)
+
+            if self.project_config.config_path:
+                with open(self.project_config.config_path, "w") as f:
+                    f.write(config_text)
+                # Clear the old config completely to remove any cached values
+                self.project_config.config.clear()
+                self.project_config._load_config()
+            else:
+                self.project_config.config.clear()
+                self.project_config.config.read_string(config_text)
 
-        # Use the load_spreadsheet_and_config function to restore state
-        return self.load_spreadsheet_and_config(save_particles_path, save_config_path)
+            self._refresh_after_restore(particles_df)
+            return True
+        except Exception as e:
+            QMessageBox.critical(self, "Undo Error", f"Error restoring previous state:\n{str(e)}")
+            return False
 
     def has_undo_state(self) -> bool:
         """
@@ -515,16 +583,7 @@ class ParticleTrackingAppController(QMainWindow):
         bool
             True if saved state exists, False otherwise
         """
-        if not self.file_controller:
-            return False
-
-        # Use FileController to check save folder paths
-        save_particles_path = os.path.join(
-            self.file_controller.data_folder, "save", "all_particles.csv"
-        )
-        save_config_path = os.path.join(self.file_controller.data_folder, "save", "config.ini")
-
-        return os.path.exists(save_particles_path) and os.path.exists(save_config_path)
+        return self.undo_history is not None and len(self.undo_history) > 0
 
     def _on_particles_updated(self):
         """
@@ -545,12 +604,25 @@ def main():
     """
     Main application entry point.
 
+    Pass --profile-startup to print import and window construction times once the
+    start screen is shown (and when the detection/linking windows are first built).
+    Pass --watch-stalls[=ms] to log GUI-thread event handlers that run longer than
+    the threshold (default 250 ms).
+
     Returns
     -------
     int
         Exit code from the application.
     """
-    app = QApplication(sys.argv)
+    startup_profiler.enable_from_argv(sys.argv)
+    stall_threshold_ms = threshold_from_argv(sys.argv)
+    with startup_profiler.phase("create QApplication"):
+        if stall_threshold_ms is not None:
+            watchdog = StallWatchdog(stall_threshold_ms)
+            app = WatchdogApplication(sys.argv, watchdog)
+            watchdog.start()
+        else:
+            app = QApplication(sys.argv)
 
     # Set the application style based on operating system
     system = platform.system()
@@ -569,8 +641,17 @@ def main():
         app.setStyle(QtWidgets.QStyleFactory.create("Fusion"))
 
     # Create and show the main controller
-    controller = ParticleTrackingAppController()
-    controller.show()
+    with startup_profiler.phase("construct start screen"):
+        controller = ParticleTrackingAppController()
+        controller.show()
+
+    if startup_profiler.enabled:
+        # Runs once the event loop has painted the start screen
+        def report_startup():
+            startup_profiler.mark("start screen shown")
+            startup_profiler.report()
+
+        QTimer.singleShot(0, report_startup)
 
     # Run the application
     sys.exit(app.exec())
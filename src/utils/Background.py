@@ -0,0 +1,358 @@
+"""
+Background Module
+
+Description: Precomputed median background of the frame stack, subtracted from each
+             frame before particle detection to remove uneven illumination. The
+             background is either one global median image or a rolling median per block
+             of frames. Medians are taken over evenly sampled frames, in row bands
+             sized so the stacked band stays within a fixed memory limit. Backgrounds
+             are stored as PNG images with a manifest in the frames folder (next to
+             the frame pyramid) and are removed when frames are re-extracted.
+
+Copyright (c) 2025, Jacqueline Reynaga, Kevin Pillsbury, Bakir Husremovic
+License: BSD 3-Clause License
+Date: 2025-12-08
+"""
+
+import json
+import os
+import shutil
+
+import cv2
+import numpy as np
+
+from .Instrumentation import instrumentation
+from .WriteBehindQueue import atomic_write
+
+BACKGROUND_FOLDER = "background"
+BACKGROUND_MANIFEST = "background.json"
+BACKGROUND_MODES = ("off", "global", "rolling")
+
+# Frames per rolling background block
+DEFAULT_WINDOW = 100
+# Frames sampled per block for the median
+MAX_SAMPLE_FRAMES = 50
+# Size limit of the stacked row band the median is taken over
+BAND_BYTES = 256 * 1024 * 1024
+
+
+def get_background_folder(frames_folder):
+    """
+    Folder holding the backgrounds of a frames folder.
+
+    Parameters
+    ----------
+    frames_folder : str
+        Folder with the extracted frames.
+
+    Returns
+    -------
+    str
+        Background folder path.
+    """
+    return os.path.join(frames_folder, BACKGROUND_FOLDER)
+
+
+def remove_background(frames_folder):
+    """
+    Delete the stored backgrounds (e.g. when frames are re-extracted).
+
+    Parameters
+    ----------
+    frames_folder : str
+        Folder with the extracted frames.
+
+    Returns
+    -------
+    None
+    """
+    folder = get_background_folder(frames_folder)
+    if os.path.isdir(folder):
+        shutil.rmtree(folder, ignore_errors=True)
+
+
+def _frame_number(path):
+    return int(os.path.splitext(os.path.basename(path))[0].split("_")[-1])
+
+
+def _read_gray(path):
+    # Same conversion as detection, so the background matches the detected frames
+    image = cv2.imread(path)
+    if image is None:
+        return None
+    return cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+
+
+def _png_writer(image):
+    def write(tmp_path):
+        # The temporary name has no .png extension, so encode explicitly
+        ok, data = cv2.imencode(".png", image, [cv2.IMWRITE_PNG_COMPRESSION, 1])
+        if not ok:
+            raise OSError(f"Could not encode {tmp_path}")
+        with open(tmp_path, "wb") as f:
+            f.write(data.tobytes())
+
+    return write
+
+
+def median_of_frames(paths, band_bytes=BAND_BYTES):
+    """
+    Pixelwise median of grayscale frames.
+
+    Frames are stacked in row bands of at most ``band_bytes`` and the median of each
+    band is taken in one vectorized call; frames are re-read once per band when the
+    whole stack does not fit.
+
+    Parameters
+    ----------
+    paths : list of str
+        Frame image paths (unreadable frames are skipped).
+    band_bytes : int, optional
+        Memory limit of one stacked band.
+
+    Returns
+    -------
+    np.ndarray or None
+        Median image (uint8), or None if no frame could be read.
+    """
+    first = None
+    while paths and first is None:
+        first = _read_gray(paths[0])
+        if first is None:
+            paths = paths[1:]
+    if first is None:
+        return None
+    height, width = first.shape
+    band_rows = max(1, int(band_bytes // (len(paths) * width)))
+
+    background = np.empty((height, width), dtype=np.uint8)
+    for row0 in range(0, height, band_rows):
+        row1 = min(height, row0 + band_rows)
+        stack = np.empty((len(paths), row1 - row0, width), dtype=np.uint8)
+        count = 0
+        for path in paths:
+            gray = first if (count == 0 and row0 == 0) else _read_gray(path)
+            if gray is None or gray.shape != first.shape:
+                continue
+            stack[count] = gray[row0:row1]
+            count += 1
+        background[row0:row1] = np.round(np.median(stack[:count], axis=0))
+    return background
+
+
+@instrumentation.timed("compute background")
+def compute_background(
+    frame_paths,
+    frames_folder,
+    mode="global",
+    window=DEFAULT_WINDOW,
+    progress_callback=None,
+    cancel_check=None,
+):
+    """
+    Compute and store the median background of a frame stack.
+
+    Parameters
+    ----------
+    frame_paths : list of str
+        All frames of the movie, in order.
+    frames_folder : str
+        Frames folder; the background is written to its background subfolder.
+    mode : str, optional
+        "global" (one image) or "rolling" (one image per ``window`` frames).
+    window : int, optional
+        Frames per rolling block.
+    progress_callback : Signal, optional
+        A signal to emit progress updates.
+    cancel_check : callable, optional
+        Called between blocks; return True to stop.
+
+    Returns
+    -------
+    dict or None
+        The stored manifest, or None if cancelled or no frame could be read.
+    """
+    if mode not in ("global", "rolling") or not frame_paths:
+        return None
+    window = max(1, int(window))
+    if mode == "global":
+        blocks = [frame_paths]
+    else:
+        blocks = [frame_paths[i : i + window] for i in range(0, len(frame_paths), window)]
+
+    folder = get_background_folder(frames_folder)
+    remove_background(frames_folder)
+    os.makedirs(folder, exist_ok=True)
+
+    entries = []
+    shape = None
+    for index, block in enumerate(blocks):
+        if cancel_check and cancel_check():
+            remove_background(frames_folder)
+            return None
+        if progress_callback:
+            progress_callback.emit(f"Computing background {index + 1} / {len(blocks)}")
+        samples = np.unique(
+            np.linspace(0, len(block) - 1, min(len(block), MAX_SAMPLE_FRAMES)).astype(int)
+        )
+        background = median_of_frames([block[i] for i in samples])
+        if background is None:
+            continue
+        shape = background.shape
+        filename = f"background_{index:04d}.png"
+        atomic_write(os.path.join(folder, filename), _png_writer(background))
+        entries.append(
+            {
+                "file": filename,
+                "first_frame": _frame_number(block[0]),
+                "last_frame": _frame_number(block[-1]),
+                "samples": int(len(samples)),
+            }
+        )
+
+    if not entries:
+        remove_background(frames_folder)
+        return None
+
+    manifest = {
+        "mode": mode,
+        "window": window if mode == "rolling" else None,
+        "width": int(shape[1]),
+        "height": int(shape[0]),
+        "blocks": entries,
+    }
+
+    def write(tmp_path):
+        with open(tmp_path, "w") as f:
+            json.dump(manifest, f, indent=1)
+
+    atomic_write(os.path.join(folder, BACKGROUND_MANIFEST), write)
+    return manifest
+
+
+class FrameBackground:
+    """Stored background images of a frames folder, looked up by frame number."""
+
+    def __init__(self, folder, manifest):
+        self.folder = folder
+        self.manifest = manifest
+        self.blocks = manifest["blocks"]
+        self._cached_file = None
+        self._cached_image = None
+
+    @classmethod
+    def load(cls, frames_folder, mode=None, window=None):
+        """
+        Load the stored background, checking it matches the requested settings.
+
+        Parameters
+        ----------
+        frames_folder : str
+            Folder with the extracted frames.
+        mode : str, optional
+            Expected mode; a different stored mode is reported and not used.
+        window : int, optional
+            Expected rolling window.
+
+        Returns
+        -------
+        FrameBackground or None
+            The background, or None if none (or a mismatched one) is stored.
+        """
+        folder = get_background_folder(frames_folder)
+        manifest_path = os.path.join(folder, BACKGROUND_MANIFEST)
+        if not os.path.exists(manifest_path):
+            return None
+        try:
+            with open(manifest_path, "r") as f:
+                manifest = json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            print(f"Warning: Could not read background manifest {manifest_path}: {e}")
+            return None
+        if mode is not None and manifest.get("mode") != mode:
+            print(
+                f"Warning: Stored background is {manifest.get('mode')}, not {mode}; "
+                "compute the background again."
+            )
+            return None
+        if mode == "rolling" and window is not None and manifest.get("window") != int(window):
+            print(
+                f"Warning: Stored background uses a {manifest.get('window')} frame window, "
+                f"not {window}; compute the background again."
+            )
+            return None
+        return cls(folder, manifest)
+
+    def block_for_frame(self, frame_number):
+        """
+        Manifest entry of the block covering a frame (the nearest block otherwise).
+
+        Parameters
+        ----------
+        frame_number : int
+            0-based frame number.
+
+        Returns
+        -------
+        dict
+            Block entry with file, first_frame and last_frame.
+        """
+        for block in self.blocks:
+            if block["first_frame"] <= frame_number <= block["last_frame"]:
+                return block
+        return min(
+            self.blocks,
+            key=lambda b: min(
+                abs(b["first_frame"] - frame_number), abs(b["last_frame"] - frame_number)
+            ),
+        )
+
+    def for_frame(self, frame_number):
+        """
+        Background image for a frame.
+
+        Parameters
+        ----------
+        frame_number : int
+            0-based frame number.
+
+        Returns
+        -------
+        np.ndarray or None
+            Grayscale background (uint8), or None if its file is missing.
+        """
+        block = self.block_for_frame(frame_number)
+        if block["file"] != self._cached_file:
+            image = cv2.imread(os.path.join(self.folder, block["file"]), cv2.IMREAD_GRAYSCALE)
+            if image is None:
+                print(f"Warning: Background image {block['file']} is missing")
+            self._cached_file = block["file"]
+            self._cached_image = image
+        return self._cached_image
+
+
+def subtract_background(gray, background, invert=False):
+    """
+    Remove the background from a grayscale frame.
+
+    Bright particles keep their excess over the background on a black floor; with
+    ``invert`` dark particles keep their deficit below a white ceiling, so trackpy's
+    invert option still applies.
+
+    Parameters
+    ----------
+    gray : np.ndarray
+        Grayscale frame (uint8).
+    background : np.ndarray
+        Background of the same shape (uint8).
+    invert : bool, optional
+        True if particles are darker than the background.
+
+    Returns
+    -------
+    np.ndarray
+        Background-subtracted frame (uint8).
+    """
+    if invert:
+        return 255 - cv2.subtract(background, gray)
+    return cv2.subtract(gray, background)
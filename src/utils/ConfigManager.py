@@ -11,7 +11,7 @@ Date: 2025-12-08
 
 import os
 import configparser
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional
 
 
 class ConfigManager:
@@ -69,6 +69,10 @@ class ConfigManager:
             "threshold": "0.0",
             "frame_idx": "0",
             "scaling": "1.0",
+            "roi": "[]",
+            "tiling": "auto",
+            "background": "off",
+            "background_window": "100",
         }
 
         self.config["Linking"] = {
@@ -78,6 +82,14 @@ class ConfigManager:
             "drift": "false",
         }
 
+        self.config["Data"] = {
+            "compact_mode": "false",
+            "undo_levels": "10",
+            "undo_max_mb": "2048",
+            "memory_budget_mb": "0",
+            "trace_memory": "false",
+        }
+
     def get(self, section: str, key: str, fallback: Any = None) -> Any:
         """
         Get a configuration value.
@@ -196,7 +208,7 @@ class ConfigManager:
         Returns
         -------
         Dict[str, Any]
-            Dictionary containing detection parameters (feature_size, min_mass, invert, threshold, frame_idx, scaling).
+            Dictionary containing detection parameters (feature_size, min_mass, invert, threshold, frame_idx, scaling, roi, tiling, background, background_window).
         """
         return {
             "feature_size": int(self.get("Detection", "feature_size", 27)),
@@ -205,8 +217,45 @@ class ConfigManager:
             "threshold": float(self.get("Detection", "threshold", 0.0)),
             "frame_idx": int(self.get("Detection", "frame_idx", 0)),
             "scaling": float(self.get("Detection", "scaling", 1.0)),
+            "roi": self.get_detection_roi(),
+            "tiling": str(self.get("Detection", "tiling", "auto")).lower(),
+            "background": str(self.get("Detection", "background", "off")).lower(),
+            "background_window": int(self.get("Detection", "background_window", 100)),
         }
 
+    def get_detection_roi(self) -> List[Dict[str, Any]]:
+        """
+        Get the detection regions of interest.
+
+        Returns
+        -------
+        List[Dict[str, Any]]
+            Regions ({"type": "rect" | "polygon", "points": [[x, y], ...]} in full
+            resolution image coordinates); empty means the full frame.
+        """
+        # Imported here: RegionMask loads numpy and OpenCV, which the GUI defers at startup
+        from .RegionMask import parse_regions
+
+        return parse_regions(self.get("Detection", "roi", "[]"))
+
+    def save_detection_roi(self, regions: List[Dict[str, Any]]):
+        """
+        Save the detection regions of interest.
+
+        Parameters
+        ----------
+        regions : List[Dict[str, Any]]
+            Regions to save (an empty list detects on the full frame).
+
+        Returns
+        -------
+        None
+        """
+        from .RegionMask import regions_to_json
+
+        self.set("Detection", "roi", regions_to_json(regions))
+        self.save()
+
     def get_linking_params(self) -> Dict[str, Any]:
         """
         Get linking parameters as a dictionary.
@@ -237,6 +286,10 @@ class ConfigManager:
         None
         """
         for key, value in params.items():
+            if key == "roi":
+                from .RegionMask import regions_to_json
+
+                value = regions_to_json(value)
             self.set("Detection", key, str(value))
         self.save()
 
@@ -257,6 +310,63 @@ class ConfigManager:
             self.set("Linking", key, str(value))
         self.save()
 
+    def get_compact_mode(self) -> bool:
+        """
+        Check whether particle tables are kept in compact (float32/int32) form.
+
+        Returns
+        -------
+        bool
+            True if [Data] compact_mode is enabled.
+        """
+        return str(self.get("Data", "compact_mode", "false")).lower() == "true"
+
+    def set_compact_mode(self, enabled: bool):
+        """
+        Enable or disable compact particle tables for the project.
+
+        Parameters
+        ----------
+        enabled : bool
+            New compact mode setting.
+
+        Returns
+        -------
+        None
+        """
+        self.set("Data", "compact_mode", "true" if enabled else "false")
+        self.save()
+
+    def get_undo_limits(self) -> Dict[str, int]:
+        """
+        Get the undo history limits.
+
+        Returns
+        -------
+        Dict[str, int]
+            Dictionary containing levels (number of undo levels) and max_bytes (size cap
+            for stored particle tables).
+        """
+        return {
+            "levels": int(self.get("Data", "undo_levels", 10)),
+            "max_bytes": int(float(self.get("Data", "undo_max_mb", 2048)) * 1024 * 1024),
+        }
+
+    def get_memory_settings(self) -> Dict[str, Any]:
+        """
+        Get the memory instrumentation settings.
+
+        Returns
+        -------
+        Dict[str, Any]
+            Dictionary containing budget_bytes (memory budget for stage warnings; 0 means
+            80% of physical memory) and trace_memory (record tracemalloc peaks per stage).
+        """
+        return {
+            "budget_bytes": int(float(self.get("Data", "memory_budget_mb", 0)) * 1024 * 1024),
+            "trace_memory": str(self.get("Data", "trace_memory", "false")).lower() == "true",
+        }
+
     def is_project_config(self) -> bool:
         """
         Check if this is a project-specific config.
@@ -0,0 +1,260 @@
+"""
+Detection Chunks Module
+
+Description: Streaming storage for detection output. Per-frame particle tables are
+             buffered up to a fixed row count and then spilled to numbered chunk files
+             in the project data folder, with a manifest updated after every spill, so
+             memory stays bounded during detection and a cancelled run can still save
+             the frames it finished. The final table is assembled by copying each chunk
+             into preallocated columns, without holding the chunks and the result as two
+             full copies. Chunks are .npz files with one plain array per column (read
+             with allow_pickle=False), so loading a store left in a shared project
+             folder cannot run code.
+
+Copyright (c) 2025, Jacqueline Reynaga, Kevin Pillsbury, Bakir Husremovic
+License: BSD 3-Clause License
+Date: 2025-12-08
+"""
+
+import json
+import os
+import shutil
+from typing import Iterable, Union
+
+import numpy as np
+import pandas as pd
+
+from .WriteBehindQueue import atomic_write
+
+DETECTION_CHUNKS_FOLDER = "detection_chunks"
+MANIFEST_FILE = "manifest.json"
+CHUNK_SUFFIX = ".npz"
+
+# Rows buffered in memory before a chunk is written (about 20 MB of trackpy columns)
+DEFAULT_CHUNK_ROWS = 250_000
+
+
+def _column_array(series: pd.Series) -> np.ndarray:
+    """Plain numpy array of a column; non-numeric columns are stored as strings."""
+    values = series.to_numpy()
+    if values.dtype.kind in "biufcmM":
+        return values
+    return series.astype(str).to_numpy(dtype=str)
+
+
+def _npz_writer(chunk: pd.DataFrame):
+    def write(tmp_path):
+        # A file object, since np.savez would add .npz to the temporary name
+        with open(tmp_path, "wb") as f:
+            np.savez(f, **{str(col): _column_array(chunk[col]) for col in chunk.columns})
+
+    return write
+
+
+class DetectionChunkWriter:
+    """Buffers per-frame detection tables and spills them to chunk files."""
+
+    def __init__(self, folder: str, chunk_rows: int = DEFAULT_CHUNK_ROWS):
+        """
+        Start a new chunk store in ``folder``, removing chunks of an earlier run.
+
+        Parameters
+        ----------
+        folder : str
+            Chunk folder (created if needed).
+        chunk_rows : int, optional
+            Rows buffered before a chunk file is written.
+        """
+        self.folder = folder
+        self.chunk_rows = max(1, int(chunk_rows))
+        self.manifest_path = os.path.join(folder, MANIFEST_FILE)
+        self._buffer = []
+        self._buffered_rows = 0
+        self.chunks = []
+        self.frames = 0
+        self.rows = 0
+
+        if os.path.isdir(folder):
+            shutil.rmtree(folder, ignore_errors=True)
+        os.makedirs(folder, exist_ok=True)
+        self._write_manifest(complete=False)
+
+    def append(self, frame_df: pd.DataFrame) -> None:
+        """
+        Add one frame's particles; writes a chunk once the buffer is full.
+
+        Parameters
+        ----------
+        frame_df : pd.DataFrame
+            Particles detected in one frame.
+
+        Returns
+        -------
+        None
+        """
+        self.frames += 1
+        if frame_df is None or frame_df.empty:
+            return
+        self._buffer.append(frame_df)
+        self._buffered_rows += len(frame_df)
+        if self._buffered_rows >= self.chunk_rows:
+            self._spill()
+
+    def _spill(self):
+        if not self._buffer:
+            self._write_manifest(complete=False)
+            return
+        chunk = pd.concat(self._buffer, ignore_index=True)
+        self._buffer = []
+        self._buffered_rows = 0
+
+        filename = f"chunk_{len(self.chunks):05d}{CHUNK_SUFFIX}"
+        atomic_write(os.path.join(self.folder, filename), _npz_writer(chunk))
+        entry = {
+            "file": filename,
+            "rows": len(chunk),
+            "dtypes": {col: str(dtype) for col, dtype in chunk.dtypes.items()},
+        }
+        if "frame" in chunk.columns:
+            entry["first_frame"] = int(chunk["frame"].min())
+            entry["last_frame"] = int(chunk["frame"].max())
+        self.chunks.append(entry)
+        self.rows += len(chunk)
+        self._write_manifest(complete=False)
+
+    def _write_manifest(self, complete):
+        manifest = {
+            "complete": complete,
+            "frames": self.frames,
+            "rows": self.rows,
+            "chunks": self.chunks,
+        }
+
+        def write(tmp_path):
+            with open(tmp_path, "w") as f:
+                json.dump(manifest, f, indent=1)
+
+        atomic_write(self.manifest_path, write)
+
+    def close(self, complete: bool = True) -> None:
+        """
+        Write the remaining buffer and mark the store complete (or partial).
+
+        Parameters
+        ----------
+        complete : bool, optional
+            False for a cancelled run; the chunks are kept so the caller can still
+            assemble the frames that finished.
+
+        Returns
+        -------
+        None
+        """
+        self._spill()
+        self._write_manifest(complete=complete)
+
+
+def read_chunk_manifest(folder: str):
+    """
+    Read the manifest of a chunk store.
+
+    Parameters
+    ----------
+    folder : str
+        Chunk folder.
+
+    Returns
+    -------
+    dict or None
+        complete, frames (frames processed), rows and chunks; None if there is no store.
+    """
+    manifest_path = os.path.join(folder, MANIFEST_FILE)
+    if not os.path.exists(manifest_path):
+        return None
+    with open(manifest_path, "r") as f:
+        return json.load(f)
+
+
+def read_detection_chunks(folders: Union[str, Iterable[str]]) -> pd.DataFrame:
+    """
+    Assemble the chunks of one or more chunk stores into a single table.
+
+    Columns are preallocated at the final length and each chunk is copied into place
+    and released before the next is read, so peak memory is the final table plus one
+    chunk. Stores are concatenated in the order given. Incomplete stores (cancelled
+    runs) are read as far as they got.
+
+    Parameters
+    ----------
+    folders : str or iterable of str
+        Chunk folder(s) written by DetectionChunkWriter.
+
+    Returns
+    -------
+    pd.DataFrame
+        All detected particles, or an empty DataFrame if there are none.
+    """
+    if isinstance(folders, str):
+        folders = [folders]
+    entries = []
+    for folder in folders:
+        manifest = read_chunk_manifest(folder)
+        if manifest is None:
+            continue
+        for chunk in manifest.get("chunks", []):
+            if not chunk["file"].endswith(CHUNK_SUFFIX):
+                # Stores of older versions held pickles, which are never loaded
+                print(f"Warning: Skipping detection chunk {chunk['file']} in an old format")
+                continue
+            entries.append((folder, chunk))
+
+    total = sum(chunk["rows"] for _, chunk in entries)
+    if total == 0:
+        return pd.DataFrame()
+
+    # Column order of the first chunk; dtypes widened across chunks if they differ
+    columns = {}
+    for _, chunk in entries:
+        for col, dtype in chunk["dtypes"].items():
+            try:
+                dtype = np.dtype(dtype)
+            except TypeError:  # pandas extension dtypes (e.g. category)
+                dtype = np.dtype(object)
+            columns[col] = dtype if col not in columns else np.result_type(columns[col], dtype)
+
+    arrays = {}
+    for col, dtype in columns.items():
+        if dtype.kind in "iub":
+            arrays[col] = np.zeros(total, dtype=dtype)
+        else:
+            arrays[col] = np.full(total, np.nan if dtype.kind in "fc" else None, dtype=dtype)
+
+    offset = 0
+    for folder, chunk in entries:
+        end = offset + chunk["rows"]
+        with np.load(os.path.join(folder, chunk["file"]), allow_pickle=False) as data:
+            for col in data.files:
+                arrays[col][offset:end] = data[col]
+        offset = end
+
+    return pd.DataFrame(arrays, copy=False)
+
+
+def remove_detection_chunks(folder: str) -> None:
+    """
+    Delete a chunk store (after its table has been assembled and saved).
+
+    Parameters
+    ----------
+    folder : str
+        Chunk folder.
+
+    Returns
+    -------
+    None
+    """
+    if os.path.isdir(folder):
+        try:
+            shutil.rmtree(folder)
+        except OSError as e:
+            print(f"Warning: Could not remove detection chunks {folder}: {e}")
@@ -10,10 +10,16 @@ License: BSD 3-Clause License
 Date: 2025-12-08
 """
 
+import json
 import os
 import shutil
 import pandas as pd
+from typing import List, Optional
 from .ConfigManager import ConfigManager
+from .Instrumentation import instrumentation
+from .ParticleTable import compact_particle_table, read_particle_csv
+from .TrajectorySummary import source_stamp
+from .WriteBehindQueue import WriteBehindQueue, atomic_write
 
 
 class FileController:
@@ -21,6 +27,7 @@ class FileController:
 
     DRIFT_CSV = "drift.csv"
     TRAJECTORIES_DRIFT_SUBTRACTED_CSV = "trajectories_drift_subtracted.csv"
+    TRAJECTORY_SUMMARY_CSV = "trajectory_summary.csv"
 
     def __init__(self, config_manager: ConfigManager, project_path: str = None):
         """
@@ -35,6 +42,8 @@ class FileController:
         """
         self.config_manager = config_manager
         self.project_path = project_path
+        # Data files are written on a background thread (see _queue_csv_write)
+        self.write_queue = WriteBehindQueue()
         self._load_paths()
 
     def _load_paths(self):
@@ -63,6 +72,95 @@ class FileController:
             "errant_memory_links_folder", self.project_path
         )
 
+    @property
+    def compact_mode(self) -> bool:
+        """Whether particle tables are loaded and saved as float32/int32 (see ParticleTable)."""
+        return self.config_manager.get_compact_mode()
+
+    def to_project_dtypes(self, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Convert a particle table to the project's in-memory representation.
+
+        Parameters
+        ----------
+        df : pd.DataFrame
+            Particle or trajectory table.
+
+        Returns
+        -------
+        pd.DataFrame
+            Compact copy in compact mode, otherwise ``df`` unchanged.
+        """
+        return compact_particle_table(df) if self.compact_mode else df
+
+    def _queue_csv_write(self, file_path: str, df: pd.DataFrame, message: str, prepare=None):
+        """
+        Queue a DataFrame to be written to ``file_path`` as CSV.
+
+        The file is written on the write-behind thread through a temporary file that is
+        renamed over the target, so readers never see a partly written file. A write
+        that is still queued when a newer one for the same file arrives is skipped.
+
+        Parameters
+        ----------
+        file_path : str
+            Target CSV file.
+        df : pd.DataFrame
+            Data to write. Must not be modified in place afterwards.
+        message : str
+            Printed once the file has been written.
+        prepare : callable, optional
+            Applied to ``df`` on the writer thread before writing.
+
+        Returns
+        -------
+        None
+        """
+
+        def write(tmp_path):
+            with instrumentation.stage(f"write {os.path.basename(file_path)}") as stage:
+                data = prepare(df) if prepare is not None else df
+                data.to_csv(tmp_path, index=False)
+                stage.add("rows", len(data))
+                stage.add("bytes", os.path.getsize(tmp_path))
+
+        self.write_queue.submit(file_path, write, message)
+
+    def wait_for_write(self, file_path: str) -> None:
+        """
+        Wait until a queued write to ``file_path`` (if any) is on disk.
+
+        Parameters
+        ----------
+        file_path : str
+            File about to be read directly.
+
+        Returns
+        -------
+        None
+        """
+        if self.write_queue.is_pending(file_path):
+            with instrumentation.stage(f"wait for {os.path.basename(file_path)}"):
+                self.write_queue.wait_for(file_path)
+
+    def flush_writes(self) -> None:
+        """
+        Wait until every queued data file write has finished (call before exiting).
+
+        Returns
+        -------
+        None
+        """
+        self.write_queue.flush()
+
+    def _read_table(self, file_path: str, columns: Optional[List[str]] = None) -> pd.DataFrame:
+        """Read a particle/trajectory CSV in the project's dtypes, timed as a stage."""
+        with instrumentation.stage(f"read {os.path.basename(file_path)}") as stage:
+            df = read_particle_csv(file_path, columns=columns, compact=self.compact_mode)
+            stage.add("rows", len(df))
+            stage.add("bytes", os.path.getsize(file_path))
+        return df
+
     def set_project_path(self, project_path: str):
         """
         Set the project path and reload folder paths.
@@ -215,6 +313,9 @@ class FileController:
         """
         Save particles data to the data folder.
 
+        The file is written in the background; readers going through FileController
+        wait for it.
+
         Parameters
         ----------
         particles_df : pd.DataFrame
@@ -229,10 +330,12 @@ class FileController:
         """
         self.ensure_folder_exists(self.data_folder)
         file_path = os.path.join(self.data_folder, filename)
-        # Delete existing file to ensure clean overwrite
-        self._delete_file_if_exists(file_path)
-        particles_df.to_csv(file_path, index=False)
-        print(f"Saved particles data to: {file_path}")
+        self._queue_csv_write(
+            file_path,
+            particles_df,
+            f"Saved particles data to: {file_path}",
+            prepare=self.to_project_dtypes,
+        )
         return file_path
 
     def save_trajectories_data(
@@ -241,6 +344,9 @@ class FileController:
         """
         Save trajectories data to the data folder.
 
+        The file is written in the background; readers going through FileController
+        wait for it.
+
         Parameters
         ----------
         trajectories_df : pd.DataFrame
@@ -255,10 +361,12 @@ class FileController:
         """
         self.ensure_folder_exists(self.data_folder)
         file_path = os.path.join(self.data_folder, filename)
-        # Delete existing file to ensure clean overwrite
-        self._delete_file_if_exists(file_path)
-        trajectories_df.to_csv(file_path, index=False)
-        print(f"Saved trajectories data to: {file_path}")
+        self._queue_csv_write(
+            file_path,
+            trajectories_df,
+            f"Saved trajectories data to: {file_path}",
+            prepare=self.to_project_dtypes,
+        )
         return file_path
 
     def save_drift_data(self, drift_df: pd.DataFrame, filename: str = DRIFT_CSV) -> str:
@@ -279,12 +387,12 @@ class FileController:
         """
         self.ensure_folder_exists(self.data_folder)
         file_path = os.path.join(self.data_folder, filename)
-        self._delete_file_if_exists(file_path)
         drift_save = drift_df.copy()
         if drift_save.index.name is None:
             drift_save.index.name = "frame"
-        drift_save.reset_index().to_csv(file_path, index=False)
-        print(f"Saved drift data to: {file_path}")
+        self._queue_csv_write(
+            file_path, drift_save.reset_index(), f"Saved drift data to: {file_path}"
+        )
         return file_path
 
     def load_drift_data(self, filename: str = DRIFT_CSV) -> pd.DataFrame:
@@ -297,6 +405,7 @@ class FileController:
             Drift indexed by frame with x and y columns, or empty if missing.
         """
         file_path = os.path.join(self.data_folder, filename)
+        self.wait_for_write(file_path)
         if not os.path.exists(file_path):
             print(f"Drift file not found: {file_path}")
             return pd.DataFrame()
@@ -308,12 +417,89 @@ class FileController:
             return pd.DataFrame()
         return df[["x", "y"]]
 
+    def save_trajectory_summary(
+        self,
+        summary_df: pd.DataFrame,
+        filename: str = TRAJECTORY_SUMMARY_CSV,
+        source_filename: str = "trajectories.csv",
+    ) -> str:
+        """
+        Save the per-trajectory summary table beside trajectories.csv.
+
+        A JSON stamp of the source file (size and modification time) is written next to
+        the summary, so readers can tell whether the summary still describes it.
+
+        Parameters
+        ----------
+        summary_df : pd.DataFrame
+            One row per particle id (see TrajectorySummary.compute_trajectory_summary).
+        filename : str, optional
+            Output filename. Defaults to trajectory_summary.csv.
+        source_filename : str, optional
+            Data file the summary was computed from. Its write must already be queued.
+
+        Returns
+        -------
+        str
+            Path to the saved file.
+        """
+        self.ensure_folder_exists(self.data_folder)
+        file_path = os.path.join(self.data_folder, filename)
+        source_path = os.path.join(self.data_folder, source_filename)
+        stamp_path = os.path.splitext(file_path)[0] + ".json"
+
+        def write(tmp_path):
+            with instrumentation.stage(f"write {filename}") as stage:
+                summary_df.to_csv(tmp_path, index=False)
+                stage.add("rows", len(summary_df))
+            # Writes run in queue order, so the source file is already on disk
+            stamp = source_stamp(source_path)
+
+            def write_stamp(tmp_stamp_path):
+                with open(tmp_stamp_path, "w") as f:
+                    json.dump(stamp, f)
+
+            atomic_write(stamp_path, write_stamp)
+
+        self.write_queue.submit(file_path, write, f"Saved trajectory summary to: {file_path}")
+        return file_path
+
+    def load_trajectory_summary(self, filename: str = TRAJECTORY_SUMMARY_CSV) -> pd.DataFrame:
+        """
+        Load the per-trajectory summary table.
+
+        The stamp of the file it was computed from is put in ``attrs["source"]`` (None
+        if there is no stamp) for TrajectorySummary.summary_matches.
+
+        Returns
+        -------
+        pd.DataFrame
+            Summary table, or empty DataFrame if it has not been computed.
+        """
+        file_path = os.path.join(self.data_folder, filename)
+        self.wait_for_write(file_path)
+        if not os.path.exists(file_path):
+            return pd.DataFrame()
+        try:
+            summary = pd.read_csv(file_path)
+        except pd.errors.EmptyDataError:
+            return pd.DataFrame()
+        try:
+            with open(os.path.splitext(file_path)[0] + ".json", "r") as f:
+                summary.attrs["source"] = json.load(f)
+        except (OSError, json.JSONDecodeError):
+            summary.attrs["source"] = None
+        return summary
+
     def delete_data_file(self, filename: str) -> None:
         """Remove a file from the data folder if it exists."""
         file_path = os.path.join(self.data_folder, filename)
+        self.write_queue.cancel(file_path)
         self._delete_file_if_exists(file_path)
 
-    def load_particles_data(self, filename: str = "all_particles.csv") -> pd.DataFrame:
+    def load_particles_data(
+        self, filename: str = "all_particles.csv", columns: Optional[List[str]] = None
+    ) -> pd.DataFrame:
         """
         Load particles data from the data folder.
 
@@ -321,6 +507,8 @@ class FileController:
         ----------
         filename : str, optional
             Name of the file to load. Defaults to "all_particles.csv".
+        columns : List[str], optional
+            Only load these columns. Loads every column if None.
 
         Returns
         -------
@@ -328,13 +516,16 @@ class FileController:
             Loaded particles data, or empty DataFrame if file doesn't exist.
         """
         file_path = os.path.join(self.data_folder, filename)
+        self.wait_for_write(file_path)
         if os.path.exists(file_path):
-            return pd.read_csv(file_path)
+            return self._read_table(file_path, columns=columns)
         else:
             print(f"Particles file not found: {file_path}")
             return pd.DataFrame()
 
-    def load_trajectories_data(self, filename: str = "trajectories.csv") -> pd.DataFrame:
+    def load_trajectories_data(
+        self, filename: str = "trajectories.csv", columns: Optional[List[str]] = None
+    ) -> pd.DataFrame:
         """
         Load trajectories data from the data folder.
 
@@ -342,6 +533,8 @@ class FileController:
         ----------
         filename : str, optional
             Name of the file to load. Defaults to "trajectories.csv".
+        columns : List[str], optional
+            Only load these columns. Loads every column if None.
 
         Returns
         -------
@@ -349,8 +542,9 @@ class FileController:
             Loaded trajectories data, or empty DataFrame if file doesn't exist.
         """
         file_path = os.path.join(self.data_folder, filename)
+        self.wait_for_write(file_path)
         if os.path.exists(file_path):
-            return pd.read_csv(file_path)
+            return self._read_table(file_path, columns=columns)
         else:
             print(f"Trajectories file not found: {file_path}")
             return pd.DataFrame()
@@ -388,6 +582,7 @@ class FileController:
         try:
             all_particles_path = self.get_data_file_path("all_particles.csv")
             backup_path = self.get_data_file_path(backup_filename)
+            self.wait_for_write(all_particles_path)
 
             if os.path.exists(all_particles_path):
                 shutil.copyfile(all_particles_path, backup_path)
@@ -398,7 +593,9 @@ class FileController:
             print(f"Error backing up particles data: {e}")
             return False
 
-    def load_particles_data_from_path(self, external_path: str) -> pd.DataFrame:
+    def load_particles_data_from_path(
+        self, external_path: str, columns: Optional[List[str]] = None
+    ) -> pd.DataFrame:
         """
         Load particles data from an external file path (outside data folder).
 
@@ -406,6 +603,8 @@ class FileController:
         ----------
         external_path : str
             Full path to the CSV file to load
+        columns : List[str], optional
+            Only load these columns. Loads every column if None.
 
         Returns
         -------
@@ -414,7 +613,7 @@ class FileController:
         """
         if os.path.exists(external_path):
             try:
-                return pd.read_csv(external_path)
+                return self._read_table(external_path, columns=columns)
             except Exception as e:
                 print(f"Error loading particles data from {external_path}: {e}")
                 return pd.DataFrame()
@@ -422,56 +621,6 @@ class FileController:
             print(f"Particles file not found: {external_path}")
             return pd.DataFrame()
 
-    def save_to_save_folder(self, data: pd.DataFrame, filename: str) -> str:
-        """
-        Save data to the save folder (used for undo functionality).
-
-        Parameters
-        ----------
-        data : pd.DataFrame
-            Data to save
-        filename : str
-            Name of the file to save
-
-        Returns
-        -------
-        str
-            Path to the saved file
-        """
-        save_folder = os.path.join(self.data_folder, "save")
-        self.ensure_folder_exists(save_folder)
-        save_path = os.path.join(save_folder, filename)
-        # Delete existing file to ensure clean overwrite
-        self._delete_file_if_exists(save_path)
-        data.to_csv(save_path, index=False)
-        print(f"Saved to save folder: {save_path}")
-        return save_path
-
-    def load_from_save_folder(self, filename: str) -> pd.DataFrame:
-        """
-        Load data from the save folder (used for undo functionality).
-
-        Parameters
-        ----------
-        filename : str
-            Name of the file to load
-
-        Returns
-        -------
-        pd.DataFrame
-            Loaded data, or empty DataFrame if file doesn't exist
-        """
-        save_folder = os.path.join(self.data_folder, "save")
-        save_path = os.path.join(save_folder, filename)
-        if os.path.exists(save_path):
-            try:
-                return pd.read_csv(save_path)
-            except Exception as e:
-                print(f"Error loading from save folder {save_path}: {e}")
-                return pd.DataFrame()
-        else:
-            return pd.DataFrame()
-
     def save_filtered_particles_data(
         self, filtered_df: pd.DataFrame, filename: str = "filtered_particles.csv"
     ) -> str:
@@ -493,34 +642,6 @@ class FileController:
         # save_particles_data already handles deletion, so just call it
         return self.save_particles_data(filtered_df, filename)
 
-    def copy_file_to_save_folder(self, source_path: str, filename: str) -> str:
-        """
-        Copy a file to the save folder (used for undo functionality).
-
-        Parameters
-        ----------
-        source_path : str
-            Path to the source file
-        filename : str
-            Name to use in the save folder
-
-        Returns
-        -------
-        str
-            Path to the copied file
-        """
-        save_folder = os.path.join(self.data_folder, "save")
-        self.ensure_folder_exists(save_folder)
-        dest_path = os.path.join(save_folder, filename)
-        if os.path.exists(source_path):
-            # Delete existing file to ensure clean overwrite
-            self._delete_file_if_exists(dest_path)
-            shutil.copy2(source_path, dest_path)
-            print(f"Copied to save folder: {dest_path}")
-            return dest_path
-        else:
-            raise FileNotFoundError(f"Source file not found: {source_path}")
-
     def create_errant_distance_links_folder(self) -> str:
         """
         Create and return the errant distance links folder path.
@@ -0,0 +1,450 @@
+"""
+Filter Engine Module
+
+Description: Filter definitions and evaluation for particle and trajectory tables.
+             Filters are evaluated as boolean masks over shared column arrays, and each
+             filter's mask is cached until the data changes, so editing one filter only
+             recomputes that filter's mask.
+
+Copyright (c) 2025, Jacqueline Reynaga, Kevin Pillsbury, Bakir Husremovic
+License: BSD 3-Clause License
+Date: 2025-12-08
+"""
+
+import configparser
+import uuid
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from .Instrumentation import instrumentation
+
+FILTER_MEMORY_SUGGESTION = (
+    "Enable compact mode ([Data] compact_mode = true) to halve the size of filtered copies."
+)
+
+
+@dataclass
+class Filter:
+    """Data class representing a single filter."""
+
+    parameter: str
+    operator: str
+    value: float
+    filter_id: str = None  # Unique ID for this filter
+
+    def __post_init__(self):
+        """
+        Initialize filter_id if not provided.
+
+        Returns
+        -------
+        None
+        """
+        if self.filter_id is None:
+            self.filter_id = str(uuid.uuid4())[:8]
+
+
+@dataclass
+class CompoundFilter:
+    """Data class representing a compound filter with two filters and an operator."""
+
+    filter1: Filter
+    filter2: Filter
+    operator: str  # "AND", "OR", "XOR"
+    filter_id: str = None  # Unique ID for this compound filter
+
+    def __post_init__(self):
+        """
+        Initialize filter_id if not provided.
+
+        Returns
+        -------
+        None
+        """
+        if self.filter_id is None:
+            self.filter_id = str(uuid.uuid4())[:8]
+
+
+_COMPARISONS = {
+    "<": np.less,
+    "<=": np.less_equal,
+    ">": np.greater,
+    ">=": np.greater_equal,
+    "==": np.equal,
+    "!=": np.not_equal,
+}
+
+
+class FilterEngine:
+    """Evaluates filters against one DataFrame, caching a mask per filter."""
+
+    MAX_CACHED_MASKS = 256
+
+    def __init__(self, df: Optional[pd.DataFrame] = None):
+        """
+        Create the engine, optionally bound to a DataFrame.
+
+        Parameters
+        ----------
+        df : pd.DataFrame, optional
+            Data the filters are evaluated against.
+        """
+        self._df = None
+        self._columns = {}
+        self._masks = {}
+        self.data_version = 0
+        if df is not None:
+            self.set_data(df)
+
+    @property
+    def data(self) -> Optional[pd.DataFrame]:
+        """The DataFrame the engine is bound to."""
+        return self._df
+
+    def set_data(self, df: pd.DataFrame) -> None:
+        """
+        Bind the engine to a DataFrame.
+
+        Passing the same object again keeps all cached masks. A different object starts
+        a new data version and drops the cached columns and masks.
+
+        Parameters
+        ----------
+        df : pd.DataFrame
+            Data the filters are evaluated against. It must not be modified in place
+            while bound.
+
+        Returns
+        -------
+        None
+        """
+        if df is self._df:
+            return
+        self._df = df
+        self._columns = {}
+        self._masks = {}
+        self.data_version += 1
+
+    def _column(self, parameter: str) -> Optional[np.ndarray]:
+        if parameter not in self._columns:
+            if self._df is None or parameter not in self._df.columns:
+                self._columns[parameter] = None
+            else:
+                self._columns[parameter] = self._df[parameter].to_numpy()
+        return self._columns[parameter]
+
+    def _row_count(self) -> int:
+        return 0 if self._df is None else len(self._df)
+
+    def filter_mask(self, filter_obj: Filter) -> np.ndarray:
+        """
+        Boolean mask of rows passing a single filter.
+
+        Parameters
+        ----------
+        filter_obj : Filter
+            Filter object containing parameter, operator, and value.
+
+        Returns
+        -------
+        np.ndarray
+            Boolean mask (cached; do not modify).
+        """
+        key = (self.data_version, filter_obj.parameter, filter_obj.operator, filter_obj.value)
+        mask = self._masks.get(key)
+        if mask is not None:
+            return mask
+
+        parameter = filter_obj.parameter
+        operator = filter_obj.operator
+        value = filter_obj.value
+        column = self._column(parameter)
+        comparison = _COMPARISONS.get(operator)
+        if column is None:
+            print(f"Warning: Parameter '{parameter}' not found in data. Skipping filter.")
+            mask = np.zeros(self._row_count(), dtype=bool)
+        elif comparison is None:
+            print(f"Warning: Unknown operator '{operator}'. Skipping filter.")
+            mask = np.zeros(self._row_count(), dtype=bool)
+        else:
+            try:
+                mask = np.asarray(comparison(column, value), dtype=bool)
+            except Exception as e:
+                print(f"Error applying filter {parameter} {operator} {value}: {e}")
+                mask = np.zeros(self._row_count(), dtype=bool)
+
+        if len(self._masks) >= self.MAX_CACHED_MASKS:
+            # Editing a value spin box leaves a trail of stale masks behind
+            self._masks.clear()
+        self._masks[key] = mask
+        return mask
+
+    def compound_mask(self, compound_filter_obj: CompoundFilter) -> Optional[np.ndarray]:
+        """
+        Boolean mask of rows passing a compound filter.
+
+        Parameters
+        ----------
+        compound_filter_obj : CompoundFilter
+            Two filters combined with AND, OR or XOR.
+
+        Returns
+        -------
+        np.ndarray or None
+            Boolean mask, or None if the compound operator is unknown (filter skipped).
+        """
+        mask1 = self.filter_mask(compound_filter_obj.filter1)
+        mask2 = self.filter_mask(compound_filter_obj.filter2)
+        if compound_filter_obj.operator == "AND":
+            return mask1 & mask2
+        elif compound_filter_obj.operator == "OR":
+            return mask1 | mask2
+        elif compound_filter_obj.operator == "XOR":
+            return mask1 ^ mask2
+        print(
+            f"Warning: Unknown compound operator '{compound_filter_obj.operator}'. Skipping compound filter."
+        )
+        return None
+
+    def evaluate(
+        self, filters: List[Filter], compound_filters: List[CompoundFilter] = None
+    ) -> np.ndarray:
+        """
+        Boolean mask of rows passing every filter and compound filter.
+
+        Parameters
+        ----------
+        filters : List[Filter]
+            Simple filters (all are ANDed together).
+        compound_filters : List[CompoundFilter], optional
+            Compound filters, each ANDed with the result.
+
+        Returns
+        -------
+        np.ndarray
+            Boolean mask with one entry per row.
+        """
+        mask = np.ones(self._row_count(), dtype=bool)
+        for filter_obj in filters or []:
+            mask &= self.filter_mask(filter_obj)
+        for compound_filter_obj in compound_filters or []:
+            combined = self.compound_mask(compound_filter_obj)
+            if combined is not None:
+                mask &= combined
+        return mask
+
+
+def compute_filter_pass_mask(
+    df: pd.DataFrame,
+    filters: List[Filter],
+    compound_filters: List[CompoundFilter] = None,
+    engine: Optional[FilterEngine] = None,
+) -> pd.Series:
+    """
+    Return a boolean mask (aligned to df.index) for rows that pass all filters.
+
+    Parameters
+    ----------
+    df : pd.DataFrame
+        DataFrame to evaluate.
+    filters : List[Filter]
+        Simple filters.
+    compound_filters : List[CompoundFilter], optional
+        Compound filters.
+    engine : FilterEngine, optional
+        Engine to reuse cached masks from. It is bound to ``df`` if it is not already.
+
+    Returns
+    -------
+    pd.Series
+        Boolean mask indexed like ``df``.
+    """
+    if df.empty:
+        return pd.Series(dtype=bool)
+    if not filters and (not compound_filters or len(compound_filters) == 0):
+        return pd.Series(True, index=df.index)
+    if engine is None:
+        engine = FilterEngine()
+    engine.set_data(df)
+    return pd.Series(engine.evaluate(filters, compound_filters), index=df.index)
+
+
+def apply_single_filter(df: pd.DataFrame, filter_obj: Filter) -> pd.Series:
+    """
+    Apply a single filter and return a boolean mask.
+
+    Parameters
+    ----------
+    df : pd.DataFrame
+        DataFrame to filter.
+    filter_obj : Filter
+        Filter object containing parameter, operator, and value.
+
+    Returns
+    -------
+    pd.Series
+        Boolean mask indicating which rows pass the filter.
+    """
+    return pd.Series(FilterEngine(df).filter_mask(filter_obj), index=df.index)
+
+
+def apply_filters(
+    df: pd.DataFrame,
+    filters: List[Filter],
+    compound_filters: List[CompoundFilter] = None,
+    engine: Optional[FilterEngine] = None,
+) -> pd.DataFrame:
+    """
+    Apply a list of filters and compound filters to a DataFrame.
+
+    All masks are combined first and the rows are selected once at the end.
+
+    Parameters
+    ----------
+    df : pd.DataFrame
+        DataFrame to filter.
+    filters : List[Filter]
+        List of simple filters (all are ANDed together).
+    compound_filters : List[CompoundFilter], optional
+        List of compound filters. Each is applied independently and ANDed with previous results.
+    engine : FilterEngine, optional
+        Engine to reuse cached masks from. It is bound to ``df`` if it is not already.
+
+    Returns
+    -------
+    pd.DataFrame
+        Filtered DataFrame.
+    """
+    if not filters and (not compound_filters or len(compound_filters) == 0):
+        return df.copy()
+    if engine is None:
+        engine = FilterEngine()
+    engine.set_data(df)
+    return select_passing_rows(df, engine.evaluate(filters, compound_filters))
+
+
+def select_passing_rows(df: pd.DataFrame, mask: np.ndarray) -> pd.DataFrame:
+    """
+    Copy the rows of ``df`` where ``mask`` is True, as an instrumented "filter" stage.
+
+    Warns first if the copy is projected to exceed the memory budget.
+
+    Parameters
+    ----------
+    df : pd.DataFrame
+        Data being filtered.
+    mask : np.ndarray
+        Boolean pass mask, one entry per row.
+
+    Returns
+    -------
+    pd.DataFrame
+        Passing rows.
+    """
+    with instrumentation.stage("filter", rows_in=len(df)) as stage:
+        if len(df):
+            projected = df.memory_usage(index=True).sum() * float(np.mean(mask))
+            instrumentation.check_memory(projected, FILTER_MEMORY_SUGGESTION)
+        filtered = df[mask]
+        stage.add("rows_out", len(filtered))
+    return filtered
+
+
+def write_filters_ini(
+    ini_path: str, filters: List[Filter], compound_filters: List[CompoundFilter]
+) -> None:
+    """
+    Write filters to a filters.ini file.
+
+    Simple filters are stored as ``param,op,value`` under [filters] and compound filters
+    as ``param1,op1,val1|param2,op2,val2|operator`` under [compound_filters], keyed by
+    filter id.
+
+    Parameters
+    ----------
+    ini_path : str
+        Output path.
+    filters : List[Filter]
+        Simple filters.
+    compound_filters : List[CompoundFilter]
+        Compound filters.
+
+    Returns
+    -------
+    None
+    """
+    config = configparser.ConfigParser()
+    config["filters"] = {}
+    for filter_obj in filters:
+        # Storing as a list of strings, e.g., "mass,>,100.0"
+        value_str = f"{filter_obj.parameter},{filter_obj.operator},{filter_obj.value}"
+        config["filters"][filter_obj.filter_id] = value_str
+
+    config["compound_filters"] = {}
+    for compound_filter_obj in compound_filters:
+        f1 = compound_filter_obj.filter1
+        f2 = compound_filter_obj.filter2
+        value_str = f"{f1.parameter},{f1.operator},{f1.value}|{f2.parameter},{f2.operator},{f2.value}|{compound_filter_obj.operator}"
+        config["compound_filters"][compound_filter_obj.filter_id] = value_str
+
+    with open(ini_path, "w") as f:
+        config.write(f)
+
+
+def read_filters_ini(ini_path: str) -> Tuple[List[Filter], List[CompoundFilter]]:
+    """
+    Read filters from a filters.ini file written by ``write_filters_ini``.
+
+    Malformed entries are skipped.
+
+    Parameters
+    ----------
+    ini_path : str
+        Path to filters.ini.
+
+    Returns
+    -------
+    tuple
+        (filters, compound_filters). Both are empty if the file does not exist.
+    """
+    filters = []
+    compound_filters = []
+    config = configparser.ConfigParser()
+    if not config.read(ini_path):
+        return filters, compound_filters
+
+    if "filters" in config:
+        for filter_id, value_str in config["filters"].items():
+            parts = value_str.split(",")
+            if len(parts) == 3:
+                param, op, val = parts
+                filters.append(
+                    Filter(parameter=param, operator=op, value=float(val), filter_id=filter_id)
+                )
+
+    if "compound_filters" in config:
+        for compound_filter_id, value_str in config["compound_filters"].items():
+            parts = value_str.split("|")
+            if len(parts) == 3:
+                filter1_str, filter2_str, compound_op = parts
+                f1_parts = filter1_str.split(",")
+                f2_parts = filter2_str.split(",")
+                if len(f1_parts) == 3 and len(f2_parts) == 3:
+                    f1 = Filter(
+                        parameter=f1_parts[0], operator=f1_parts[1], value=float(f1_parts[2])
+                    )
+                    f2 = Filter(
+                        parameter=f2_parts[0], operator=f2_parts[1], value=float(f2_parts[2])
+                    )
+                    compound_filters.append(
+                        CompoundFilter(
+                            filter1=f1,
+                            filter2=f2,
+                            operator=compound_op,
+                            filter_id=compound_filter_id,
+                        )
+                    )
+    return filters, compound_filters
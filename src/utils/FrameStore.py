@@ -0,0 +1,238 @@
+"""
+Frame Store Module
+
+Description: Cached access to extracted video frames. Maintains a per-frame image pyramid
+             (1/2, 1/4, 1/8 scale copies) on disk so the frame viewer can show a frame at
+             the resolution it is actually displayed at instead of decoding the full frame.
+
+Copyright (c) 2025, Jacqueline Reynaga, Kevin Pillsbury, Bakir Husremovic
+License: BSD 3-Clause License
+Date: 2025-12-08
+"""
+
+import json
+import os
+
+import cv2
+
+# Downscale factors kept on disk, finest first. Factor 1 is the original frame.
+PYRAMID_FACTORS = (2, 4, 8)
+PYRAMID_FOLDER = "pyramid"
+PYRAMID_INFO_FILE = "pyramid.json"
+
+_frame_size_cache = {}
+
+
+def get_frame_path(frames_folder, frame_index):
+    """
+    Get the path of an original (full resolution) frame.
+
+    Parameters
+    ----------
+    frames_folder : str
+        Folder holding the extracted frames.
+    frame_index : int
+        Index of the frame (0-based).
+
+    Returns
+    -------
+    str
+        Path to the frame image file.
+    """
+    return os.path.join(frames_folder, f"frame_{frame_index:05d}.jpg")
+
+
+def get_pyramid_frame_path(frames_folder, frame_index, factor):
+    """
+    Get the path of a downscaled copy of a frame.
+
+    Parameters
+    ----------
+    frames_folder : str
+        Folder holding the extracted frames.
+    frame_index : int
+        Index of the frame (0-based).
+    factor : int
+        Downscale factor (one of PYRAMID_FACTORS). Factor 1 returns the original frame path.
+
+    Returns
+    -------
+    str
+        Path to the pyramid level image file.
+    """
+    if factor <= 1:
+        return get_frame_path(frames_folder, frame_index)
+    return os.path.join(
+        frames_folder, PYRAMID_FOLDER, f"level_{factor}", f"frame_{frame_index:05d}.jpg"
+    )
+
+
+def _write_pyramid_info(frames_folder, width, height):
+    info_path = os.path.join(frames_folder, PYRAMID_FOLDER, PYRAMID_INFO_FILE)
+    info = {"width": int(width), "height": int(height), "factors": list(PYRAMID_FACTORS)}
+    try:
+        with open(info_path, "w") as f:
+            json.dump(info, f)
+    except OSError as e:
+        print(f"Warning: Could not write pyramid info {info_path}: {e}")
+    _frame_size_cache[frames_folder] = (int(width), int(height))
+
+
+def get_full_frame_size(frames_folder):
+    """
+    Get the (width, height) of the original frames.
+
+    Uses the pyramid metadata when available and falls back to reading the first frame.
+
+    Parameters
+    ----------
+    frames_folder : str
+        Folder holding the extracted frames.
+
+    Returns
+    -------
+    tuple or None
+        (width, height) in pixels, or None if no frame can be read.
+    """
+    if frames_folder in _frame_size_cache:
+        return _frame_size_cache[frames_folder]
+
+    info_path = os.path.join(frames_folder, PYRAMID_FOLDER, PYRAMID_INFO_FILE)
+    if os.path.exists(info_path):
+        try:
+            with open(info_path, "r") as f:
+                info = json.load(f)
+            size = (int(info["width"]), int(info["height"]))
+            _frame_size_cache[frames_folder] = size
+            return size
+        except (OSError, ValueError, KeyError):
+            pass
+
+    image = cv2.imread(get_frame_path(frames_folder, 0))
+    if image is None:
+        return None
+    size = (image.shape[1], image.shape[0])
+    _frame_size_cache[frames_folder] = size
+    return size
+
+
+def clear_frame_size_cache(frames_folder=None):
+    """
+    Forget cached frame sizes (call after re-extracting frames).
+
+    Parameters
+    ----------
+    frames_folder : str, optional
+        Folder to forget. If None, clears every folder.
+
+    Returns
+    -------
+    None
+    """
+    if frames_folder is None:
+        _frame_size_cache.clear()
+    else:
+        _frame_size_cache.pop(frames_folder, None)
+
+
+def save_frame_pyramid(image_bgr, frames_folder, frame_index):
+    """
+    Write the downscaled pyramid levels for one frame.
+
+    Each level is resized from the previous one, so the cost is dominated by the first
+    halving rather than by the number of levels.
+
+    Parameters
+    ----------
+    image_bgr : np.ndarray
+        Full resolution frame (BGR).
+    frames_folder : str
+        Folder holding the extracted frames.
+    frame_index : int
+        Index of the frame (0-based).
+
+    Returns
+    -------
+    dict
+        Mapping of factor -> downscaled BGR image.
+    """
+    levels = {}
+    if image_bgr is None:
+        return levels
+
+    full_h, full_w = image_bgr.shape[:2]
+    if frames_folder not in _frame_size_cache:
+        os.makedirs(os.path.join(frames_folder, PYRAMID_FOLDER), exist_ok=True)
+        _write_pyramid_info(frames_folder, full_w, full_h)
+
+    previous = image_bgr
+    for factor in PYRAMID_FACTORS:
+        width = max(1, full_w // factor)
+        height = max(1, full_h // factor)
+        level = cv2.resize(previous, (width, height), interpolation=cv2.INTER_AREA)
+        level_path = get_pyramid_frame_path(frames_folder, frame_index, factor)
+        os.makedirs(os.path.dirname(level_path), exist_ok=True)
+        cv2.imwrite(level_path, level)
+        levels[factor] = level
+        previous = level
+    return levels
+
+
+def load_frame_level(frames_folder, frame_index, factor=1):
+    """
+    Load a frame at the requested pyramid level, generating the pyramid on first view.
+
+    Parameters
+    ----------
+    frames_folder : str
+        Folder holding the extracted frames.
+    frame_index : int
+        Index of the frame (0-based).
+    factor : int, optional
+        Downscale factor (1 for full resolution).
+
+    Returns
+    -------
+    np.ndarray or None
+        BGR image at the requested level, or None if the frame does not exist.
+    """
+    if factor > 1:
+        level_path = get_pyramid_frame_path(frames_folder, frame_index, factor)
+        if os.path.exists(level_path):
+            image = cv2.imread(level_path)
+            if image is not None:
+                return image
+
+    image = cv2.imread(get_frame_path(frames_folder, frame_index))
+    if image is None or factor <= 1:
+        return image
+
+    try:
+        levels = save_frame_pyramid(image, frames_folder, frame_index)
+    except Exception as e:
+        print(f"Warning: Could not build pyramid for frame {frame_index}: {e}")
+        return image
+    return levels.get(factor, image)
+
+
+def select_pyramid_factor(display_scale):
+    """
+    Pick the coarsest pyramid level that still has at least one image pixel per screen pixel.
+
+    Parameters
+    ----------
+    display_scale : float or None
+        Screen pixels per original image pixel (1.0 = 100% zoom). None means unknown.
+
+    Returns
+    -------
+    int
+        Downscale factor to load (1 for full resolution).
+    """
+    if not display_scale or display_scale <= 0:
+        return 1
+    chosen = 1
+    for factor in PYRAMID_FACTORS:
+        if 1.0 / factor >= display_scale:
+            chosen = factor
+    return chosen
@@ -17,7 +17,8 @@ import pandas as pd
 import pyqtgraph as pg
 
 from .SizingUtils import get_plot_font_sizes, scaled_length
-from ..UI.DW_LW_FilteringWidget import compute_filter_pass_mask
+from .FilterEngine import FilterEngine, compute_filter_pass_mask
+from .TrajectorySummary import compute_trajectory_summary
 
 
 pg.setConfigOptions(antialias=True, background="w", foreground="k")
@@ -57,6 +58,11 @@ class GraphingPanelWidget(QWidget):
         self._selected_scatter_index = None
         self._active_scatter_id = None
         self._linked_particle = None
+        # Reused across redraws of the same plot data so only edited filters recompute
+        self._filter_engine = FilterEngine()
+        # Per-trajectory summary of the trajectories it was computed from
+        self._summary_source = None
+        self._trajectory_summary = None
 
     def set_config_manager(self, config_manager):
         self.config_manager = config_manager
@@ -235,7 +241,9 @@ class GraphingPanelWidget(QWidget):
             return None
         if plot_df is None or plot_df.empty:
             return None
-        return compute_filter_pass_mask(plot_df, fw.filters, fw.compound_filters)
+        return compute_filter_pass_mask(
+            plot_df, fw.filters, fw.compound_filters, engine=self._filter_engine
+        )
 
     def _scatter_is_active(self):
         return (
@@ -489,7 +497,10 @@ class GraphingPanelWidget(QWidget):
     def _plot_dataframe(self, df, page):
         if page == "detection":
             return df
-        return df.groupby(["particle"]).mean()
+        if df is not self._summary_source or self._trajectory_summary is None:
+            self._summary_source = df
+            self._trajectory_summary = compute_trajectory_summary(df)
+        return self._trajectory_summary
 
     def filtering_buttons(self, button_layout, page):
         self._filter_plot_page = page
@@ -0,0 +1,355 @@
+"""
+Instrumentation Module
+
+Description: Lightweight timers and counters for pipeline stages. Code wraps a stage in
+             ``instrumentation.stage(name)``; when the block exits, the stage's wall time,
+             counters, enclosing stage and thread are kept in a short in-memory history,
+             passed to listeners (the Performance panel) and appended to the project's
+             performance log (one JSON object per line).
+
+             Each stage also records the process RSS at start and end and its peak while
+             the stage was open, plus (with trace_memory) the tracemalloc peak above the
+             stage's starting allocation. Both peaks are process-wide, so stages open at
+             the same time on different threads see each other's allocations. The
+             tracemalloc peak counter is only reset by the RSS sampler thread, once per
+             sampling interval, so overlapping stages cannot wipe each other's peaks.
+             Stages that can grow large call
+             ``check_memory`` with a projected size first, which warns when the process
+             would exceed the project's memory budget.
+
+Copyright (c) 2025, Jacqueline Reynaga, Kevin Pillsbury, Bakir Husremovic
+License: BSD 3-Clause License
+Date: 2025-12-08
+"""
+
+import functools
+import json
+import os
+import threading
+import time
+import tracemalloc
+from collections import deque
+from contextlib import contextmanager
+
+from .MemoryMonitor import MB, RssSampler, current_rss_bytes, default_budget_bytes
+
+PERFORMANCE_LOG_FILE = "performance_log.jsonl"
+
+
+class StageRecord:
+    """Timing and counters of one stage run."""
+
+    def __init__(self, name, parent=None):
+        self.name = name
+        self.parent = parent
+        self.thread = threading.current_thread().name
+        self.started_at = time.strftime("%Y-%m-%d %H:%M:%S")
+        self.seconds = None
+        self.counts = {}
+        self.error = None
+        self.warnings = []
+        self.rss_start = None
+        self.rss_end = None
+        self.rss_peak = None
+        self.traced_peak = None
+        # Traced allocation at start and highest seen since (raised by the RSS sampler)
+        self.traced_start = 0
+        self.traced_high = 0
+
+    def add(self, key, value=1):
+        """
+        Add to a counter of this stage.
+
+        Parameters
+        ----------
+        key : str
+            Counter name (e.g. "frames", "rows").
+        value : int or float, optional
+            Amount to add.
+
+        Returns
+        -------
+        None
+        """
+        self.counts[key] = self.counts.get(key, 0) + value
+
+    def as_dict(self):
+        entry = {
+            "stage": self.name,
+            "seconds": None if self.seconds is None else round(self.seconds, 4),
+            "started_at": self.started_at,
+            "thread": self.thread,
+        }
+        if self.parent:
+            entry["parent"] = self.parent
+        if self.counts:
+            entry["counts"] = self.counts
+        memory = {
+            key: round(value / MB, 1)
+            for key, value in (
+                ("rss_start_mb", self.rss_start),
+                ("rss_end_mb", self.rss_end),
+                ("rss_peak_mb", self.rss_peak),
+                ("traced_peak_mb", self.traced_peak),
+            )
+            if value is not None
+        }
+        if memory:
+            entry["memory"] = memory
+        if self.warnings:
+            entry["warnings"] = self.warnings
+        if self.error:
+            entry["error"] = self.error
+        return entry
+
+
+class Instrumentation:
+    """Collects stage records and fans them out to listeners and a JSON-lines log."""
+
+    def __init__(self, history_size=500):
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.records = deque(maxlen=history_size)
+        self._listeners = []
+        self.log_path = None
+        self.rss_sampler = RssSampler()
+        self.budget_bytes = default_budget_bytes()
+        self.trace_memory = False
+
+    def configure_memory(self, budget_bytes=0, trace_memory=False):
+        """
+        Set the memory budget and whether tracemalloc peaks are recorded.
+
+        Parameters
+        ----------
+        budget_bytes : int, optional
+            Budget for ``check_memory`` warnings; 0 uses 80% of physical memory.
+        trace_memory : bool, optional
+            Record tracemalloc peaks per stage (slows allocation-heavy code down).
+
+        Returns
+        -------
+        None
+        """
+        self.budget_bytes = int(budget_bytes) if budget_bytes else default_budget_bytes()
+        self.trace_memory = bool(trace_memory)
+        if self.trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+        elif not self.trace_memory and tracemalloc.is_tracing():
+            tracemalloc.stop()
+
+    def set_log_folder(self, folder):
+        """
+        Append records to ``folder/performance_log.jsonl`` (None to stop logging).
+
+        Parameters
+        ----------
+        folder : str or None
+            Project data folder.
+
+        Returns
+        -------
+        None
+        """
+        with self._lock:
+            self.log_path = os.path.join(folder, PERFORMANCE_LOG_FILE) if folder else None
+
+    def add_listener(self, callback):
+        """
+        Call ``callback(record)`` after every stage, on the thread that ran the stage.
+
+        Parameters
+        ----------
+        callback : callable
+            Receives a StageRecord.
+
+        Returns
+        -------
+        None
+        """
+        with self._lock:
+            if callback not in self._listeners:
+                self._listeners.append(callback)
+
+    def remove_listener(self, callback):
+        with self._lock:
+            if callback in self._listeners:
+                self._listeners.remove(callback)
+
+    def _stack(self):
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    def current(self):
+        """
+        Innermost stage running on this thread.
+
+        Returns
+        -------
+        StageRecord or None
+            The open stage, if any.
+        """
+        stack = self._stack()
+        return stack[-1] if stack else None
+
+    @contextmanager
+    def stage(self, name, **counts):
+        """
+        Time a block as a named stage.
+
+        Parameters
+        ----------
+        name : str
+            Stage name shown in the panel and log.
+        **counts
+            Initial counters (more can be added through the yielded record).
+
+        Yields
+        ------
+        StageRecord
+            The record being filled in.
+        """
+        stack = self._stack()
+        parent = stack[-1] if stack else None
+        record = StageRecord(name, parent=parent.name if parent else None)
+        record.counts.update(counts)
+        self._begin_memory(record, parent)
+        stack.append(record)
+        start = time.perf_counter()
+        try:
+            yield record
+        except BaseException as e:
+            record.error = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            record.seconds = time.perf_counter() - start
+            stack.pop()
+            self._end_memory(record, parent)
+            self._finish(record)
+
+    def _begin_memory(self, record, parent):
+        record.rss_start = current_rss_bytes()
+        record.rss_peak = record.rss_start
+        if tracemalloc.is_tracing():
+            current = tracemalloc.get_traced_memory()[0]
+            record.traced_start = current
+            record.traced_high = current
+        self.rss_sampler.watch(record)
+
+    def _end_memory(self, record, parent):
+        self.rss_sampler.unwatch(record)
+        record.rss_end = current_rss_bytes()
+        if record.rss_end is not None:
+            record.rss_peak = max(record.rss_peak or 0, record.rss_end)
+        if tracemalloc.is_tracing():
+            # Peak since the sampler's last reset, which may predate this stage by up to
+            # one sampling interval
+            record.traced_high = max(record.traced_high, tracemalloc.get_traced_memory()[1])
+            record.traced_peak = max(0, record.traced_high - record.traced_start)
+            if parent is not None:
+                # A short child peak may fall between the parent's samples
+                parent.traced_high = max(parent.traced_high, record.traced_high)
+
+    def check_memory(self, projected_bytes, suggestion=""):
+        """
+        Warn if the process is projected to exceed the memory budget.
+
+        Called before (or early in) a stage with an estimate of the memory it will still
+        allocate. The warning is printed and attached to the innermost open stage, so it
+        also appears in the Performance panel and the performance log.
+
+        Parameters
+        ----------
+        projected_bytes : int or float
+            Additional memory the stage is expected to need.
+        suggestion : str, optional
+            What to do instead (e.g. a chunked or streaming alternative).
+
+        Returns
+        -------
+        str or None
+            The warning, or None if the projection fits (or memory is unknown).
+        """
+        rss = current_rss_bytes()
+        if rss is None or not self.budget_bytes:
+            return None
+        if rss + projected_bytes <= self.budget_bytes:
+            return None
+        record = self.current()
+        stage_name = record.name if record is not None else "Next stage"
+        message = (
+            f"Memory warning: {stage_name} is projected to need {projected_bytes / MB:.0f} MB "
+            f"more (process at {rss / MB:.0f} MB, budget {self.budget_bytes / MB:.0f} MB)."
+        )
+        if suggestion:
+            message += f" {suggestion}"
+        print(message)
+        if record is not None:
+            record.warnings.append(message)
+        return message
+
+    def timed(self, name):
+        """
+        Decorator running every call of a function as a stage.
+
+        Parameters
+        ----------
+        name : str
+            Stage name.
+
+        Returns
+        -------
+        callable
+            Decorator.
+        """
+
+        def decorator(fn):
+            @functools.wraps(fn)
+            def wrapper(*args, **kwargs):
+                with self.stage(name):
+                    return fn(*args, **kwargs)
+
+            return wrapper
+
+        return decorator
+
+    def count(self, key, value=1):
+        """
+        Add to a counter of the innermost open stage on this thread (no-op if none).
+
+        Parameters
+        ----------
+        key : str
+            Counter name.
+        value : int or float, optional
+            Amount to add.
+
+        Returns
+        -------
+        None
+        """
+        record = self.current()
+        if record is not None:
+            record.add(key, value)
+
+    def _finish(self, record):
+        with self._lock:
+            self.records.append(record)
+            listeners = list(self._listeners)
+            log_path = self.log_path
+            if log_path:
+                try:
+                    with open(log_path, "a") as f:
+                        f.write(json.dumps(record.as_dict()) + "\n")
+                except OSError as e:
+                    print(f"Warning: Could not write performance log {log_path}: {e}")
+        for callback in listeners:
+            try:
+                callback(record)
+            except Exception as e:
+                print(f"Warning: Performance listener failed: {e}")
+
+
+instrumentation = Instrumentation()
@@ -2,7 +2,8 @@
 Interactive Frame Viewer
 
 Description: Zoomable, pannable video frame display using PyQtGraph (same interaction
-             model as the particle plot panels).
+             model as the particle plot panels). Detection regions of interest are drawn
+             and edited on top of the frame as rectangle and polygon ROIs.
 
 Copyright (c) 2025, Jacqueline Reynaga, Kevin Pillsbury, Bakir Husremovic
 License: BSD 3-Clause License
@@ -11,7 +12,8 @@ Date: 2025-12-08
 
 import numpy as np
 import pyqtgraph as pg
-from PySide6.QtCore import Qt, Signal
+from PySide6.QtCore import QPointF, QRectF, Qt, QTimer, Signal
+from PySide6.QtGui import QPolygonF
 from PySide6.QtWidgets import (
     QHBoxLayout,
     QLabel,
@@ -22,6 +24,7 @@ from PySide6.QtWidgets import (
     QWidget,
     QWidgetAction,
 )
+from .FrameStore import select_pyramid_factor
 
 
 class InteractiveFrameViewer(QWidget):
@@ -29,6 +32,12 @@ class InteractiveFrameViewer(QWidget):
 
     viewOptionsChanged = Signal()
     particleClicked = Signal(float, float)
+    # Emitted (debounced) when the zoom level calls for a different pyramid level
+    pyramidLevelChanged = Signal(int)
+    # Emitted with the region list after the user adds, edits or removes a region
+    regionsChanged = Signal(list)
+
+    ROI_COLOR = "#ffd54f"
 
     def __init__(self, parent=None):
         super().__init__(parent)
@@ -36,6 +45,9 @@ class InteractiveFrameViewer(QWidget):
         self._greyscale = False
         self._threshold_enabled = False
         self._threshold_percent = 50
+        self._full_size = None
+        self._display_factor = 1
+        self._roi_items = []
 
         layout = QVBoxLayout(self)
         layout.setContentsMargins(0, 0, 0, 0)
@@ -69,8 +81,22 @@ class InteractiveFrameViewer(QWidget):
 
         self.image_item = pg.ImageItem()
         self.plot.addItem(self.image_item)
+
+        # Vector overlays drawn on top of the frame in full resolution image coordinates
+        self.annotation_item = pg.ScatterPlotItem(pxMode=False, symbol="o", brush=None)
+        self.annotation_item.setZValue(10)
+        self.plot.addItem(self.annotation_item)
+        self.highlight_item = pg.ScatterPlotItem(pxMode=False, symbol="s", brush=None)
+        self.highlight_item.setZValue(11)
+        self.plot.addItem(self.highlight_item)
         self.plot.scene().sigMouseClicked.connect(self._on_scene_mouse_clicked)
 
+        self._zoom_timer = QTimer(self)
+        self._zoom_timer.setSingleShot(True)
+        self._zoom_timer.setInterval(150)
+        self._zoom_timer.timeout.connect(self._check_pyramid_level)
+        self.plot.vb.sigRangeChanged.connect(lambda *_: self._zoom_timer.start())
+
         self.stack.setCurrentWidget(self.placeholder_label)
 
         self.setContextMenuPolicy(Qt.CustomContextMenu)
@@ -140,17 +166,141 @@ class InteractiveFrameViewer(QWidget):
         sender = self.sender()
         if sender is self.graphics:
             global_pos = self.graphics.mapToGlobal(pos)
+            view_pos = self.plot.vb.mapSceneToView(self.graphics.mapToScene(pos))
         else:
             global_pos = self.mapToGlobal(pos)
+            view_pos = None
+
+        menu.addSeparator()
+        add_rect_action = menu.addAction("Add rectangle region")
+        add_rect_action.setEnabled(self._has_image)
+        add_rect_action.triggered.connect(lambda: self.add_region("rect"))
+        add_polygon_action = menu.addAction("Add polygon region")
+        add_polygon_action.setEnabled(self._has_image)
+        add_polygon_action.triggered.connect(lambda: self.add_region("polygon"))
+        item = self._roi_item_at(view_pos) if view_pos is not None else None
+        if item is not None:
+            remove_action = menu.addAction("Remove this region")
+            remove_action.triggered.connect(lambda: self._remove_roi_item(item))
+        clear_action = menu.addAction("Clear regions (detect full frame)")
+        clear_action.setEnabled(bool(self._roi_items))
+        clear_action.triggered.connect(self._clear_regions_by_user)
+
         menu.exec(global_pos)
 
+    def set_regions(self, regions):
+        """
+        Replace the drawn regions of interest (does not emit regionsChanged).
+
+        Parameters
+        ----------
+        regions : list of dict
+            {"type": "rect" | "polygon", "points": [[x, y], ...]} in full resolution
+            image coordinates.
+        """
+        for item in self._roi_items:
+            self.plot.removeItem(item)
+        self._roi_items = []
+        for region in regions:
+            self._add_roi_item(region)
+
+    def get_regions(self):
+        """
+        Regions of interest as currently drawn.
+
+        Returns
+        -------
+        list of dict
+            Regions in full resolution image coordinates.
+        """
+        return [self._roi_region(item) for item in self._roi_items]
+
+    def add_region(self, kind):
+        """
+        Add a rectangle or polygon region in the middle of the visible part of the frame.
+
+        Parameters
+        ----------
+        kind : str
+            "rect" or "polygon".
+        """
+        view = self.plot.vb.viewRect()
+        if self._full_size:
+            view = view.intersected(QRectF(0, 0, self._full_size[0], self._full_size[1]))
+        cx, cy = view.center().x(), view.center().y()
+        rx, ry = view.width() / 4, view.height() / 4
+        if kind == "rect":
+            points = [[cx - rx, cy - ry], [cx + rx, cy + ry]]
+        else:
+            angles = np.linspace(0, 2 * np.pi, 6, endpoint=False)
+            points = [[cx + rx * np.cos(a), cy + ry * np.sin(a)] for a in angles]
+        self._add_roi_item({"type": kind, "points": points})
+        self._emit_regions()
+
+    def _add_roi_item(self, region):
+        pen = pg.mkPen(self.ROI_COLOR, width=2, style=Qt.DashLine)
+        if region["type"] == "rect":
+            (x0, y0), (x1, y1) = region["points"][:2]
+            item = pg.RectROI(
+                [min(x0, x1), min(y0, y1)], [abs(x1 - x0), abs(y1 - y0)], pen=pen
+            )
+        else:
+            item = pg.PolyLineROI(region["points"], closed=True, pen=pen)
+        item.region_type = region["type"]
+        item.setZValue(20)
+        item.sigRegionChangeFinished.connect(lambda *_: self._emit_regions())
+        self.plot.addItem(item)
+        self._roi_items.append(item)
+
+    @staticmethod
+    def _roi_region(item):
+        if item.region_type == "rect":
+            pos, size = item.pos(), item.size()
+            points = [[pos.x(), pos.y()], [pos.x() + size.x(), pos.y() + size.y()]]
+        else:
+            points = [
+                [point.x(), point.y()]
+                for point in (
+                    item.mapToParent(local) for _, local in item.getLocalHandlePositions()
+                )
+            ]
+        return {"type": item.region_type, "points": points}
+
+    def _roi_item_at(self, view_pos):
+        """Topmost region containing a point in image coordinates."""
+        for item in reversed(self._roi_items):
+            polygon = QPolygonF([QPointF(x, y) for x, y in self._roi_corners(item)])
+            if polygon.containsPoint(view_pos, Qt.OddEvenFill):
+                return item
+        return None
+
+    def _roi_corners(self, item):
+        region = self._roi_region(item)
+        if region["type"] == "rect":
+            (x0, y0), (x1, y1) = region["points"]
+            return [(x0, y0), (x1, y0), (x1, y1), (x0, y1)]
+        return region["points"]
+
+    def _remove_roi_item(self, item):
+        if item in self._roi_items:
+            self._roi_items.remove(item)
+            self.plot.removeItem(item)
+            self._emit_regions()
+
+    def _clear_regions_by_user(self):
+        self.set_regions([])
+        self._emit_regions()
+
+    def _emit_regions(self):
+        self.regionsChanged.emit(self.get_regions())
+
     def set_message(self, message):
         """Show a text placeholder instead of a frame."""
         self._has_image = False
         self.placeholder_label.setText(message)
         self.stack.setCurrentWidget(self.placeholder_label)
 
-    def set_frame_image(self, rgb_image, reset_view=True):
+    def set_frame_image(self, rgb_image, reset_view=True, full_size=None, factor=1):
         """
         Display an RGB frame (HxWx3 uint8).
 
@@ -160,6 +310,12 @@ class InteractiveFrameViewer(QWidget):
             Image in row-major RGB order.
         reset_view : bool
             If True, fit the full frame in view (used when changing frames).
+        full_size : tuple, optional
+            (width, height) of the full resolution frame. When the image is a downscaled
+            pyramid level it is stretched to this size so view coordinates stay in
+            full resolution pixels.
+        factor : int, optional
+            Pyramid downscale factor of ``rgb_image`` (1 for full resolution).
         """
         if rgb_image is None or rgb_image.size == 0:
             self.set_message("Frame not found")
@@ -168,9 +324,106 @@ class InteractiveFrameViewer(QWidget):
         self._has_image = True
         self.stack.setCurrentWidget(self.graphics)
         self.image_item.setImage(np.ascontiguousarray(rgb_image), axisOrder="row-major")
+        if full_size is None:
+            full_size = (rgb_image.shape[1] * factor, rgb_image.shape[0] * factor)
+        self._full_size = full_size
+        self._display_factor = factor
+        self.image_item.setRect(QRectF(0, 0, full_size[0], full_size[1]))
         if reset_view:
             self.reset_view()
 
+    def set_annotations(self, xs, ys, diameter, color):
+        """
+        Replace the particle annotation overlay.
+
+        Parameters
+        ----------
+        xs, ys : np.ndarray
+            Particle positions in full resolution image coordinates.
+        diameter : float
+            Circle diameter in image pixels.
+        color : tuple
+            RGB color of the circles.
+        """
+        self.annotation_item.setData(
+            x=xs, y=ys, size=diameter, pen=pg.mkPen(color, width=2), brush=None
+        )
+
+    def set_annotations_visible(self, visible):
+        """Show or hide the particle annotation overlay without touching its data."""
+        self.annotation_item.setVisible(visible)
+
+    def clear_annotations(self):
+        """Remove all particle annotations."""
+        self.annotation_item.clear()
+
+    def set_highlights(self, highlights):
+        """
+        Replace the highlight overlay (squares around selected particles).
+
+        Parameters
+        ----------
+        highlights : list of tuple
+            (x, y, size, rgb_color) for each highlight, in image coordinates.
+        """
+        if not highlights:
+            self.highlight_item.clear()
+            return
+        self.highlight_item.setData(
+            [
+                {
+                    "pos": (x, y),
+                    "size": size,
+                    "pen": pg.mkPen(color, width=3),
+                    "brush": None,
+                }
+                for x, y, size, color in highlights
+            ]
+        )
+
+    def get_display_scale(self, full_size=None, fit=False):
+        """
+        Screen pixels per full resolution image pixel for the current view.
+
+        Parameters
+        ----------
+        full_size : tuple, optional
+            (width, height) of the full frame. Defaults to the displayed frame size.
+        fit : bool, optional
+            If True, return the scale the frame would have after ``reset_view``.
+
+        Returns
+        -------
+        float or None
+            Display scale, or None if it cannot be determined yet.
+        """
+        vb = self.plot.vb
+        vb_width = vb.width()
+        vb_height = vb.height()
+        if vb_width <= 1 or vb_height <= 1:
+            return None
+        pixel_ratio = self.devicePixelRatioF()
+
+        full_size = full_size or self._full_size
+        if fit or not self._has_image:
+            if not full_size:
+                return None
+            scale = min(vb_width / full_size[0], vb_height / full_size[1])
+        else:
+            view_width = vb.viewRect().width()
+            if view_width <= 0:
+                return None
+            scale = vb_width / view_width
+        return scale * pixel_ratio
+
+    def _check_pyramid_level(self):
+        """Ask for a different pyramid level when zooming has changed the display scale."""
+        if not self._has_image:
+            return
+        factor = select_pyramid_factor(self.get_display_scale())
+        if factor != self._display_factor:
+            self.pyramidLevelChanged.emit(factor)
+
     def reset_view(self):
         """Fit the entire frame in the viewer."""
         if not self._has_image:
@@ -190,4 +443,6 @@ class InteractiveFrameViewer(QWidget):
     def clear(self):
         self._has_image = False
         self.image_item.clear()
+        self.annotation_item.clear()
+        self.highlight_item.clear()
         self.set_message("")
@@ -0,0 +1,152 @@
+"""
+Memory Monitor Module
+
+Description: Process memory readings for the instrumentation layer: current resident
+             set size (psutil if installed, else /proc on Linux), total physical memory,
+             and a background sampler that tracks the peak RSS (and, while tracemalloc
+             is tracing, the peak traced allocation) while stages are open.
+
+Copyright (c) 2025, Jacqueline Reynaga, Kevin Pillsbury, Bakir Husremovic
+License: BSD 3-Clause License
+Date: 2025-12-08
+"""
+
+import os
+import threading
+import tracemalloc
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+MB = 1024 * 1024
+
+# Share of physical memory used as the budget when none is configured
+DEFAULT_BUDGET_FRACTION = 0.8
+
+
+def current_rss_bytes():
+    """
+    Resident set size of this process.
+
+    Returns
+    -------
+    int or None
+        Bytes, or None if it cannot be read on this platform.
+    """
+    if psutil is not None:
+        try:
+            return psutil.Process().memory_info().rss
+        except Exception:
+            return None
+    try:
+        with open("/proc/self/statm", "r") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError, AttributeError):
+        return None
+
+
+def total_memory_bytes():
+    """
+    Physical memory of the machine.
+
+    Returns
+    -------
+    int or None
+        Bytes, or None if unknown.
+    """
+    if psutil is not None:
+        return psutil.virtual_memory().total
+    try:
+        return os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES")
+    except (ValueError, OSError, AttributeError):
+        return None
+
+
+def default_budget_bytes():
+    """
+    Budget used when the project does not set memory_budget_mb.
+
+    Returns
+    -------
+    int or None
+        80% of physical memory, or None if it is unknown.
+    """
+    total = total_memory_bytes()
+    return int(total * DEFAULT_BUDGET_FRACTION) if total else None
+
+
+class RssSampler:
+    """
+    Polls RSS in the background and raises ``rss_peak`` on every watched record.
+
+    While tracemalloc is tracing it also raises ``traced_high`` with the traced peak of
+    each interval. This thread is the only place the tracemalloc peak is reset, so the
+    peak read on each poll covers exactly the interval since the previous one.
+    """
+
+    def __init__(self, interval=0.05):
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._records = []
+        self._thread = None
+        self._wake = threading.Event()
+        self._unsupported = False
+
+    def watch(self, record):
+        """
+        Track the peak RSS for ``record`` until ``unwatch`` (sets ``record.rss_peak``).
+
+        Parameters
+        ----------
+        record : StageRecord
+            Open stage.
+
+        Returns
+        -------
+        None
+        """
+        if self._unsupported:
+            return
+        with self._lock:
+            self._records.append(record)
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name="RssSampler", daemon=True
+                )
+                self._thread.start()
+        self._wake.set()
+
+    def unwatch(self, record):
+        with self._lock:
+            if record in self._records:
+                self._records.remove(record)
+
+    def _run(self):
+        while True:
+            with self._lock:
+                records = list(self._records)
+            if not records:
+                # Sleep until a stage opens instead of polling an idle process
+                self._wake.wait()
+                self._wake.clear()
+                continue
+            rss = current_rss_bytes()
+            traced_peak = None
+            if tracemalloc.is_tracing():
+                traced_peak = tracemalloc.get_traced_memory()[1]
+                tracemalloc.reset_peak()
+            if rss is None and traced_peak is None:
+                self._unsupported = True
+                with self._lock:
+                    self._records.clear()
+                    self._thread = None
+                return
+            for record in records:
+                if rss is not None and (record.rss_peak is None or rss > record.rss_peak):
+                    record.rss_peak = rss
+                if traced_peak is not None and traced_peak > record.traced_high:
+                    record.traced_high = traced_peak
+            self._wake.wait(self.interval)
+            self._wake.clear()
@@ -0,0 +1,401 @@
+"""
+Parameter Sweep Module
+
+Description: Grid searches over detection and linking parameters, run in a process
+             pool so good settings can be picked in one pass instead of one full run
+             per guess. Detection combinations run on a sample of frames and are
+             summarized by particle count, mass distribution and subpixel bias.
+             Linking combinations run on the filtered particles (optionally a frame
+             sub-range) and are summarized by trajectory count and length, links near
+             the search range and memory gap usage.
+
+Copyright (c) 2025, Jacqueline Reynaga, Kevin Pillsbury, Bakir Husremovic
+License: BSD 3-Clause License
+Date: 2025-12-08
+"""
+
+import itertools
+import multiprocessing
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import numpy as np
+import pandas as pd
+
+from . import ParticleProcessing
+
+DETECTION_SWEEP_PARAMETERS = ("feature_size", "min_mass", "threshold")
+DEFAULT_SAMPLE_FRAMES = 10
+# Above this many combinations the dialog asks before running
+LARGE_SWEEP = 200
+SUBPIXEL_BINS = 10
+
+LINKING_SWEEP_PARAMETERS = ("search_range", "memory", "min_trajectory_length")
+# Links longer than this fraction of search_range count as "near the search range"
+NEAR_RANGE_FRACTION = 0.8
+# Particles shared by the linking sweep workers (set once per worker process)
+_sweep_particles = None
+
+
+def value_range(start, stop, step):
+    """
+    Values from ``start`` to ``stop`` (inclusive) in steps of ``step``.
+
+    Parameters
+    ----------
+    start, stop, step : float
+        Range bounds and step; a step of 0 gives just ``start``.
+
+    Returns
+    -------
+    list of float
+        The values, rounded to remove floating point drift.
+    """
+    if step <= 0 or stop <= start:
+        return [start]
+    count = int(np.floor((stop - start) / step + 1e-9)) + 1
+    return [round(start + i * step, 6) for i in range(count)]
+
+
+def parameter_grid(ranges):
+    """
+    Every combination of the given parameter values.
+
+    Parameters
+    ----------
+    ranges : dict
+        Parameter name -> list of values.
+
+    Returns
+    -------
+    list of dict
+        One dict per combination.
+    """
+    names = list(ranges)
+    return [dict(zip(names, values)) for values in itertools.product(*ranges.values())]
+
+
+def sample_frames(frame_paths, count=DEFAULT_SAMPLE_FRAMES):
+    """
+    Evenly spaced frames from a list.
+
+    Parameters
+    ----------
+    frame_paths : list of str
+        All candidate frames.
+    count : int, optional
+        Number of frames to keep.
+
+    Returns
+    -------
+    list of str
+        The sampled frames, in order.
+    """
+    if len(frame_paths) <= count:
+        return list(frame_paths)
+    indexes = np.unique(np.linspace(0, len(frame_paths) - 1, count).astype(int))
+    return [frame_paths[i] for i in indexes]
+
+
+def subpixel_bias_score(particles):
+    """
+    How far the fractional parts of x and y are from uniform.
+
+    Parameters
+    ----------
+    particles : pd.DataFrame
+        Located particles.
+
+    Returns
+    -------
+    float
+        Mean absolute deviation of a 10-bin histogram of x % 1 and y % 1 from a
+        flat histogram, relative to the flat bin count: 0 is unbiased, values
+        above about 0.2 usually mean the feature size is too small.
+    """
+    if particles.empty:
+        return float("nan")
+    deviations = []
+    for column in ("x", "y"):
+        counts, _ = np.histogram(particles[column].to_numpy() % 1, bins=SUBPIXEL_BINS, range=(0, 1))
+        expected = len(particles) / SUBPIXEL_BINS
+        deviations.append(np.abs(counts - expected).mean() / expected)
+    return float(np.mean(deviations))
+
+
+def evaluate_detection_params(frame_paths, params):
+    """
+    Run detection with one parameter set and summarize the result.
+
+    Process-pool worker for ``run_detection_sweep``.
+
+    Parameters
+    ----------
+    frame_paths : list of str
+        Sampled frames.
+    params : dict
+        Full detection parameters.
+
+    Returns
+    -------
+    dict
+        particles, particles_per_frame, mass_p10, mass_median, mass_p90,
+        subpixel_bias and seconds.
+    """
+    start = time.perf_counter()
+    particles = ParticleProcessing.find_particles_in_frames(frame_paths, params, tile_workers=1)
+    seconds = time.perf_counter() - start
+    if particles is None or particles.empty:
+        particles = pd.DataFrame(columns=["x", "y", "mass"])
+    mass = particles["mass"].to_numpy(dtype=float)
+    p10, median, p90 = np.percentile(mass, [10, 50, 90]) if len(mass) else (np.nan,) * 3
+    return {
+        "particles": len(particles),
+        "particles_per_frame": len(particles) / max(1, len(frame_paths)),
+        "mass_p10": float(p10),
+        "mass_median": float(median),
+        "mass_p90": float(p90),
+        "subpixel_bias": subpixel_bias_score(particles),
+        "seconds": round(seconds, 3),
+    }
+
+
+def run_detection_sweep(
+    frame_paths,
+    base_params,
+    grid,
+    workers=None,
+    progress_callback=None,
+    cancel_check=None,
+):
+    """
+    Evaluate detection parameter combinations in parallel.
+
+    Parameters
+    ----------
+    frame_paths : list of str
+        Frames to detect in (usually ``sample_frames`` of the movie).
+    base_params : dict
+        Detection parameters the combinations override (invert, roi, ...).
+    grid : list of dict
+        Parameter combinations (``parameter_grid``).
+    workers : int, optional
+        Worker processes. Defaults to the CPU count.
+    progress_callback : callable, optional
+        Called with (finished, total) after each combination.
+    cancel_check : callable, optional
+        Polled while waiting; return True to stop (pending combinations are dropped).
+
+    Returns
+    -------
+    pd.DataFrame
+        One row per finished combination: the swept parameters and their metrics,
+        in grid order.
+    """
+    workers = max(1, min(workers or os.cpu_count() or 1, len(grid) or 1))
+    rows = {}
+    # Spawned, not forked: the sweep starts from a QThread in the GUI process, and a
+    # fork would copy its locks mid-use and its performance log and Qt listeners
+    with ProcessPoolExecutor(
+        max_workers=workers, mp_context=multiprocessing.get_context("spawn")
+    ) as pool:
+        futures = {
+            pool.submit(evaluate_detection_params, frame_paths, {**base_params, **combo}): index
+            for index, combo in enumerate(grid)
+        }
+        pending = set(futures)
+        while pending:
+            done, pending = wait(pending, timeout=0.2, return_when=FIRST_COMPLETED)
+            for future in done:
+                index = futures[future]
+                try:
+                    rows[index] = {**grid[index], **future.result()}
+                except Exception as e:
+                    print(f"Warning: Sweep combination {grid[index]} failed: {e}")
+            if progress_callback:
+                progress_callback(len(rows), len(grid))
+            if cancel_check and cancel_check():
+                for future in pending:
+                    future.cancel()
+                break
+    return pd.DataFrame([rows[index] for index in sorted(rows)])
+
+
+def frame_subrange(particles, first_frame=None, last_frame=None):
+    """
+    Particles within a frame range.
+
+    Parameters
+    ----------
+    particles : pd.DataFrame
+        Particles with a frame column.
+    first_frame, last_frame : int, optional
+        Inclusive frame bounds; None leaves that side open.
+
+    Returns
+    -------
+    pd.DataFrame
+        The particles in range.
+    """
+    keep = np.ones(len(particles), dtype=bool)
+    if first_frame is not None:
+        keep &= particles["frame"].to_numpy() >= first_frame
+    if last_frame is not None:
+        keep &= particles["frame"].to_numpy() <= last_frame
+    return particles[keep]
+
+
+def trajectory_link_metrics(trajectories, search_range, min_trajectory_length):
+    """
+    Summarize linked trajectories after dropping short ones.
+
+    Parameters
+    ----------
+    trajectories : pd.DataFrame
+        Output of trackpy.link_df (particle, frame, x, y).
+    search_range : float
+        Search range the trajectories were linked with.
+    min_trajectory_length : int
+        Trajectories with fewer detections are dropped first (as filter_stubs does).
+
+    Returns
+    -------
+    dict
+        trajectories, mean_length, particles_kept (fraction of detections in kept
+        trajectories), near_range_links (fraction of links longer than
+        NEAR_RANGE_FRACTION * search_range), memory_links (fraction of links that
+        skip at least one frame) and mean_gap (mean frames skipped per memory link).
+    """
+    ordered = trajectories.sort_values(["particle", "frame"], kind="stable")
+    lengths = ordered.groupby("particle", sort=False)["frame"].transform("size").to_numpy()
+    ordered = ordered[lengths >= min_trajectory_length]
+
+    ids = ordered["particle"].to_numpy()
+    frames = ordered["frame"].to_numpy()
+    same = ids[1:] == ids[:-1]
+    steps = np.hypot(np.diff(ordered["x"].to_numpy()), np.diff(ordered["y"].to_numpy()))[same]
+    gaps = (np.diff(frames) - 1)[same]
+    count = int(len(np.unique(ids)))
+    has_links = len(steps) > 0
+    return {
+        "trajectories": count,
+        "mean_length": len(ordered) / count if count else 0.0,
+        "particles_kept": len(ordered) / max(1, len(trajectories)),
+        "near_range_links": (
+            float(np.mean(steps > NEAR_RANGE_FRACTION * search_range)) if has_links else np.nan
+        ),
+        "memory_links": float(np.mean(gaps > 0)) if has_links else np.nan,
+        "mean_gap": float(gaps[gaps > 0].mean()) if np.any(gaps > 0) else 0.0,
+    }
+
+
+def _set_sweep_particles(particles):
+    # Pool initializer: the particles are sent once per worker, not once per combination
+    global _sweep_particles
+    import trackpy as tp
+
+    tp.quiet()
+    _sweep_particles = particles
+
+
+def evaluate_linking_params(search_range, memory, min_trajectory_lengths):
+    """
+    Link the shared particles once and summarize each minimum trajectory length.
+
+    Process-pool worker for ``run_linking_sweep``. Dropping short trajectories does
+    not change the links, so all lengths are scored from one linking run.
+
+    Parameters
+    ----------
+    search_range : float
+        Maximum distance a particle can move between frames.
+    memory : int
+        Frames a particle can disappear for and still be linked.
+    min_trajectory_lengths : list of int
+        Minimum trajectory lengths to score.
+
+    Returns
+    -------
+    list of dict
+        One ``trajectory_link_metrics`` dict (plus seconds, the linking time) per
+        length, in the given order.
+    """
+    import trackpy as tp
+
+    start = time.perf_counter()
+    trajectories = tp.link_df(_sweep_particles, search_range=search_range, memory=memory)
+    seconds = round(time.perf_counter() - start, 3)
+    return [
+        {**trajectory_link_metrics(trajectories, search_range, length), "seconds": seconds}
+        for length in min_trajectory_lengths
+    ]
+
+
+def run_linking_sweep(particles, grid, workers=None, progress_callback=None, cancel_check=None):
+    """
+    Evaluate linking parameter combinations in parallel.
+
+    Combinations sharing search_range and memory are linked once.
+
+    Parameters
+    ----------
+    particles : pd.DataFrame
+        Particles to link (frame, x, y); usually the filtered particles.
+    grid : list of dict
+        search_range, memory and min_trajectory_length combinations
+        (``parameter_grid``).
+    workers : int, optional
+        Worker processes. Defaults to the CPU count.
+    progress_callback : callable, optional
+        Called with (finished, total) combinations after each linking run.
+    cancel_check : callable, optional
+        Polled while waiting; return True to stop (pending runs are dropped).
+
+    Returns
+    -------
+    pd.DataFrame
+        One row per finished combination: the swept parameters and their metrics,
+        in grid order.
+    """
+    groups = {}
+    for index, combo in enumerate(grid):
+        key = (float(combo["search_range"]), int(combo["memory"]))
+        groups.setdefault(key, []).append(index)
+
+    particles = particles[["frame", "x", "y"]].reset_index(drop=True)
+    workers = max(1, min(workers or os.cpu_count() or 1, len(groups) or 1))
+    rows = {}
+    # Spawned for the same reason as the detection sweep pool
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=_set_sweep_particles,
+        initargs=(particles,),
+    ) as pool:
+        futures = {
+            pool.submit(
+                evaluate_linking_params,
+                search_range,
+                memory,
+                [int(grid[index]["min_trajectory_length"]) for index in indexes],
+            ): indexes
+            for (search_range, memory), indexes in groups.items()
+        }
+        pending = set(futures)
+        while pending:
+            done, pending = wait(pending, timeout=0.2, return_when=FIRST_COMPLETED)
+            for future in done:
+                indexes = futures[future]
+                try:
+                    for index, metrics in zip(indexes, future.result()):
+                        rows[index] = {**grid[index], **metrics}
+                except Exception as e:
+                    print(f"Warning: Sweep combination {grid[indexes[0]]} failed: {e}")
+            if progress_callback:
+                progress_callback(len(rows), len(grid))
+            if cancel_check and cancel_check():
+                for future in pending:
+                    future.cancel()
+                break
+    return pd.DataFrame([rows[index] for index in sorted(rows)])
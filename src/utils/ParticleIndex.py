@@ -0,0 +1,169 @@
+"""
+Particle Index Module
+
+Description: Row indexes over particle tables. Groups rows by a key column (frame or
+             particle id) once so per-frame or per-trajectory lookups are array slices
+             instead of full-table boolean scans.
+
+Copyright (c) 2025, Jacqueline Reynaga, Kevin Pillsbury, Bakir Husremovic
+License: BSD 3-Clause License
+Date: 2025-12-08
+"""
+
+import numpy as np
+import pandas as pd
+
+
+class GroupedRowIndex:
+    """Maps each value of a key column to the positional rows holding it."""
+
+    def __init__(self, df: pd.DataFrame, key_column: str):
+        """
+        Build the index.
+
+        Parameters
+        ----------
+        df : pd.DataFrame
+            Table to index. Rows are referenced by position, not by index label.
+        key_column : str
+            Column to group rows by (e.g. "frame" or "particle").
+        """
+        self.key_column = key_column
+        self.row_count = len(df)
+        if df.empty or key_column not in df.columns:
+            self.order = np.empty(0, dtype=np.int64)
+            self.keys = np.empty(0)
+            self._starts = np.empty(0, dtype=np.int64)
+            self._ends = np.empty(0, dtype=np.int64)
+            return
+
+        values = df[key_column].to_numpy()
+        self.order = np.argsort(values, kind="stable")
+        self.keys, self._starts = np.unique(values[self.order], return_index=True)
+        self._ends = np.append(self._starts[1:], len(self.order))
+
+    def __len__(self):
+        return len(self.keys)
+
+    def _span(self, key):
+        pos = np.searchsorted(self.keys, key)
+        if pos >= len(self.keys) or self.keys[pos] != key:
+            return 0, 0
+        return self._starts[pos], self._ends[pos]
+
+    def rows(self, key) -> np.ndarray:
+        """
+        Positional row numbers for one key.
+
+        Parameters
+        ----------
+        key : scalar
+            Key value to look up.
+
+        Returns
+        -------
+        np.ndarray
+            Row positions (empty if the key is absent).
+        """
+        start, end = self._span(key)
+        return self.order[start:end]
+
+    def counts(self) -> np.ndarray:
+        """
+        Number of rows for each key, aligned with ``keys``.
+
+        Returns
+        -------
+        np.ndarray
+            Row counts per key.
+        """
+        return self._ends - self._starts
+
+    def expand_key_mask(self, key_mask) -> np.ndarray:
+        """
+        Expand a per-key boolean mask to a per-row mask.
+
+        Parameters
+        ----------
+        key_mask : array-like of bool
+            One entry per key, aligned with ``keys``.
+
+        Returns
+        -------
+        np.ndarray
+            Boolean mask with one entry per row of the indexed table.
+        """
+        row_mask = np.zeros(self.row_count, dtype=bool)
+        if len(self.keys) == 0:
+            return row_mask
+        per_row = np.repeat(np.asarray(key_mask, dtype=bool), self.counts())
+        row_mask[self.order] = per_row
+        return row_mask
+
+
+class FrameParticleIndex:
+    """Per-frame x/y position lookup used for drawing annotations and hit-testing."""
+
+    def __init__(self, df: pd.DataFrame):
+        """
+        Build the index from a particle table with frame, x and y columns.
+
+        Parameters
+        ----------
+        df : pd.DataFrame
+            Particle table.
+        """
+        self.data = df
+        self.rows = GroupedRowIndex(df, "frame")
+        if len(self.rows):
+            # Positions stored in frame order so each frame is a contiguous slice
+            # (keeping the table's dtype, float32 in compact mode)
+            self._x = df["x"].to_numpy()[self.rows.order]
+            self._y = df["y"].to_numpy()[self.rows.order]
+        else:
+            self._x = np.empty(0)
+            self._y = np.empty(0)
+
+    def positions(self, frame: int):
+        """
+        Particle positions in a frame.
+
+        Parameters
+        ----------
+        frame : int
+            Frame number.
+
+        Returns
+        -------
+        tuple of np.ndarray
+            (x, y) arrays (views into the index, do not modify).
+        """
+        start, end = self.rows._span(frame)
+        return self._x[start:end], self._y[start:end]
+
+    def nearest(self, frame: int, x: float, y: float, max_distance: float):
+        """
+        Find the particle nearest to a point in a frame.
+
+        Parameters
+        ----------
+        frame : int
+            Frame number.
+        x, y : float
+            Query point in image coordinates.
+        max_distance : float
+            Maximum accepted distance in pixels.
+
+        Returns
+        -------
+        dict or None
+            Row of the nearest particle as a dict, or None if none is within range.
+        """
+        start, end = self.rows._span(frame)
+        if start == end:
+            return None
+        dist_sq = (self._x[start:end] - x) ** 2 + (self._y[start:end] - y) ** 2
+        best = int(np.argmin(dist_sq))
+        if float(dist_sq[best]) > max_distance * max_distance:
+            return None
+        return self.data.iloc[int(self.rows.order[start + best])].to_dict()
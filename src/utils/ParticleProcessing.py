@@ -3,6 +3,8 @@ Particle Processing Module
 
 Description: Combined particle detection, tracking, and processing functions.
              Includes TrackPy wrapper functions and particle processing workflows.
+             trackpy is imported inside the wrappers that use it, so importing this
+             module (e.g. while the GUI starts) does not load it.
 
 Copyright (c) 2025, Jacqueline Reynaga, Kevin Pillsbury, Bakir Husremovic
 License: BSD 3-Clause License
@@ -10,18 +12,72 @@ Date: 2025-12-08
 """
 
 import cv2
+import functools
 import os
+import threading
+from collections import OrderedDict
 import json
 import numpy as np
 import pandas as pd
-import trackpy as tp
-import pims
-import matplotlib.pyplot as plt
 from .FileController import FileController
+from .Instrumentation import instrumentation
+from .DetectionChunks import (
+    DEFAULT_CHUNK_ROWS,
+    DetectionChunkWriter,
+    read_detection_chunks,
+    remove_detection_chunks,
+)
+from .FrameStore import (
+    PYRAMID_FACTORS,
+    clear_frame_size_cache,
+    load_frame_level,
+    save_frame_pyramid,
+)
+from .ParticleTable import read_particle_csv, restore_dtypes
+from .TiledDetection import TiledLocator
+from .Background import FrameBackground, remove_background, subtract_background
+from .RegionMask import build_region_mask, locate_in_regions, parse_regions, region_boxes
+from .ThresholdingUtils import (
+    frame_histograms,
+    gray_histogram,
+    percentile_from_histogram,
+    threshold_gray,
+)
 
 # Initialize file controller (will be set by main application)
 file_controller = None
 
+# Frames the drift estimate is smoothed over (GUI and headless pipeline)
+DRIFT_SMOOTHING = 15
+
+# Detection projects its final table size from this many frames
+MEMORY_CHECK_FRAMES = 10
+DETECTION_MEMORY_SUGGESTION = (
+    "Detect a shorter frame range or every Nth frame, or enable compact mode "
+    "([Data] compact_mode = true)."
+)
+# Without a chunk folder every per-frame table is kept until pd.concat copies them
+# all once more; streamed detection only holds one chunk besides the final table
+IN_MEMORY_DETECTION_FACTOR = 2
+LINKING_MEMORY_SUGGESTION = (
+    "Tighten the filters or link a shorter frame range; the headless pipeline "
+    "(run_pipeline.py --stages link,drift) links only the filtered particles."
+)
+# trackpy.link_df copies the table and adds working columns
+LINKING_MEMORY_FACTOR = 3
+
+# Annotation colors of the original frames, keyed by (frames_folder, frame_number,
+# invert) and persisted next to the frames
+ANNOTATION_COLORS_FILE = "annotation_colors.json"
+_annotation_color_cache = {}
+_annotation_color_folders_loaded = set()
+# Colors of transformed views (greyscale, threshold), keyed by (frames_folder,
+# frame_number, invert, view_key); one entry per slider value, so kept as a capped LRU
+VIEW_ANNOTATION_COLOR_ENTRIES = 512
+_view_annotation_color_cache = OrderedDict()
+# The playback thread and the GUI thread both fill the caches
+_annotation_color_lock = threading.Lock()
+
 
 def set_file_controller(controller):
     """
@@ -67,6 +123,8 @@ def locate_particles(frame, feature_size=15, min_mass=100, invert=False, thresho
     pandas.DataFrame
         A DataFrame with the coordinates and other properties of the located particles.
     """
+    import trackpy as tp
+
     located_features = tp.locate(
         frame,
         diameter=feature_size,
@@ -82,10 +140,201 @@ def locate_particles(frame, feature_size=15, min_mass=100, invert=False, thresho
 # =============================================================================
 
 
-def find_particles_in_frames(image_paths, params=None, progress_callback=None, cancel_check=None):
+def _iter_frame_particles(
+    image_paths, params, progress_callback, cancel_check, memory_factor, tile_workers=None
+):
+    """
+    Locate particles frame by frame.
+
+    Yields each frame's particle table (with its frame column), or None once
+    ``cancel_check`` asks to stop. With regions of interest in ``params["roi"]``
+    only the crops around them are searched and particles outside them are dropped.
+    Frames (or crops) large enough for ``params["tiling"]`` are located in parallel
+    tiles with ``tile_workers`` processes. With ``params["background"]`` set, the
+    stored median background is subtracted from each frame first.
+    After MEMORY_CHECK_FRAMES frames the final table size is projected and checked
+    against the memory budget (times ``memory_factor`` for the copies the caller
+    keeps).
+    """
+    if params is None:
+        params = get_detection_params()
+    feature_size = int(params.get("feature_size", 15))
+    min_mass = float(params.get("min_mass", 100.0))
+    invert = bool(params.get("invert", False))
+    threshold = float(params.get("threshold", 0.0))
+
+    if feature_size % 2 == 0:
+        feature_size += 1
+
+    background = None
+    background_mode = params.get("background", "off")
+    if background_mode != "off" and image_paths:
+        background = FrameBackground.load(
+            os.path.dirname(image_paths[0]),
+            background_mode,
+            params.get("background_window"),
+        )
+        if background is None:
+            print(
+                "Warning: Background subtraction is on but no matching background has "
+                "been computed; detecting without it."
+            )
+
+    regions = parse_regions(params.get("roi"))
+    # frame shape -> (mask, crop boxes); frames of a movie share one shape
+    region_cache = {}
+
+    # Large frames (and large region crops) are split into tiles located in parallel
+    locator = TiledLocator(
+        functools.partial(
+            locate_particles,
+            feature_size=feature_size,
+            min_mass=min_mass,
+            invert=invert,
+            threshold=threshold,
+        ),
+        feature_size,
+        workers=tile_workers,
+        mode=params.get("tiling", "auto"),
+    )
+    locate = locator.locate
+
+    sample_bytes = 0
+    frames_done = 0
+
+    try:
+        for image_path in image_paths:
+            if cancel_check and cancel_check():
+                if progress_callback:
+                    progress_callback.emit("Cancelled.")
+                yield None
+                return
+
+            basename = os.path.basename(image_path)
+            name_part = os.path.splitext(basename)[0]
+            frame_number_str = name_part.split("_")[-1]
+            frame_number = int(frame_number_str)
+
+            if progress_callback:
+                progress_callback.emit(f"Processing Frame {frame_number}")
+
+            image = cv2.imread(image_path)
+            if image is None:
+                continue
+
+            gray_image = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+            if background is not None:
+                frame_background = background.for_frame(frame_number)
+                if frame_background is not None and frame_background.shape == gray_image.shape:
+                    gray_image = subtract_background(gray_image, frame_background, invert)
+
+            if regions:
+                if gray_image.shape not in region_cache:
+                    region_cache[gray_image.shape] = (
+                        build_region_mask(regions, gray_image.shape),
+                        region_boxes(regions, gray_image.shape, margin=feature_size),
+                    )
+                mask, boxes = region_cache[gray_image.shape]
+                features = locate_in_regions(gray_image, locate, mask, boxes)
+                instrumentation.count(
+                    "searched pixels", sum((x1 - x0) * (y1 - y0) for x0, y0, x1, y1 in boxes)
+                )
+            else:
+                features = locate(gray_image)
+            features["frame"] = frame_number
+            instrumentation.count("frames")
+            instrumentation.count("particles", len(features))
+
+            frames_done += 1
+            sample_bytes += features.memory_usage(index=True).sum()
+            if frames_done == MEMORY_CHECK_FRAMES and len(image_paths) > MEMORY_CHECK_FRAMES:
+                projected = sample_bytes / frames_done * len(image_paths) * memory_factor
+                instrumentation.check_memory(projected, DETECTION_MEMORY_SUGGESTION)
+
+            yield features
+    finally:
+        locator.close()
+
+
+def stream_particles_to_chunks(
+    image_paths,
+    chunk_folder,
+    params=None,
+    progress_callback=None,
+    cancel_check=None,
+    chunk_rows=DEFAULT_CHUNK_ROWS,
+    tile_workers=None,
+):
+    """
+    Finds particles in a series of images and streams them into chunk files.
+
+    Only one chunk of results is held in memory at a time. The chunks stay in
+    ``chunk_folder`` for ``read_detection_chunks``; after a cancel their manifest is
+    marked incomplete and the chunks of the frames already processed are left in place
+    for the caller to assemble or remove.
+
+    Parameters
+    ----------
+    image_paths : list of str
+        The paths to the image files.
+    chunk_folder : str
+        Folder for the chunk files (replaced if it exists).
+    params : dict, optional
+        Detection parameters.
+    progress_callback : Signal, optional
+        A signal to emit progress updates.
+    cancel_check : callable, optional
+        If provided, called before each frame; return True to stop early.
+    chunk_rows : int, optional
+        Rows buffered before a chunk is written.
+    tile_workers : int, optional
+        Processes for tiled detection of large frames. Defaults to the CPU count.
+
+    Returns
+    -------
+    int or None
+        Number of particles written, or None if detection was cancelled.
+    """
+    writer = DetectionChunkWriter(chunk_folder, chunk_rows)
+    for features in _iter_frame_particles(
+        image_paths,
+        params,
+        progress_callback,
+        cancel_check,
+        memory_factor=1,
+        tile_workers=tile_workers,
+    ):
+        if features is None:
+            writer.close(complete=False)
+            print(
+                f"Detection cancelled: {writer.rows} particles from {writer.frames} "
+                f"frames left in {chunk_folder}"
+            )
+            return None
+        writer.append(features)
+    writer.close()
+    instrumentation.count("chunks", len(writer.chunks))
+    return writer.rows
+
+
+@instrumentation.timed("detect particles")
+def find_particles_in_frames(
+    image_paths,
+    params=None,
+    progress_callback=None,
+    cancel_check=None,
+    chunk_folder=None,
+    chunk_rows=DEFAULT_CHUNK_ROWS,
+    tile_workers=None,
+):
     """
     Finds particles in a series of images and returns the data.
 
+    With ``chunk_folder`` the results are streamed through chunk files there
+    (``stream_particles_to_chunks``) and the final table is assembled from them, so
+    memory holds one chunk instead of every frame's table. A finished run removes
+    the chunks; a cancelled run keeps them.
+
     Parameters
     ----------
     image_paths : list of str
@@ -96,6 +345,12 @@ def find_particles_in_frames(image_paths, params=None, progress_callback=None, c
         A signal to emit progress updates.
     cancel_check : callable, optional
         If provided, called before each frame; return True to stop early.
+    chunk_folder : str, optional
+        Folder for streamed chunks. Defaults to None (results kept in memory).
+    chunk_rows : int, optional
+        Rows buffered before a chunk is written.
+    tile_workers : int, optional
+        Processes for tiled detection of large frames. Defaults to the CPU count.
 
     Returns
     -------
@@ -103,59 +358,208 @@ def find_particles_in_frames(image_paths, params=None, progress_callback=None, c
         A DataFrame containing the found particles, an empty DataFrame if none
         were found, or None if detection was cancelled.
     """
-    if params is None:
-        params = get_detection_params()
-    feature_size = int(params.get("feature_size", 15))
-    min_mass = float(params.get("min_mass", 100.0))
-    invert = bool(params.get("invert", False))
-    threshold = float(params.get("threshold", 0.0))
+    if chunk_folder is not None:
+        rows = stream_particles_to_chunks(
+            image_paths,
+            chunk_folder,
+            params,
+            progress_callback,
+            cancel_check,
+            chunk_rows,
+            tile_workers,
+        )
+        if rows is None:
+            return None
+        if rows == 0:
+            remove_detection_chunks(chunk_folder)
+            if progress_callback:
+                progress_callback.emit("No particles found.")
+            return pd.DataFrame()
+        with instrumentation.stage("assemble chunks", rows=rows):
+            combined_features = read_detection_chunks(chunk_folder)
+        remove_detection_chunks(chunk_folder)
+    else:
+        all_features = []
+        for features in _iter_frame_particles(
+            image_paths,
+            params,
+            progress_callback,
+            cancel_check,
+            memory_factor=IN_MEMORY_DETECTION_FACTOR,
+            tile_workers=tile_workers,
+        ):
+            if features is None:
+                return None
+            all_features.append(features)
+
+        if not all_features:
+            if progress_callback:
+                progress_callback.emit("No particles found.")
+            return pd.DataFrame()
 
-    if feature_size % 2 == 0:
-        feature_size += 1
+        with instrumentation.stage("concat", tables=len(all_features)):
+            combined_features = pd.concat(all_features, ignore_index=True)
 
-    all_features = []
+    if progress_callback:
+        progress_callback.emit("Done.")
 
-    for image_path in image_paths:
-        if cancel_check and cancel_check():
-            if progress_callback:
-                progress_callback.emit("Cancelled.")
+    return combined_features
+
+
+@instrumentation.timed("extract frames")
+def extract_video_frames(video_path, frames_folder, progress_callback=None):
+    """
+    Extract every frame of a video to JPEG files, with their pyramid levels and
+    annotation colors.
+
+    Parameters
+    ----------
+    video_path : str
+        Video file to read.
+    frames_folder : str
+        Output folder for frame_XXXXX.jpg files.
+    progress_callback : callable, optional
+        Called with the number of frames written so far, every 100 frames.
+
+    Returns
+    -------
+    int or None
+        Number of frames written, or None if the video could not be opened.
+    """
+    clear_frame_size_cache(frames_folder)
+    clear_annotation_color_cache(frames_folder)
+    remove_background(frames_folder)
+    frame_histograms.clear()
+    cap = cv2.VideoCapture(video_path)
+    try:
+        if not cap.isOpened():
             return None
 
-        basename = os.path.basename(image_path)
-        name_part = os.path.splitext(basename)[0]
-        frame_number_str = name_part.split("_")[-1]
-        frame_number = int(frame_number_str)
+        os.makedirs(frames_folder, exist_ok=True)
+        frame_idx = 0
+        while True:
+            ret, frame = cap.read()
+            if not ret:
+                break
+
+            frame_path = os.path.join(frames_folder, f"frame_{frame_idx:05d}.jpg")
+            cv2.imwrite(frame_path, frame)
+            levels = save_frame_pyramid(frame, frames_folder, frame_idx)
+            precompute_annotation_colors(
+                frames_folder, frame_idx, levels.get(PYRAMID_FACTORS[-1], frame)
+            )
+            frame_idx += 1
+            instrumentation.count("frames")
+            if progress_callback and frame_idx % 100 == 0:
+                progress_callback(frame_idx)
 
-        if progress_callback:
-            progress_callback.emit(f"Processing Frame {frame_number}")
+        save_annotation_colors(frames_folder)
+        return frame_idx
+    finally:
+        cap.release()
 
-        image = cv2.imread(image_path)
-        if image is None:
-            continue
 
-        gray_image = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+# =============================================================================
+# LINKING FUNCTIONS
+# =============================================================================
 
-        features = locate_particles(
-            gray_image,
-            feature_size=feature_size,
-            min_mass=min_mass,
-            invert=invert,
-            threshold=threshold,
-        )
-        features["frame"] = frame_number
-        all_features.append(features)
 
-    if not all_features:
-        if progress_callback:
-            progress_callback.emit("No particles found.")
-        return pd.DataFrame()
+def link_trajectories(particles, search_range, memory, min_trajectory_length):
+    """
+    Link particles into trajectories and drop short trajectories.
 
-    combined_features = pd.concat(all_features, ignore_index=True)
+    Parameters
+    ----------
+    particles : pandas.DataFrame
+        Detected particles with frame, x and y columns.
+    search_range : float
+        Maximum distance a particle can move between frames.
+    memory : int
+        Number of frames a particle can disappear for and still be linked.
+    min_trajectory_length : int
+        Trajectories with fewer detections are removed.
 
-    if progress_callback:
-        progress_callback.emit("Done.")
+    Returns
+    -------
+    pandas.DataFrame
+        Linked trajectories with a particle column.
+    """
+    import trackpy as tp
 
-    return combined_features
+    check_linking_memory(particles)
+    with instrumentation.stage("link_df", particles=len(particles)):
+        trajectories = tp.link_df(particles, search_range=search_range, memory=memory)
+    with instrumentation.stage("filter_stubs") as stage:
+        trajectories = tp.filter_stubs(trajectories, min_trajectory_length)
+        stage.add("trajectories", int(trajectories["particle"].nunique()))
+    return trajectories
+
+
+def check_linking_memory(particles):
+    """
+    Warn if linking ``particles`` is projected to exceed the memory budget.
+
+    Parameters
+    ----------
+    particles : pandas.DataFrame
+        Particles about to be linked.
+
+    Returns
+    -------
+    str or None
+        The warning, if any.
+    """
+    projected = particles.memory_usage(index=True).sum() * LINKING_MEMORY_FACTOR
+    return instrumentation.check_memory(projected, LINKING_MEMORY_SUGGESTION)
+
+
+@instrumentation.timed("compute_drift")
+def compute_drift_table(trajectories, smoothing=DRIFT_SMOOTHING, scaling=1.0):
+    """
+    Compute per-frame drift from linked trajectories (trackpy format).
+
+    Parameters
+    ----------
+    trajectories : pandas.DataFrame
+        Linked trajectories.
+    smoothing : int, optional
+        Frames to smooth the drift over.
+    scaling : float, optional
+        Factor applied to the drift (microns per pixel).
+
+    Returns
+    -------
+    pandas.DataFrame
+        Drift indexed by frame with x and y columns.
+    """
+    import trackpy as tp
+
+    return tp.compute_drift(trajectories.copy(), smoothing=smoothing) * scaling
+
+
+@instrumentation.timed("subtract_drift")
+def subtract_drift(trajectories, drift):
+    """
+    Return a copy of trajectories with drift subtracted.
+
+    Parameters
+    ----------
+    trajectories : pandas.DataFrame
+        Linked trajectories.
+    drift : pandas.DataFrame
+        Drift from ``compute_drift_table``.
+
+    Returns
+    -------
+    pandas.DataFrame
+        Drift-corrected trajectories with a fresh index.
+    """
+    import trackpy as tp
+
+    corrected = tp.subtract_drift(trajectories.copy(), drift)
+    # Subtracting the float64 drift table would upcast compact float32 positions
+    corrected = restore_dtypes(corrected, trajectories)
+    return corrected.reset_index(drop=True)
 
 
 def _process_errant_particle(
@@ -210,7 +614,7 @@ def _process_errant_particle(
     # Get invert setting and calculate optimal cross color using the original full frame
     # This matches the color used for annotation circles on the full frame
     invert = _get_invert_setting()
-    cross_color = calculate_optimal_annotation_color(image_to_crop, invert)
+    cross_color = get_frame_annotation_color(frame_num, invert, image=image_to_crop)
 
     cv2.line(
         particle_image,
@@ -251,6 +655,7 @@ def _process_errant_particle(
     return particle_info
 
 
+@instrumentation.timed("errant particle crops")
 def save_errant_particle_crops_for_frame(params):
     """
     Saves cropped images of the 10 most errant particles across ALL frames.
@@ -317,22 +722,20 @@ def save_errant_particle_crops_for_frame(params):
         json.dump(errant_particles_data, f, indent=4)
 
 
-def _threshold_single_gray(gray, threshold_percent):
+def _threshold_single_gray(gray, threshold_percent, cache_key=None):
     """
     Percentile threshold on one grayscale image (same logic as RB errant overlays).
 
+    The percentile comes from the image's cached 256-bin histogram, so repeated calls
+    with the same ``cache_key`` do not rescan the pixels to find it.
+
     Returns a single-channel image with white background and dark particles.
     """
-    percentile = 100 - threshold_percent
-    threshold_val = np.percentile(gray.flatten(), percentile)
-    _, thresh = cv2.threshold(gray, threshold_val, 255, cv2.THRESH_BINARY_INV)
-    if np.sum(thresh == 255) < (thresh.size * 0.5):
-        thresh = cv2.bitwise_not(thresh)
-    return thresh
+    return threshold_gray(gray, threshold_percent, frame_histograms.get(cache_key, gray))
 
 
 def apply_frame_view_processing(
-    image_bgr, greyscale=False, threshold_enabled=False, threshold_percent=50
+    image_bgr, greyscale=False, threshold_enabled=False, threshold_percent=50, cache_key=None
 ):
     """
     Apply display-only view transforms for the interactive frame viewer.
@@ -347,28 +750,32 @@ def apply_frame_view_processing(
         Apply percentile threshold preview.
     threshold_percent : float
         0–100 slider value (higher = more pixels treated as background).
+    cache_key : hashable, optional
+        Identity of ``image_bgr`` (e.g. frame number and pyramid level) used to reuse
+        its grayscale histogram across threshold changes.
 
     Returns
     -------
     np.ndarray
-        Processed BGR image.
+        Processed BGR image. When no transform is enabled the input is returned as-is
+        (annotations are drawn as overlays, so callers do not modify it).
     """
     if image_bgr is None or image_bgr.size == 0:
         return image_bgr
 
     if threshold_enabled:
         gray = cv2.cvtColor(image_bgr, cv2.COLOR_BGR2GRAY)
-        thresh = _threshold_single_gray(gray, threshold_percent)
+        thresh = _threshold_single_gray(gray, threshold_percent, cache_key)
         return cv2.cvtColor(thresh, cv2.COLOR_GRAY2BGR)
 
     if greyscale:
         gray = cv2.cvtColor(image_bgr, cv2.COLOR_BGR2GRAY)
         return cv2.cvtColor(gray, cv2.COLOR_GRAY2BGR)
 
-    return image_bgr.copy()
+    return image_bgr
 
 
-def _apply_thresholding(gray1, gray2, threshold_percent, invert):
+def _apply_thresholding(gray1, gray2, threshold_percent, invert, cache_keys=None):
     """
     Apply thresholding to two grayscale images.
 
@@ -380,14 +787,17 @@ def _apply_thresholding(gray1, gray2, threshold_percent, invert):
         Threshold percentage (0-100)
     invert : bool
         Whether particles are bright on dark background
+    cache_keys : tuple, optional
+        (key1, key2) identities of the two images for histogram reuse
 
     Returns
     -------
     tuple
         (thresh1, thresh2) thresholded images with white background and dark particles
     """
-    thresh1 = _threshold_single_gray(gray1, threshold_percent)
-    thresh2 = _threshold_single_gray(gray2, threshold_percent)
+    key1, key2 = cache_keys if cache_keys else (None, None)
+    thresh1 = _threshold_single_gray(gray1, threshold_percent, key1)
+    thresh2 = _threshold_single_gray(gray2, threshold_percent, key2)
     return thresh1, thresh2
 
 
@@ -410,7 +820,7 @@ def _get_invert_setting():
     return False
 
 
-def calculate_optimal_annotation_color(image, invert=False):
+def calculate_optimal_annotation_color(image, invert=False, max_pixels=250_000):
     """
     Calculate the optimal annotation color for maximum contrast with the video background.
 
@@ -420,6 +830,9 @@ def calculate_optimal_annotation_color(image, invert=False):
         The video frame image in BGR format.
     invert : bool, optional
         Whether particles are dark on bright background. Defaults to False.
+    max_pixels : int, optional
+        Larger images are estimated from a regular pixel subsample of about this size.
+        The background statistics are percentiles and medians, so the estimate is stable.
 
     Returns
     -------
@@ -430,6 +843,11 @@ def calculate_optimal_annotation_color(image, invert=False):
         # Default to yellow if image is invalid
         return (0, 255, 255)
 
+    height, width = image.shape[:2]
+    step = int(np.sqrt(height * width / max_pixels)) if max_pixels else 0
+    if step > 1:
+        image = np.ascontiguousarray(image[::step, ::step])
+
     # Convert to grayscale for brightness analysis
     gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
 
@@ -439,12 +857,12 @@ def calculate_optimal_annotation_color(image, invert=False):
     if invert:
         # Background is bright - find the brightest regions
         # Use 90th percentile to avoid outliers
-        brightness_threshold = np.percentile(gray.flatten(), 90)
+        brightness_threshold = percentile_from_histogram(gray_histogram(gray), 90)
         background_mask = gray >= brightness_threshold
     else:
         # Background is dark - find the darkest regions
         # Use 10th percentile to avoid outliers
-        brightness_threshold = np.percentile(gray.flatten(), 10)
+        brightness_threshold = percentile_from_histogram(gray_histogram(gray), 10)
         background_mask = gray <= brightness_threshold
 
     # Extract background colors from original BGR image
@@ -511,6 +929,172 @@ def calculate_optimal_annotation_color(image, invert=False):
     return tuple(annotation_color)
 
 
+def _load_annotation_colors(frames_folder):
+    """Load precomputed annotation colors saved alongside the frames (once per folder)."""
+    if frames_folder in _annotation_color_folders_loaded:
+        return
+    _annotation_color_folders_loaded.add(frames_folder)
+    colors_path = os.path.join(frames_folder, ANNOTATION_COLORS_FILE)
+    if not os.path.exists(colors_path):
+        return
+    try:
+        with open(colors_path, "r") as f:
+            saved = json.load(f)
+        loaded = {}
+        for key, color in saved.items():
+            frame_number, invert = key.split(":")
+            loaded[(frames_folder, int(frame_number), invert == "1")] = tuple(
+                int(c) for c in color
+            )
+        with _annotation_color_lock:
+            _annotation_color_cache.update(loaded)
+    except (OSError, ValueError) as e:
+        print(f"Warning: Could not load annotation colors from {colors_path}: {e}")
+
+
+def get_frame_annotation_color(
+    frame_number, invert=None, image=None, frames_folder=None, view_key=None
+):
+    """
+    Get the annotation color for a frame, computing it at most once per (frame, invert).
+
+    Parameters
+    ----------
+    frame_number : int
+        Frame the color is for.
+    invert : bool, optional
+        Whether particles are dark on bright background. Defaults to the detection setting.
+    image : numpy array, optional
+        The frame (any pyramid level) in BGR format. If omitted on a cache miss, the
+        smallest pyramid level is loaded.
+    frames_folder : str, optional
+        Folder holding the frames. Defaults to the file controller's frames folder.
+    view_key : hashable, optional
+        Identifies a display transform (greyscale, threshold) applied to ``image``.
+        None means the original frame. Colors of transformed views are kept in an
+        LRU of VIEW_ANNOTATION_COLOR_ENTRIES entries and are not saved.
+
+    Returns
+    -------
+    tuple
+        BGR color tuple (B, G, R).
+    """
+    if invert is None:
+        invert = _get_invert_setting()
+    if frames_folder is None:
+        frames_folder = file_controller.original_frames_folder if file_controller else ""
+    _load_annotation_colors(frames_folder)
+
+    key = (frames_folder, int(frame_number), bool(invert))
+    with _annotation_color_lock:
+        if view_key is None:
+            color = _annotation_color_cache.get(key)
+        else:
+            key = key + (view_key,)
+            color = _view_annotation_color_cache.get(key)
+            if color is not None:
+                _view_annotation_color_cache.move_to_end(key)
+    if color is not None:
+        return color
+
+    if image is None and frames_folder:
+        image = load_frame_level(frames_folder, int(frame_number), PYRAMID_FACTORS[-1])
+    color = calculate_optimal_annotation_color(image, invert)
+    with _annotation_color_lock:
+        if view_key is None:
+            _annotation_color_cache[key] = color
+        else:
+            _view_annotation_color_cache[key] = color
+            if len(_view_annotation_color_cache) > VIEW_ANNOTATION_COLOR_ENTRIES:
+                _view_annotation_color_cache.popitem(last=False)
+    return color
+
+
+def precompute_annotation_colors(frames_folder, frame_number, image):
+    """
+    Compute and memoize both invert variants of a frame's annotation color (used at ingest).
+
+    Parameters
+    ----------
+    frames_folder : str
+        Folder holding the frames.
+    frame_number : int
+        Frame the image belongs to.
+    image : numpy array
+        The frame (any pyramid level) in BGR format.
+
+    Returns
+    -------
+    None
+    """
+    _annotation_color_folders_loaded.add(frames_folder)
+    colors = {
+        (frames_folder, int(frame_number), invert): calculate_optimal_annotation_color(
+            image, invert
+        )
+        for invert in (False, True)
+    }
+    with _annotation_color_lock:
+        _annotation_color_cache.update(colors)
+
+
+def save_annotation_colors(frames_folder):
+    """
+    Persist the memoized annotation colors of a frames folder next to the frames.
+
+    Parameters
+    ----------
+    frames_folder : str
+        Folder holding the frames.
+
+    Returns
+    -------
+    None
+    """
+    with _annotation_color_lock:
+        # Snapshot: other threads may add colors while the file is written
+        colors = list(_annotation_color_cache.items())
+    saved = {
+        f"{frame_number}:{int(invert)}": list(color)
+        for (folder, frame_number, invert), color in colors
+        if folder == frames_folder
+    }
+    colors_path = os.path.join(frames_folder, ANNOTATION_COLORS_FILE)
+    try:
+        with open(colors_path, "w") as f:
+            json.dump(saved, f)
+    except OSError as e:
+        print(f"Warning: Could not save annotation colors to {colors_path}: {e}")
+
+
+def clear_annotation_color_cache(frames_folder=None):
+    """
+    Forget memoized annotation colors (call after re-extracting frames).
+
+    Parameters
+    ----------
+    frames_folder : str, optional
+        Folder to forget. If None, clears every folder.
+
+    Returns
+    -------
+    None
+    """
+    with _annotation_color_lock:
+        if frames_folder is None:
+            _annotation_color_cache.clear()
+            _view_annotation_color_cache.clear()
+            _annotation_color_folders_loaded.clear()
+            return
+        for cache in (_annotation_color_cache, _view_annotation_color_cache):
+            for key in [k for k in cache if k[0] == frames_folder]:
+                del cache[key]
+        _annotation_color_folders_loaded.add(frames_folder)
+    colors_path = os.path.join(frames_folder, ANNOTATION_COLORS_FILE)
+    if os.path.exists(colors_path):
+        os.remove(colors_path)
+
+
 def _create_rb_overlay_from_thresholds(thresh1, thresh2, height, width):
     """
     Create red-blue overlay from thresholded images.
@@ -552,7 +1136,7 @@ def _create_rb_overlay_from_thresholds(thresh1, thresh2, height, width):
     return cv2.cvtColor(rb_overlay, cv2.COLOR_BGR2RGB)
 
 
-def create_full_frame_rb_overlay(frame1, frame2, threshold_percent=50):
+def create_full_frame_rb_overlay(frame1, frame2, threshold_percent=50, cache_keys=None):
     """
     Create a full-frame red-blue overlay image from two frames.
 
@@ -565,6 +1149,8 @@ def create_full_frame_rb_overlay(frame1, frame2, threshold_percent=50):
     threshold_percent : float
         Threshold percentage (0-100). For dark background, this is the percentage of
         brightest pixels that become the dark color (red/blue)
+    cache_keys : tuple, optional
+        (key1, key2) identities of the two frames for histogram reuse
 
     Returns
     -------
@@ -584,13 +1170,15 @@ def create_full_frame_rb_overlay(frame1, frame2, threshold_percent=50):
 
     # Apply thresholding
     invert = _get_invert_setting()
-    thresh1, thresh2 = _apply_thresholding(gray1, gray2, threshold_percent, invert)
+    thresh1, thresh2 = _apply_thresholding(gray1, gray2, threshold_percent, invert, cache_keys)
 
     # Create RB overlay
     return _create_rb_overlay_from_thresholds(thresh1, thresh2, height, width)
 
 
-def create_rb_overlay_image(crop1, crop2, x1, y1, x2, y2, threshold_percent=50, crop_size=200):
+def create_rb_overlay_image(
+    crop1, crop2, x1, y1, x2, y2, threshold_percent=50, crop_size=200, cache_keys=None
+):
     """
     Create a red-blue overlay image from two cropped frames.
 
@@ -609,6 +1197,8 @@ def create_rb_overlay_image(crop1, crop2, x1, y1, x2, y2, threshold_percent=50,
         brightest pixels that become the dark color (red/blue)
     crop_size : int
         Size of the crop (will be used to resize if crops are different sizes)
+    cache_keys : tuple, optional
+        (key1, key2) identities of the two crops for histogram reuse
 
     Returns
     -------
@@ -628,7 +1218,7 @@ def create_rb_overlay_image(crop1, crop2, x1, y1, x2, y2, threshold_percent=50,
 
     # Apply thresholding
     invert = _get_invert_setting()
-    thresh1, thresh2 = _apply_thresholding(gray1, gray2, threshold_percent, invert)
+    thresh1, thresh2 = _apply_thresholding(gray1, gray2, threshold_percent, invert, cache_keys)
 
     # Create RB overlay
     rb_overlay_rgb = _create_rb_overlay_from_thresholds(thresh1, thresh2, crop_size, crop_size)
@@ -650,6 +1240,7 @@ def create_rb_overlay_image(crop1, crop2, x1, y1, x2, y2, threshold_percent=50,
     return rb_overlay_rgb
 
 
+@instrumentation.timed("RB gallery")
 def create_errant_distance_links_gallery(
     trajectories_file,
     frames_folder=None,
@@ -699,7 +1290,8 @@ def create_errant_distance_links_gallery(
 
     # Load trajectory data
     try:
-        trajectories = pd.read_csv(trajectories_file)
+        file_controller.wait_for_write(trajectories_file)
+        trajectories = read_particle_csv(trajectories_file)
     except Exception as e:
         print(f"Error loading trajectories: {e}")
         return
@@ -860,7 +1452,7 @@ def annotate_frame(
 
         # Get invert setting and calculate optimal annotation color
         invert = _get_invert_setting()
-        annotation_color = calculate_optimal_annotation_color(image, invert)
+        annotation_color = get_frame_annotation_color(frame_number, invert, image=image)
 
         for _, particle in frame_particles.iterrows():
             cv2.circle(
@@ -928,6 +1520,7 @@ def annotate_memory_link_frame(image, start_pos, end_pos, crop_origin):
     return image
 
 
+@instrumentation.timed("memory-link crops")
 def find_and_save_high_memory_links(trajectories_file, memory_parameter, max_links=5):
     """
     Finds the highest memory links, saves padded and annotated cropped frames,
@@ -952,7 +1545,10 @@ def find_and_save_high_memory_links(trajectories_file, memory_parameter, max_lin
         return []
 
     try:
-        trajectories = pd.read_csv(trajectories_file)
+        file_controller.wait_for_write(trajectories_file)
+        trajectories = read_particle_csv(
+            trajectories_file, columns=["particle", "frame", "x", "y"]
+        )
     except Exception as e:
         print(f"Error loading trajectories: {e}")
         return []
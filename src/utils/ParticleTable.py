@@ -0,0 +1,193 @@
+"""
+Particle Table Module
+
+Description: Schema-aware reading of particle and trajectory CSV files. The trackpy
+             column set is parsed with explicit dtypes instead of per-column type
+             inference, with the multithreaded pyarrow parser when it is installed.
+
+             Compact mode stores the float columns as float32 and frame/particle ids
+             as int32, halving the memory of each table copy. float32 keeps a relative
+             precision of 2**-24 (about 6e-8): positions below 8192 px are exact to
+             better than 0.001 px, which is well under trackpy's sub-pixel accuracy.
+             Ids are exact; id columns that do not fit in int32 stay int64.
+
+Copyright (c) 2025, Jacqueline Reynaga, Kevin Pillsbury, Bakir Husremovic
+License: BSD 3-Clause License
+Date: 2025-12-08
+"""
+
+import os
+import time
+from typing import List, Optional
+
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow  # noqa: F401
+
+    CSV_ENGINE = "pyarrow"
+except ImportError:
+    CSV_ENGINE = "c"
+
+# Known trackpy columns and their full-precision dtypes
+FLOAT_COLUMNS = ("x", "y", "mass", "size", "ecc", "signal", "raw_mass", "ep")
+ID_COLUMNS = ("frame", "particle")
+
+_INT32_MIN = np.iinfo(np.int32).min
+_INT32_MAX = np.iinfo(np.int32).max
+
+# Tables smaller than this are not worth reporting parse throughput for
+_REPORT_MIN_BYTES = 10 * 1024 * 1024
+
+
+def particle_dtypes(columns, compact=False):
+    """
+    Explicit dtypes for the known trackpy columns among ``columns``.
+
+    Parameters
+    ----------
+    columns : iterable of str
+        Column names present in the file.
+    compact : bool, optional
+        Use float32/int32 instead of float64/int64.
+
+    Returns
+    -------
+    dict
+        Mapping of column name -> numpy dtype. Unknown columns are left out (inferred).
+    """
+    float_dtype = np.float32 if compact else np.float64
+    int_dtype = np.int32 if compact else np.int64
+    dtypes = {}
+    for col in columns:
+        if col in FLOAT_COLUMNS:
+            dtypes[col] = float_dtype
+        elif col in ID_COLUMNS:
+            dtypes[col] = int_dtype
+    return dtypes
+
+
+def read_particle_csv(
+    path: str, columns: Optional[List[str]] = None, compact: bool = False
+) -> pd.DataFrame:
+    """
+    Read a particle or trajectory CSV with explicit dtypes.
+
+    Parameters
+    ----------
+    path : str
+        CSV file to read.
+    columns : List[str], optional
+        Only read these columns (ones missing from the file are ignored).
+    compact : bool, optional
+        Read the trackpy columns as float32/int32.
+
+    Returns
+    -------
+    pd.DataFrame
+        Loaded table.
+
+    Raises
+    ------
+    pd.errors.EmptyDataError
+        If the file has no columns.
+    """
+    header = pd.read_csv(path, nrows=0).columns.tolist()
+    usecols = header if columns is None else [col for col in header if col in set(columns)]
+    dtypes = particle_dtypes(usecols, compact=compact)
+
+    start = time.perf_counter()
+    try:
+        df = pd.read_csv(path, usecols=usecols, dtype=dtypes, engine=CSV_ENGINE)
+    except (ValueError, TypeError):
+        # Ids with missing values (e.g. unlinked rows) cannot be parsed as integers;
+        # read them as floats and convert the ones that turn out to be complete
+        float_dtype = np.float32 if compact else np.float64
+        for col in ID_COLUMNS:
+            if col in dtypes:
+                dtypes[col] = np.float64
+        df = pd.read_csv(path, usecols=usecols, dtype=dtypes, engine=CSV_ENGINE)
+        int_dtype = np.int32 if compact else np.int64
+        for col in ID_COLUMNS:
+            if col in df.columns:
+                if df[col].notna().all():
+                    df[col] = df[col].astype(int_dtype)
+                elif compact:
+                    df[col] = df[col].astype(float_dtype)
+    elapsed = time.perf_counter() - start
+
+    size_bytes = os.path.getsize(path)
+    if size_bytes >= _REPORT_MIN_BYTES and elapsed > 0:
+        print(
+            f"Parsed {len(df)} rows from {os.path.basename(path)} in {elapsed:.2f}s "
+            f"({size_bytes / elapsed / 1e6:.1f} MB/s, {len(df) / elapsed:.0f} rows/s, "
+            f"{CSV_ENGINE} engine)"
+        )
+    return df
+
+
+def compact_particle_table(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Downcast the trackpy columns of a table to the compact float32/int32 schema.
+
+    Columns outside the trackpy set and id columns holding missing values or values
+    outside the int32 range are left unchanged.
+
+    Parameters
+    ----------
+    df : pd.DataFrame
+        Particle or trajectory table.
+
+    Returns
+    -------
+    pd.DataFrame
+        The same table if nothing needs casting, otherwise a downcast copy.
+    """
+    if df is None or df.empty:
+        return df
+    casts = {}
+    for col in df.columns:
+        dtype = df[col].dtype
+        if col in FLOAT_COLUMNS and pd.api.types.is_numeric_dtype(dtype):
+            if dtype != np.float32:
+                casts[col] = np.float32
+        elif col in ID_COLUMNS and pd.api.types.is_integer_dtype(dtype):
+            if dtype != np.int32:
+                values = df[col]
+                if values.min() >= _INT32_MIN and values.max() <= _INT32_MAX:
+                    casts[col] = np.int32
+    if not casts:
+        return df
+    return df.astype(casts)
+
+
+def restore_dtypes(df: pd.DataFrame, reference: pd.DataFrame) -> pd.DataFrame:
+    """
+    Cast columns back to the dtypes they have in ``reference``.
+
+    Used after operations that upcast float32 columns (e.g. subtracting a float64 drift
+    table) so compact tables stay compact.
+
+    Parameters
+    ----------
+    df : pd.DataFrame
+        Table produced from ``reference``.
+    reference : pd.DataFrame
+        Table whose dtypes should be kept.
+
+    Returns
+    -------
+    pd.DataFrame
+        ``df`` with the shared columns cast back, or ``df`` itself if nothing changed.
+    """
+    casts = {
+        col: reference[col].dtype
+        for col in df.columns
+        if col in reference.columns
+        and col in FLOAT_COLUMNS
+        and df[col].dtype != reference[col].dtype
+    }
+    if not casts:
+        return df
+    return df.astype(casts)
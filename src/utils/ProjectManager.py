@@ -259,6 +259,10 @@ class ProjectManager:
             "threshold": "0.0",
             "frame_idx": "0",
             "scaling": str(scaling),
+            "roi": "[]",
+            "tiling": "auto",
+            "background": "off",
+            "background_window": "100",
         }
 
         # Linking section
@@ -269,6 +273,17 @@ class ProjectManager:
             "drift": "false",
         }
 
+        # Data section (compact_mode stores particle tables as float32/int32;
+        # undo_* limit the detection undo history; memory_budget_mb (0 = 80% of RAM)
+        # and trace_memory control the per-stage memory instrumentation)
+        config["Data"] = {
+            "compact_mode": "false",
+            "undo_levels": "10",
+            "undo_max_mb": "2048",
+            "memory_budget_mb": "0",
+            "trace_memory": "false",
+        }
+
         with open(config_path, "w") as f:
             config.write(f)
 
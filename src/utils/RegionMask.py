@@ -0,0 +1,216 @@
+"""
+Region Mask Module
+
+Description: Regions of interest for detection. Regions are rectangles or polygons in
+             full resolution image coordinates, stored as JSON in the [Detection] roi
+             setting of the project config. Detection crops each frame to the regions'
+             bounding boxes (plus a margin so band-pass filtering and edge exclusion
+             behave as on the full frame), locates particles in the crops and drops
+             particles whose centers fall outside the regions.
+
+Copyright (c) 2025, Jacqueline Reynaga, Kevin Pillsbury, Bakir Husremovic
+License: BSD 3-Clause License
+Date: 2025-12-08
+"""
+
+import json
+
+import cv2
+import numpy as np
+import pandas as pd
+
+ROI_TYPES = ("rect", "polygon")
+
+# Columns of trackpy.locate output, used when no region lies inside the frame
+LOCATE_COLUMNS = ["y", "x", "mass", "size", "ecc", "signal", "raw_mass", "ep"]
+
+
+def parse_regions(value):
+    """
+    Read regions from their config value.
+
+    Parameters
+    ----------
+    value : str or list
+        JSON list of {"type": "rect" | "polygon", "points": [[x, y], ...]}, or the
+        already parsed list. Rectangles have two points (opposite corners).
+
+    Returns
+    -------
+    list of dict
+        Valid regions; malformed entries are skipped with a warning.
+    """
+    if not value:
+        return []
+    if isinstance(value, str):
+        try:
+            value = json.loads(value)
+        except json.JSONDecodeError as e:
+            print(f"Warning: Invalid roi setting, detecting on the full frame: {e}")
+            return []
+    regions = []
+    for region in value if isinstance(value, list) else []:
+        try:
+            kind = region["type"]
+            points = [[float(x), float(y)] for x, y in region["points"]]
+        except (KeyError, TypeError, ValueError):
+            print(f"Warning: Skipping malformed region {region!r}")
+            continue
+        if kind not in ROI_TYPES or len(points) < (2 if kind == "rect" else 3):
+            print(f"Warning: Skipping malformed region {region!r}")
+            continue
+        regions.append({"type": kind, "points": points})
+    return regions
+
+
+def regions_to_json(regions):
+    """
+    Config value for a list of regions (points rounded to 0.1 px).
+
+    Parameters
+    ----------
+    regions : list of dict
+        Regions as returned by ``parse_regions``.
+
+    Returns
+    -------
+    str
+        JSON text.
+    """
+    return json.dumps(
+        [
+            {
+                "type": region["type"],
+                "points": [[round(x, 1), round(y, 1)] for x, y in region["points"]],
+            }
+            for region in regions
+        ]
+    )
+
+
+def region_polygon(region):
+    """
+    Vertices of a region as an (N, 2) array of (x, y).
+
+    Parameters
+    ----------
+    region : dict
+        Rectangle or polygon region.
+
+    Returns
+    -------
+    np.ndarray
+        Polygon vertices (four corners for a rectangle).
+    """
+    points = np.asarray(region["points"], dtype=float)
+    if region["type"] == "rect":
+        (x0, y0), (x1, y1) = points[0], points[1]
+        return np.array([[x0, y0], [x1, y0], [x1, y1], [x0, y1]])
+    return points
+
+
+def build_region_mask(regions, shape):
+    """
+    Boolean mask of the pixels inside any region.
+
+    Parameters
+    ----------
+    regions : list of dict
+        Regions in image coordinates.
+    shape : tuple
+        (height, width) of the frame.
+
+    Returns
+    -------
+    np.ndarray
+        Mask of ``shape``; True inside a region.
+    """
+    mask = np.zeros(shape[:2], dtype=np.uint8)
+    polygons = [np.round(region_polygon(region)).astype(np.int32) for region in regions]
+    if polygons:
+        cv2.fillPoly(mask, polygons, 1)
+    return mask.astype(bool)
+
+
+def region_boxes(regions, shape, margin):
+    """
+    Crop boxes covering the regions, expanded by ``margin`` and clipped to the frame.
+
+    Overlapping boxes are merged so no particle is located twice.
+
+    Parameters
+    ----------
+    regions : list of dict
+        Regions in image coordinates.
+    shape : tuple
+        (height, width) of the frame.
+    margin : int
+        Pixels added on every side (at least the feature size).
+
+    Returns
+    -------
+    list of tuple
+        (x0, y0, x1, y1) boxes with exclusive upper bounds.
+    """
+    height, width = shape[:2]
+    boxes = []
+    for region in regions:
+        polygon = region_polygon(region)
+        x0 = max(0, int(np.floor(polygon[:, 0].min())) - margin)
+        y0 = max(0, int(np.floor(polygon[:, 1].min())) - margin)
+        x1 = min(width, int(np.ceil(polygon[:, 0].max())) + margin + 1)
+        y1 = min(height, int(np.ceil(polygon[:, 1].max())) + margin + 1)
+        if x1 > x0 and y1 > y0:
+            boxes.append((x0, y0, x1, y1))
+
+    merged = True
+    while merged:
+        merged = False
+        for i in range(len(boxes)):
+            for j in range(i + 1, len(boxes)):
+                a, b = boxes[i], boxes[j]
+                if a[0] < b[2] and b[0] < a[2] and a[1] < b[3] and b[1] < a[3]:
+                    boxes[i] = (min(a[0], b[0]), min(a[1], b[1]), max(a[2], b[2]), max(a[3], b[3]))
+                    del boxes[j]
+                    merged = True
+                    break
+            if merged:
+                break
+    return boxes
+
+
+def locate_in_regions(image, locate_fn, mask, boxes):
+    """
+    Locate particles in the region crops of one frame.
+
+    Parameters
+    ----------
+    image : np.ndarray
+        Grayscale frame.
+    locate_fn : callable
+        Called with each crop; returns a trackpy.locate style DataFrame.
+    mask : np.ndarray
+        Region mask of the frame (``build_region_mask``).
+    boxes : list of tuple
+        Crop boxes (``region_boxes``).
+
+    Returns
+    -------
+    pd.DataFrame
+        Particles inside the regions, in full frame coordinates.
+    """
+    located = []
+    for x0, y0, x1, y1 in boxes:
+        features = locate_fn(image[y0:y1, x0:x1])
+        if features.empty:
+            continue
+        features["x"] += x0
+        features["y"] += y0
+        located.append(features)
+    if not located:
+        return pd.DataFrame(columns=LOCATE_COLUMNS)
+
+    features = pd.concat(located, ignore_index=True)
+    rows = np.clip(np.round(features["y"].to_numpy()).astype(int), 0, mask.shape[0] - 1)
+    cols = np.clip(np.round(features["x"].to_numpy()).astype(int), 0, mask.shape[1] - 1)
+    return features[mask[rows, cols]].reset_index(drop=True)
@@ -0,0 +1,308 @@
+"""
+Stall Watchdog Module
+
+Description: Opt-in detector for GUI-thread freezes (start the GUI with --watch-stalls).
+             Every event the application dispatches (clicks, key presses, timers,
+             queued signals) is timed in QApplication.notify. A helper thread samples
+             the GUI thread's Python stack while a dispatch is running past the
+             threshold, so the log shows where the time went, not just that it did.
+             A nested dispatch (a modal dialog or processEvents inside a handler)
+             shows the event loop is alive, so it ends the outer handler's timed
+             segment and the outer handler is timed again once the nested dispatch
+             returns. Stalls are printed and appended to a rotating per-project log.
+
+Copyright (c) 2025, Jacqueline Reynaga, Kevin Pillsbury, Bakir Husremovic
+License: BSD 3-Clause License
+Date: 2025-12-08
+"""
+
+import json
+import logging
+import os
+import sys
+import threading
+import time
+import traceback
+from logging.handlers import RotatingFileHandler
+
+from PySide6.QtWidgets import QApplication
+
+WATCH_FLAG = "--watch-stalls"
+DEFAULT_THRESHOLD_MS = 250
+STALL_LOG_FILE = "stall_log.jsonl"
+STALL_LOG_MAX_BYTES = 1024 * 1024
+STALL_LOG_BACKUPS = 3
+
+# Frames from this folder are reported as the handler that stalled
+_SRC_FOLDER = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def threshold_from_argv(argv):
+    """
+    Parse ``--watch-stalls[=ms]`` from ``argv`` and remove it.
+
+    Parameters
+    ----------
+    argv : list of str
+        Command-line arguments (modified in place so Qt does not see the flag).
+
+    Returns
+    -------
+    int or None
+        Stall threshold in milliseconds, or None if the watchdog was not requested.
+    """
+    threshold = None
+    remaining = []
+    for arg in argv:
+        if arg == WATCH_FLAG:
+            threshold = DEFAULT_THRESHOLD_MS
+        elif arg.startswith(WATCH_FLAG + "="):
+            try:
+                threshold = max(1, int(arg.split("=", 1)[1]))
+            except ValueError:
+                print(f"Warning: Invalid {WATCH_FLAG} value, using {DEFAULT_THRESHOLD_MS} ms")
+                threshold = DEFAULT_THRESHOLD_MS
+        else:
+            remaining.append(arg)
+    argv[:] = remaining
+    return threshold
+
+
+def _describe_receiver(receiver):
+    """Class, object name and (for buttons/actions) text of an event receiver."""
+    description = type(receiver).__name__
+    name = receiver.objectName()
+    if name:
+        description += f" '{name}'"
+    text = getattr(receiver, "text", None)
+    if callable(text):
+        try:
+            label = text()
+        except TypeError:
+            label = None
+        if isinstance(label, str) and label:
+            description += f" [{label[:40]}]"
+    window = receiver.window() if hasattr(receiver, "window") else None
+    if window is not None and window is not receiver:
+        description += f" in {type(window).__name__}"
+    return description
+
+
+def _event_name(event):
+    event_type = event.type()
+    return getattr(event_type, "name", None) or str(event_type)
+
+
+class StallWatchdog:
+    """Times GUI-thread event dispatches and logs the ones over a threshold."""
+
+    def __init__(self, threshold_ms=DEFAULT_THRESHOLD_MS):
+        """
+        Create the watchdog. Must be called on the GUI thread.
+
+        Parameters
+        ----------
+        threshold_ms : int, optional
+            Dispatches taking at least this long are reported.
+        """
+        self.threshold = threshold_ms / 1000.0
+        self._gui_thread_id = threading.get_ident()
+        self._lock = threading.Lock()
+        # Tokens of the dispatches in progress on the GUI thread, innermost last
+        self._stack = []
+        self._dispatch_id = 0
+        self._dispatch_start = None
+        # dispatch id -> (stack text, innermost application frame) sampled mid-stall
+        self._samples = {}
+        self._stop = threading.Event()
+        self._thread = None
+        self.stall_count = 0
+
+        self._logger = logging.getLogger("particle_tracking_gui.stalls")
+        self._logger.setLevel(logging.INFO)
+        self._logger.propagate = False
+        self._handler = None
+
+    def start(self):
+        """
+        Start the stack-sampling helper thread.
+
+        Returns
+        -------
+        None
+        """
+        if self._thread is None:
+            self._thread = threading.Thread(
+                target=self._sample_loop, name="StallWatchdog", daemon=True
+            )
+            self._thread.start()
+            print(f"Stall watchdog on (threshold {self.threshold * 1000:.0f} ms)")
+
+    def stop(self):
+        self._stop.set()
+
+    def set_log_folder(self, folder):
+        """
+        Write stalls to ``folder/stall_log.jsonl`` (rotated at 1 MB, 3 backups).
+
+        Parameters
+        ----------
+        folder : str or None
+            Project data folder; None stops file logging.
+
+        Returns
+        -------
+        None
+        """
+        if self._handler is not None:
+            self._logger.removeHandler(self._handler)
+            self._handler.close()
+            self._handler = None
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+            self._handler = RotatingFileHandler(
+                os.path.join(folder, STALL_LOG_FILE),
+                maxBytes=STALL_LOG_MAX_BYTES,
+                backupCount=STALL_LOG_BACKUPS,
+            )
+            self._handler.setFormatter(logging.Formatter("%(message)s"))
+            self._logger.addHandler(self._handler)
+
+    def on_gui_thread(self):
+        """
+        Whether the caller runs on the GUI thread the watchdog times.
+
+        Returns
+        -------
+        bool
+            True on the GUI thread.
+        """
+        return threading.get_ident() == self._gui_thread_id
+
+    def begin(self, receiver, event):
+        """
+        Mark the start of a dispatch (called from QApplication.notify on the GUI thread).
+
+        Returns
+        -------
+        tuple
+            Token for ``end``.
+        """
+        # Describe the receiver now: the dispatch may delete it (e.g. deleteLater)
+        token = (type(receiver).__name__, _event_name(event), receiver)
+        if self._stack:
+            # The event loop is running inside the outer handler (modal dialog,
+            # processEvents), so its time from here on is not a stall
+            self._end_segment(self._stack[-1])
+        self._stack.append(token)
+        self._start_segment()
+        return token
+
+    def end(self, token):
+        """
+        Mark the end of a dispatch and report it if it stalled.
+
+        Parameters
+        ----------
+        token : tuple or None
+            Value returned by ``begin``.
+
+        Returns
+        -------
+        None
+        """
+        if token is None:
+            return
+        self._end_segment(token)
+        self._stack.pop()
+        if self._stack:
+            # The outer handler continues after the nested dispatch
+            self._start_segment()
+
+    def _start_segment(self):
+        with self._lock:
+            self._dispatch_id += 1
+            self._dispatch_start = time.perf_counter()
+
+    def _end_segment(self, token):
+        with self._lock:
+            duration = time.perf_counter() - self._dispatch_start
+            self._dispatch_start = None
+            sample = self._samples.pop(self._dispatch_id, None)
+        if duration >= self.threshold:
+            self._report(token, duration, sample)
+
+    def _report(self, token, duration, sample):
+        receiver_class, event_name, receiver = token
+        try:
+            receiver_description = _describe_receiver(receiver)
+        except RuntimeError:  # deleted during the dispatch
+            receiver_description = receiver_class
+        stack, handler = sample if sample else (None, None)
+        entry = {
+            "time": time.strftime("%Y-%m-%d %H:%M:%S"),
+            "duration_ms": round(duration * 1000, 1),
+            "receiver": receiver_description,
+            "event": event_name,
+            "handler": handler,
+            "stack": stack,
+        }
+        self.stall_count += 1
+        print(
+            f"GUI stall: {entry['duration_ms']:.0f} ms in {event_name} to "
+            f"{receiver_description}" + (f" ({handler})" if handler else "")
+        )
+        self._logger.info(json.dumps(entry))
+
+    def _sample_loop(self):
+        poll = max(0.005, self.threshold / 4)
+        while not self._stop.wait(poll):
+            with self._lock:
+                start = self._dispatch_start
+                dispatch_id = self._dispatch_id
+                if (
+                    start is None
+                    or dispatch_id in self._samples
+                    or time.perf_counter() - start < self.threshold
+                ):
+                    continue
+            frame = sys._current_frames().get(self._gui_thread_id)
+            if frame is None:
+                continue
+            sample = (
+                "".join(traceback.format_stack(frame)),
+                self._innermost_app_frame(frame),
+            )
+            with self._lock:
+                # Only keep it if the same dispatch is still running
+                if self._dispatch_id == dispatch_id and self._dispatch_start is not None:
+                    self._samples[dispatch_id] = sample
+
+    @staticmethod
+    def _innermost_app_frame(frame):
+        """'module.function:line' of the innermost frame in this application's code."""
+        while frame is not None:
+            filename = os.path.abspath(frame.f_code.co_filename)
+            if filename.startswith(_SRC_FOLDER) and not filename.endswith("StallWatchdog.py"):
+                module = os.path.splitext(os.path.basename(filename))[0]
+                return f"{module}.{frame.f_code.co_name}:{frame.f_lineno}"
+            frame = frame.f_back
+        return None
+
+
+class WatchdogApplication(QApplication):
+    """QApplication that reports every event dispatch to a StallWatchdog."""
+
+    def __init__(self, argv, watchdog):
+        super().__init__(argv)
+        self.stall_watchdog = watchdog
+
+    def notify(self, receiver, event):
+        # Worker threads with their own event loop also dispatch through here
+        if not self.stall_watchdog.on_gui_thread():
+            return super().notify(receiver, event)
+        token = self.stall_watchdog.begin(receiver, event)
+        try:
+            return super().notify(receiver, event)
+        finally:
+            self.stall_watchdog.end(token)
@@ -0,0 +1,108 @@
+"""
+Startup Profiler Module
+
+Description: Records how long the GUI takes to import its modules and construct its
+             windows. Timings are always collected (a few perf_counter calls); the
+             report is printed when the application is started with --profile-startup.
+
+Copyright (c) 2025, Jacqueline Reynaga, Kevin Pillsbury, Bakir Husremovic
+License: BSD 3-Clause License
+Date: 2025-12-08
+"""
+
+import sys
+import time
+from contextlib import contextmanager
+
+PROFILE_FLAG = "--profile-startup"
+
+# Slow-to-import packages the start screen should not need
+HEAVY_MODULES = ("trackpy", "pims", "matplotlib", "pandas", "numpy", "cv2", "pyqtgraph")
+
+
+class StartupProfiler:
+    """Named phase durations and milestones measured from process start."""
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.enabled = False
+        self.phases = []
+        self.marks = []
+
+    def enable_from_argv(self, argv):
+        """
+        Enable reporting if ``--profile-startup`` is in ``argv`` and remove the flag.
+
+        Parameters
+        ----------
+        argv : list of str
+            Command-line arguments (modified in place so Qt does not see the flag).
+
+        Returns
+        -------
+        bool
+            True if profiling was requested.
+        """
+        if PROFILE_FLAG in argv:
+            argv[:] = [arg for arg in argv if arg != PROFILE_FLAG]
+            self.enabled = True
+        return self.enabled
+
+    @contextmanager
+    def phase(self, label):
+        """
+        Time a block (an import or a window construction).
+
+        Parameters
+        ----------
+        label : str
+            Name shown in the report.
+        """
+        phase_start = time.perf_counter()
+        try:
+            yield
+        finally:
+            seconds = time.perf_counter() - phase_start
+            self.phases.append((label, seconds))
+            # Phases after the startup report (e.g. opening a project) print as they finish
+            if self.enabled and self.marks:
+                print(f"[startup profile] {label}: {seconds * 1000:.0f} ms")
+
+    def mark(self, label):
+        """
+        Record the time since process start at a milestone.
+
+        Parameters
+        ----------
+        label : str
+            Name shown in the report.
+
+        Returns
+        -------
+        float
+            Seconds since start.
+        """
+        elapsed = time.perf_counter() - self.start
+        self.marks.append((label, elapsed))
+        return elapsed
+
+    def report(self):
+        """
+        Print the recorded phases and milestones, and which heavy packages are loaded.
+
+        Returns
+        -------
+        None
+        """
+        if not self.enabled:
+            return
+        print("Startup profile")
+        for label, seconds in self.phases:
+            print(f"  {label:<40} {seconds * 1000:8.0f} ms")
+        for label, elapsed in self.marks:
+            print(f"  {label + ' (since start)':<40} {elapsed * 1000:8.0f} ms")
+        loaded = [name for name in HEAVY_MODULES if name in sys.modules]
+        print(f"  Heavy packages loaded: {', '.join(loaded) if loaded else 'none'}")
+
+
+startup_profiler = StartupProfiler()
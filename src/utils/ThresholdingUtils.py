@@ -0,0 +1,154 @@
+"""
+Thresholding Utilities
+
+Description: Percentile thresholding for 8-bit grayscale images based on a 256-bin
+             histogram. The histogram of each image is computed once and cached, so
+             moving a threshold slider answers from the histogram instead of sorting
+             every pixel again.
+
+Copyright (c) 2025, Jacqueline Reynaga, Kevin Pillsbury, Bakir Husremovic
+License: BSD 3-Clause License
+Date: 2025-12-08
+"""
+
+import threading
+from collections import OrderedDict
+
+import cv2
+import numpy as np
+
+
+def gray_histogram(gray):
+    """
+    Compute the 256-bin histogram of a uint8 grayscale image.
+
+    Parameters
+    ----------
+    gray : np.ndarray
+        Grayscale image (uint8).
+
+    Returns
+    -------
+    np.ndarray
+        Pixel counts for each gray level 0-255.
+    """
+    return np.bincount(gray.ravel(), minlength=256)
+
+
+def percentile_from_histogram(hist, percentile):
+    """
+    Exact percentile of the pixels counted in a histogram.
+
+    Matches ``np.percentile`` (linear interpolation) on the original pixels.
+
+    Parameters
+    ----------
+    hist : np.ndarray
+        256-bin histogram from ``gray_histogram``.
+    percentile : float
+        Percentile in the range 0-100.
+
+    Returns
+    -------
+    float
+        Gray value at the requested percentile.
+    """
+    cumulative = np.cumsum(hist)
+    total = int(cumulative[-1])
+    if total == 0:
+        return 0.0
+
+    position = min(max(percentile, 0.0), 100.0) / 100.0 * (total - 1)
+    lower = int(np.floor(position))
+    upper = min(lower + 1, total - 1)
+    # The k-th smallest pixel is the first gray level whose cumulative count exceeds k
+    lower_value = int(np.searchsorted(cumulative, lower, side="right"))
+    upper_value = int(np.searchsorted(cumulative, upper, side="right"))
+    return lower_value + (upper_value - lower_value) * (position - lower)
+
+
+def threshold_gray(gray, threshold_percent, hist=None):
+    """
+    Percentile threshold of a grayscale image with a white background and dark particles.
+
+    Parameters
+    ----------
+    gray : np.ndarray
+        Grayscale image (uint8).
+    threshold_percent : float
+        0-100 slider value (higher = more pixels treated as background).
+    hist : np.ndarray, optional
+        Precomputed histogram of ``gray``. Computed if not given.
+
+    Returns
+    -------
+    np.ndarray
+        Single-channel binary image (0 or 255).
+    """
+    if hist is None:
+        hist = gray_histogram(gray)
+    threshold_val = percentile_from_histogram(hist, 100 - threshold_percent)
+
+    # THRESH_BINARY_INV makes pixels <= floor(threshold) white. Keep whichever polarity
+    # leaves at least half of the image white, counted straight from the histogram.
+    white_count = int(np.sum(hist[: int(np.floor(threshold_val)) + 1]))
+    if white_count < gray.size * 0.5:
+        _, thresh = cv2.threshold(gray, threshold_val, 255, cv2.THRESH_BINARY)
+    else:
+        _, thresh = cv2.threshold(gray, threshold_val, 255, cv2.THRESH_BINARY_INV)
+    return thresh
+
+
+class HistogramCache:
+    """Small LRU cache of grayscale histograms keyed by frame (or crop) identity."""
+
+    def __init__(self, max_entries=64):
+        """
+        Parameters
+        ----------
+        max_entries : int, optional
+            Number of histograms kept before the least recently used is dropped.
+        """
+        self.max_entries = max_entries
+        self._histograms = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, gray):
+        """
+        Get the histogram for ``key``, computing it from ``gray`` on a miss.
+
+        Parameters
+        ----------
+        key : hashable or None
+            Identity of the image. None disables caching.
+        gray : np.ndarray
+            Grayscale image the key refers to.
+
+        Returns
+        -------
+        np.ndarray
+            256-bin histogram.
+        """
+        if key is None:
+            return gray_histogram(gray)
+        with self._lock:
+            hist = self._histograms.get(key)
+            if hist is not None:
+                self._histograms.move_to_end(key)
+                return hist
+
+        hist = gray_histogram(gray)
+        with self._lock:
+            self._histograms[key] = hist
+            if len(self._histograms) > self.max_entries:
+                self._histograms.popitem(last=False)
+        return hist
+
+    def clear(self):
+        """Drop every cached histogram."""
+        with self._lock:
+            self._histograms.clear()
+
+
+# Shared cache used by the frame viewer and the RB overlay galleries
+frame_histograms = HistogramCache()
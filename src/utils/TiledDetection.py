@@ -0,0 +1,228 @@
+"""
+Tiled Detection Module
+
+Description: Parallel particle location for very large frames (8K video, stitched
+             mosaics). A frame is split into a grid of tiles; each tile is located
+             with a margin of at least the feature size around it, in a process pool,
+             and a particle is kept only by the tile whose core (the tile without its
+             margin) contains it, so particles in the overlaps are not duplicated. The
+             margin lets band-pass filtering, maxima separation and edge exclusion see
+             the same neighbourhood as on the whole frame.
+
+             The tile grid is chosen from the frame size and core count. trackpy's
+             percentile pre-filter and its 8-bit rescaling are computed per tile, so
+             results can differ from whole-frame detection for particles near those
+             cut-offs.
+
+Copyright (c) 2025, Jacqueline Reynaga, Kevin Pillsbury, Bakir Husremovic
+License: BSD 3-Clause License
+Date: 2025-12-08
+"""
+
+import math
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+TILING_MODES = ("auto", "on", "off")
+
+# In "auto" mode frames smaller than this (about 4K x 4K) are located whole
+TILED_MIN_PIXELS = 16_000_000
+# Smallest tile core side; smaller tiles spend most of their time on the margin
+MIN_TILE_SIDE = 512
+# Tiles per worker, so uneven tiles (dense vs empty areas) balance out
+TILES_PER_WORKER = 2
+
+
+def default_tile_workers():
+    """
+    Worker processes for tiled detection.
+
+    Returns
+    -------
+    int
+        The CPU count.
+    """
+    return os.cpu_count() or 1
+
+
+def choose_tile_grid(shape, feature_size, workers, mode="auto"):
+    """
+    Tile grid for a frame.
+
+    Aims for TILES_PER_WORKER roughly square tiles per worker while keeping tile
+    cores at least MIN_TILE_SIDE (and ten margins) wide.
+
+    Parameters
+    ----------
+    shape : tuple
+        (height, width) of the frame.
+    feature_size : int
+        Feature diameter in pixels (the tile margin).
+    workers : int
+        Worker processes available.
+    mode : str, optional
+        "auto" tiles frames of at least TILED_MIN_PIXELS, "on" tiles any frame big
+        enough for two tiles, "off" never tiles.
+
+    Returns
+    -------
+    tuple
+        (rows, cols); (1, 1) means the frame is located whole.
+    """
+    height, width = shape[:2]
+    if mode == "off" or workers < 2:
+        return 1, 1
+    if mode == "auto" and height * width < TILED_MIN_PIXELS:
+        return 1, 1
+
+    target = workers * TILES_PER_WORKER
+    rows = max(1, round(math.sqrt(target * height / width)))
+    cols = max(1, math.ceil(target / rows))
+    min_side = max(MIN_TILE_SIDE, 10 * feature_size)
+    rows = max(1, min(rows, height // min_side))
+    cols = max(1, min(cols, width // min_side))
+    return rows, cols
+
+
+def tile_boxes(shape, grid, margin):
+    """
+    Core and padded boxes of every tile.
+
+    Parameters
+    ----------
+    shape : tuple
+        (height, width) of the frame.
+    grid : tuple
+        (rows, cols) from ``choose_tile_grid``.
+    margin : int
+        Padding around each core, clipped to the frame.
+
+    Returns
+    -------
+    list of tuple
+        ((x0, y0, x1, y1) core, (x0, y0, x1, y1) padded) with exclusive upper
+        bounds. Cores partition the frame.
+    """
+    height, width = shape[:2]
+    rows, cols = grid
+    y_edges = np.linspace(0, height, rows + 1).astype(int)
+    x_edges = np.linspace(0, width, cols + 1).astype(int)
+    boxes = []
+    for r in range(rows):
+        for c in range(cols):
+            core = (x_edges[c], y_edges[r], x_edges[c + 1], y_edges[r + 1])
+            padded = (
+                max(0, core[0] - margin),
+                max(0, core[1] - margin),
+                min(width, core[2] + margin),
+                min(height, core[3] + margin),
+            )
+            boxes.append((core, padded))
+    return boxes
+
+
+class TiledLocator:
+    """Locates particles tile by tile in a process pool that is reused across frames."""
+
+    def __init__(self, locate_fn, feature_size, workers=None, mode="auto"):
+        """
+        Parameters
+        ----------
+        locate_fn : callable
+            Picklable function (e.g. a functools.partial of a module-level function)
+            called with a grayscale image and returning a trackpy.locate table.
+        feature_size : int
+            Feature diameter; the tile margin.
+        workers : int, optional
+            Worker processes. Defaults to the CPU count.
+        mode : str, optional
+            Tiling mode ("auto", "on" or "off").
+        """
+        self.locate_fn = locate_fn
+        self.margin = int(feature_size)
+        self.workers = workers or default_tile_workers()
+        self.mode = mode if mode in TILING_MODES else "auto"
+        self._pool = None
+        self._grids = {}
+
+    def grid_for(self, shape):
+        """
+        Tile grid used for frames of ``shape`` (cached per shape).
+
+        Parameters
+        ----------
+        shape : tuple
+            (height, width) of the frame.
+
+        Returns
+        -------
+        tuple
+            (rows, cols).
+        """
+        if shape not in self._grids:
+            self._grids[shape] = choose_tile_grid(shape, self.margin, self.workers, self.mode)
+        return self._grids[shape]
+
+    def locate(self, image):
+        """
+        Locate particles in one frame, tiled if its grid has more than one tile.
+
+        Parameters
+        ----------
+        image : np.ndarray
+            Grayscale frame.
+
+        Returns
+        -------
+        pd.DataFrame
+            Particles in frame coordinates, in tile order.
+        """
+        grid = self.grid_for(image.shape[:2])
+        if grid == (1, 1):
+            return self.locate_fn(image)
+
+        if self._pool is None:
+            # Spawned: detection runs on a QThread in the GUI, and forking that
+            # process would copy its instrumentation locks and performance log
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.workers, mp_context=multiprocessing.get_context("spawn")
+            )
+        boxes = tile_boxes(image.shape, grid, self.margin)
+        futures = [
+            self._pool.submit(self.locate_fn, np.ascontiguousarray(image[y0:y1, x0:x1]))
+            for _, (x0, y0, x1, y1) in boxes
+        ]
+
+        located = []
+        for future, (core, padded) in zip(futures, boxes):
+            features = future.result()
+            if features.empty:
+                continue
+            features["x"] += padded[0]
+            features["y"] += padded[1]
+            owned = (
+                (features["x"] >= core[0])
+                & (features["x"] < core[2])
+                & (features["y"] >= core[1])
+                & (features["y"] < core[3])
+            )
+            located.append(features[owned])
+        if not located:
+            return futures[0].result().iloc[0:0]
+        return pd.concat(located, ignore_index=True)
+
+    def close(self):
+        """
+        Shut the worker pool down.
+
+        Returns
+        -------
+        None
+        """
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
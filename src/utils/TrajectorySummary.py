@@ -0,0 +1,145 @@
+"""
+Trajectory Summary Module
+
+Description: Per-trajectory summary table (one row per particle id) computed once per
+             linking run from the raw trajectories.csv. Used by trajectory-level filters,
+             which are evaluated per particle and expanded back to rows. The saved
+             summary is stamped with the size and modification time of the file it was
+             computed from, so a stale summary is recomputed instead of reused.
+
+Copyright (c) 2025, Jacqueline Reynaga, Kevin Pillsbury, Bakir Husremovic
+License: BSD 3-Clause License
+Date: 2025-12-08
+"""
+
+import os
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+
+def compute_trajectory_summary(trajectories: pd.DataFrame) -> pd.DataFrame:
+    """
+    Summarize linked trajectories, one row per particle id.
+
+    The numeric columns of the trajectories are averaged per particle (so mass, size and
+    ecc keep their names), and the following columns are added:
+    length (number of detections), frame_start, frame_end, mass_std, size_std, ecc_std,
+    net_displacement (first to last position, px) and mean_speed (path length per frame,
+    px/frame).
+
+    Parameters
+    ----------
+    trajectories : pd.DataFrame
+        Linked trajectories with particle, frame, x and y columns.
+
+    Returns
+    -------
+    pd.DataFrame
+        Summary sorted by particle id, or an empty DataFrame if there is nothing to summarize.
+    """
+    if trajectories is None or trajectories.empty or "particle" not in trajectories.columns:
+        return pd.DataFrame()
+
+    ordered = trajectories
+    if "frame" in trajectories.columns:
+        ordered = trajectories.sort_values(["particle", "frame"], kind="stable")
+    grouped = ordered.groupby("particle", sort=True)
+
+    numeric_cols = [
+        col
+        for col in ordered.select_dtypes(include=["number"]).columns
+        if col != "particle"
+    ]
+    summary = grouped[numeric_cols].mean()
+    summary.insert(0, "length", grouped.size())
+
+    std_cols = [col for col in ("mass", "size", "ecc") if col in ordered.columns]
+    if std_cols:
+        stds = grouped[std_cols].std(ddof=0)
+        for col in std_cols:
+            summary[f"{col}_std"] = stds[col]
+
+    if "frame" in ordered.columns:
+        summary["frame_start"] = grouped["frame"].min()
+        summary["frame_end"] = grouped["frame"].max()
+
+    if "x" in ordered.columns and "y" in ordered.columns:
+        first = grouped[["x", "y"]].first()
+        last = grouped[["x", "y"]].last()
+        summary["net_displacement"] = np.hypot(
+            last["x"] - first["x"], last["y"] - first["y"]
+        )
+
+        # Step lengths between consecutive detections of the same particle
+        x = ordered["x"].to_numpy(dtype=float)
+        y = ordered["y"].to_numpy(dtype=float)
+        particles = ordered["particle"].to_numpy()
+        steps = np.zeros(len(ordered))
+        if len(ordered) > 1:
+            same = particles[1:] == particles[:-1]
+            steps[1:] = np.where(same, np.hypot(np.diff(x), np.diff(y)), 0.0)
+        path_length = pd.Series(steps, index=ordered.index).groupby(particles).sum()
+
+        if "frame" in ordered.columns:
+            span = (summary["frame_end"] - summary["frame_start"]).astype(float)
+        else:
+            span = (summary["length"] - 1).astype(float)
+        speed = path_length.reindex(summary.index) / span.where(span > 0)
+        summary["mean_speed"] = speed.fillna(0.0)
+
+    return summary.reset_index()
+
+
+def source_stamp(path: str) -> Optional[dict]:
+    """
+    Identify the current contents of a summary's source file.
+
+    Parameters
+    ----------
+    path : str
+        Source file (e.g. trajectories.csv).
+
+    Returns
+    -------
+    dict or None
+        {"file", "mtime_ns", "size"}, or None if the file does not exist.
+    """
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return {"file": os.path.basename(path), "mtime_ns": stat.st_mtime_ns, "size": stat.st_size}
+
+
+def summary_matches(summary: pd.DataFrame, particle_ids, source_path: Optional[str] = None) -> bool:
+    """
+    Check that a summary has exactly one row per particle id, in sorted order.
+
+    Parameters
+    ----------
+    summary : pd.DataFrame
+        Summary table (e.g. loaded from disk).
+    particle_ids : array-like
+        Sorted unique particle ids of the trajectories it should describe.
+    source_path : str, optional
+        File the trajectories were loaded from. If given, the summary must have been
+        computed from this file as it is now (its ``attrs["source"]`` stamp, set by
+        FileController.load_trajectory_summary, must equal ``source_stamp``).
+
+    Returns
+    -------
+    bool
+        True if the summary rows line up with ``particle_ids`` (and its source).
+    """
+    if summary is None or summary.empty or "particle" not in summary.columns:
+        return False
+    if source_path is not None:
+        stamp = summary.attrs.get("source")
+        if stamp is None or stamp != source_stamp(source_path):
+            return False
+    ids = np.asarray(particle_ids)
+    if len(summary) != len(ids):
+        return False
+    return bool(np.array_equal(summary["particle"].to_numpy(), ids))
@@ -0,0 +1,277 @@
+"""
+Undo History Module
+
+Description: Multi-level undo store for detection runs. Each level records a config
+             snapshot and a reference to a content-addressed, gzipped CSV copy of the
+             particle table, so identical tables are stored once. Tables are stored as
+             CSV (never pickles) because project folders are shared and copied, and
+             loading a pickle from someone else's project could run arbitrary code.
+             The single-level snapshot of older versions (data/save) is imported as
+             the oldest undo level.
+
+Copyright (c) 2025, Jacqueline Reynaga, Kevin Pillsbury, Bakir Husremovic
+License: BSD 3-Clause License
+Date: 2025-12-08
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import time
+from typing import Optional, Tuple
+
+import pandas as pd
+
+from .ParticleTable import read_particle_csv
+
+HISTORY_FOLDER = "history"
+MANIFEST_FILE = "history.json"
+BLOB_FOLDER = "blobs"
+BLOB_SUFFIX = ".csv.gz"
+# Single-level undo snapshot written by older versions
+LEGACY_SAVE_FOLDER = "save"
+
+
+def hash_file(path: str, chunk_size: int = 4 * 1024 * 1024) -> str:
+    """
+    SHA-256 of a file's bytes (of an empty input if the file does not exist).
+
+    Parameters
+    ----------
+    path : str
+        File to hash.
+    chunk_size : int, optional
+        Read size in bytes.
+
+    Returns
+    -------
+    str
+        Hex digest.
+    """
+    digest = hashlib.sha256()
+    if os.path.exists(path):
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(chunk_size), b""):
+                digest.update(chunk)
+    return digest.hexdigest()
+
+
+class UndoHistory:
+    """Stack of saved (particle table, config) states kept in a project's data folder."""
+
+    DEFAULT_MAX_LEVELS = 10
+    DEFAULT_MAX_BYTES = 2 * 1024 ** 3
+
+    def __init__(
+        self,
+        data_folder: str,
+        max_levels: int = DEFAULT_MAX_LEVELS,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+    ):
+        """
+        Open (or create) the history stored under ``data_folder/history``.
+
+        Parameters
+        ----------
+        data_folder : str
+            Project data folder.
+        max_levels : int, optional
+            Number of undo levels kept.
+        max_bytes : int, optional
+            Total size of stored tables; the oldest levels are dropped beyond it.
+        """
+        self.folder = os.path.join(data_folder, HISTORY_FOLDER)
+        self.blob_folder = os.path.join(self.folder, BLOB_FOLDER)
+        self.manifest_path = os.path.join(self.folder, MANIFEST_FILE)
+        self.max_levels = max(1, int(max_levels))
+        self.max_bytes = int(max_bytes)
+        self.entries = self._read_manifest()
+        self._import_legacy_save(os.path.join(data_folder, LEGACY_SAVE_FOLDER))
+
+    def __len__(self):
+        return len(self.entries)
+
+    def _read_manifest(self):
+        if not os.path.exists(self.manifest_path):
+            return []
+        try:
+            with open(self.manifest_path, "r") as f:
+                entries = json.load(f).get("entries", [])
+        except (OSError, ValueError) as e:
+            print(f"Warning: Could not read undo history {self.manifest_path}: {e}")
+            return []
+        # Drop levels whose table blob has gone missing (or is in an older format)
+        return [e for e in entries if os.path.exists(self._blob_path(e.get("table", "")))]
+
+    def _write_manifest(self):
+        os.makedirs(self.folder, exist_ok=True)
+        tmp_path = self.manifest_path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"entries": self.entries}, f, indent=1)
+        os.replace(tmp_path, self.manifest_path)
+
+    def _blob_path(self, digest: str) -> str:
+        return os.path.join(self.blob_folder, f"{digest}{BLOB_SUFFIX}")
+
+    def _store_table(self, digest: str, particles_df: pd.DataFrame) -> int:
+        blob_path = self._blob_path(digest)
+        if not os.path.exists(blob_path):
+            os.makedirs(self.blob_folder, exist_ok=True)
+            tmp_path = blob_path + ".tmp"
+            particles_df.to_csv(
+                tmp_path, index=False, compression={"method": "gzip", "compresslevel": 1}
+            )
+            os.replace(tmp_path, blob_path)
+        return os.path.getsize(blob_path)
+
+    def _load_table(self, digest: str) -> pd.DataFrame:
+        try:
+            return read_particle_csv(self._blob_path(digest))
+        except pd.errors.EmptyDataError:
+            # An empty table was saved
+            return pd.DataFrame()
+
+    def _import_legacy_save(self, save_folder: str):
+        """
+        Add an older version's data/save snapshot as the oldest level, then delete it.
+
+        A folder without a config.ini holds no restorable state and is just deleted.
+
+        Parameters
+        ----------
+        save_folder : str
+            The legacy save folder (all_particles.csv and config.ini).
+
+        Returns
+        -------
+        None
+        """
+        particles_path = os.path.join(save_folder, "all_particles.csv")
+        config_path = os.path.join(save_folder, "config.ini")
+        if not os.path.isdir(save_folder):
+            return
+        if os.path.exists(config_path):
+            with open(config_path, "r") as f:
+                config_text = f.read()
+            if not self.push(
+                config_text,
+                particles_path,
+                load_table=lambda: read_particle_csv(particles_path),
+                oldest=True,
+            ):
+                # Keep the folder so the snapshot is not lost
+                return
+            print(f"Imported the previous undo snapshot from {save_folder}")
+        shutil.rmtree(save_folder, ignore_errors=True)
+
+    def push(
+        self,
+        config_text: str,
+        particles_path: str,
+        particles_df: Optional[pd.DataFrame] = None,
+        load_table=None,
+        oldest: bool = False,
+    ) -> bool:
+        """
+        Record a new undo level.
+
+        The table is identified by the hash of ``particles_path``. It is only loaded and
+        compressed if no earlier level already stored the same content.
+
+        Parameters
+        ----------
+        config_text : str
+            Contents of the config file to restore.
+        particles_path : str
+            Particle table file on disk (may not exist, meaning an empty table).
+        particles_df : pd.DataFrame, optional
+            The same table already in memory, used instead of loading the file.
+        load_table : callable, optional
+            Called with no arguments to load the table when it has to be stored.
+        oldest : bool, optional
+            Record the level below the existing ones instead of on top.
+
+        Returns
+        -------
+        bool
+            True if the level was recorded.
+        """
+        try:
+            digest = hash_file(particles_path)
+            if not os.path.exists(self._blob_path(digest)):
+                if particles_df is None:
+                    if os.path.exists(particles_path) and load_table is not None:
+                        particles_df = load_table()
+                    else:
+                        particles_df = pd.DataFrame()
+            size = self._store_table(digest, particles_df)
+        except Exception as e:
+            print(f"Error saving undo state: {e}")
+            return False
+
+        entry = {
+            "table": digest,
+            "table_bytes": size,
+            "config": config_text,
+            "saved_at": time.strftime("%Y-%m-%d %H:%M:%S"),
+        }
+        if oldest:
+            self.entries.insert(0, entry)
+        else:
+            self.entries.append(entry)
+        self._prune()
+        self._write_manifest()
+        return True
+
+    def pop(self) -> Optional[Tuple[pd.DataFrame, str]]:
+        """
+        Remove the newest level and return its state.
+
+        Returns
+        -------
+        tuple or None
+            (particles DataFrame, config text), or None if the history is empty or the
+            table could not be read.
+        """
+        while self.entries:
+            entry = self.entries.pop()
+            try:
+                particles_df = self._load_table(entry["table"])
+            except Exception as e:
+                print(f"Error reading undo state {entry.get('table')}: {e}")
+                continue
+            self._remove_unreferenced_blobs()
+            self._write_manifest()
+            return particles_df, entry["config"]
+        self._write_manifest()
+        return None
+
+    def _stored_bytes(self) -> int:
+        sizes = {entry["table"]: entry.get("table_bytes", 0) for entry in self.entries}
+        return sum(sizes.values())
+
+    def _prune(self):
+        """Drop the oldest levels beyond the level count or size cap (keeping the newest)."""
+        while len(self.entries) > self.max_levels or (
+            len(self.entries) > 1 and self._stored_bytes() > self.max_bytes
+        ):
+            self.entries.pop(0)
+        self._remove_unreferenced_blobs()
+
+    def _remove_unreferenced_blobs(self):
+        if not os.path.isdir(self.blob_folder):
+            return
+        referenced = {f"{entry['table']}{BLOB_SUFFIX}" for entry in self.entries}
+        for name in os.listdir(self.blob_folder):
+            if name not in referenced:
+                try:
+                    os.remove(os.path.join(self.blob_folder, name))
+                except OSError as e:
+                    print(f"Warning: Could not remove undo blob {name}: {e}")
+
+    def clear(self):
+        """Remove every level and stored table."""
+        self.entries = []
+        self._remove_unreferenced_blobs()
+        self._write_manifest()
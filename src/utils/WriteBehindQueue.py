@@ -0,0 +1,179 @@
+"""
+Write-Behind Queue Module
+
+Description: Background writer for data files. Writes are serialized on one worker
+             thread, each file is written to a temporary file and atomically renamed
+             over the target, and a write that is superseded before it starts is
+             dropped in favour of the newer one.
+
+Copyright (c) 2025, Jacqueline Reynaga, Kevin Pillsbury, Bakir Husremovic
+License: BSD 3-Clause License
+Date: 2025-12-08
+"""
+
+import os
+import threading
+from collections import OrderedDict
+
+
+def atomic_write(path, write_fn):
+    """
+    Write a file through a temporary file and rename it over ``path``.
+
+    A crash mid-write leaves the previous file intact (plus a stray .tmp file)
+    instead of a truncated one.
+
+    Parameters
+    ----------
+    path : str
+        Target file.
+    write_fn : callable
+        Called with the temporary path; must write the complete file there.
+
+    Returns
+    -------
+    None
+    """
+    tmp_path = f"{path}.tmp"
+    try:
+        write_fn(tmp_path)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+        raise
+
+
+class WriteBehindQueue:
+    """Serializes file writes on a background thread, coalescing writes to the same path."""
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        # path -> (write_fn, done message); insertion order is write order
+        self._pending = OrderedDict()
+        self._active_path = None
+        self._thread = None
+        self.coalesced_count = 0
+
+    def submit(self, path, write_fn, message=None):
+        """
+        Queue a write.
+
+        If a write to the same path is still queued, it is replaced by this one.
+
+        Parameters
+        ----------
+        path : str
+            Target file.
+        write_fn : callable
+            Called with a temporary path on the worker thread; writes the file contents.
+            Anything it captures must not be modified after submitting.
+        message : str, optional
+            Printed once the file has been written.
+
+        Returns
+        -------
+        None
+        """
+        path = os.path.abspath(path)
+        with self._cond:
+            if path in self._pending:
+                self.coalesced_count += 1
+            self._pending[path] = (write_fn, message)
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name="WriteBehindQueue", daemon=True
+                )
+                self._thread.start()
+            self._cond.notify_all()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                if not self._pending:
+                    self._thread = None
+                    self._cond.notify_all()
+                    return
+                path, (write_fn, message) = self._pending.popitem(last=False)
+                self._active_path = path
+
+            try:
+                atomic_write(path, write_fn)
+                if message:
+                    print(message)
+            except Exception as e:
+                print(f"Error writing {path}: {e}")
+            finally:
+                with self._cond:
+                    self._active_path = None
+                    self._cond.notify_all()
+
+    def is_pending(self, path):
+        """
+        Check whether a write to ``path`` is queued or in progress.
+
+        Parameters
+        ----------
+        path : str
+            File to check.
+
+        Returns
+        -------
+        bool
+            True if the file is not yet up to date on disk.
+        """
+        path = os.path.abspath(path)
+        with self._cond:
+            return path in self._pending or path == self._active_path
+
+    def wait_for(self, path):
+        """
+        Block until any queued or running write to ``path`` has finished.
+
+        Parameters
+        ----------
+        path : str
+            File about to be read.
+
+        Returns
+        -------
+        None
+        """
+        path = os.path.abspath(path)
+        with self._cond:
+            while path in self._pending or path == self._active_path:
+                self._cond.wait()
+
+    def cancel(self, path):
+        """
+        Drop a queued write to ``path`` and wait for a running one to finish.
+
+        Parameters
+        ----------
+        path : str
+            File about to be deleted or replaced by other means.
+
+        Returns
+        -------
+        None
+        """
+        path = os.path.abspath(path)
+        with self._cond:
+            self._pending.pop(path, None)
+            while path == self._active_path:
+                self._cond.wait()
+
+    def flush(self):
+        """
+        Block until every queued write has been written (e.g. before shutdown).
+
+        Returns
+        -------
+        None
+        """
+        with self._cond:
+            while self._pending or self._active_path is not None:
+                self._cond.wait()